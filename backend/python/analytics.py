@@ -5,7 +5,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, extract, case
 from typing import Dict, List, Optional
 from datetime import datetime, date, timedelta
-from models import Appeal, Direction, Content
+from models import Appeal, Content
+import directions_registry
 
 # Маппинг школ ДВФУ
 SCHOOLS_MAPPING = {
@@ -85,26 +86,25 @@ def get_detailed_appeal_stats(
         )
         avg_resolution_time = total_time / len(closed_appeals) / 3600  # in hours
     
-    # By direction
-    by_direction = {}
-    results = db.query(
-        Direction.id,
-        Direction.title,
-        func.count(Appeal.id).label("count")
-    ).join(Appeal, Direction.id == Appeal.direction_id, isouter=True)
+    # By direction: appeals grouped on their own, titles from the registry
+    counts = db.query(Appeal.direction_id, func.count(Appeal.id))
     
     if start_date:
-        results = results.filter(Appeal.created_at >= start_date)
+        counts = counts.filter(Appeal.created_at >= start_date)
     if end_date:
-        results = results.filter(Appeal.created_at <= end_date)
+        counts = counts.filter(Appeal.created_at <= end_date)
     
-    results = results.group_by(Direction.id, Direction.title).all()
+    counts = dict(counts.group_by(Appeal.direction_id).all())
     
-    for direction_id, direction_title, count in results:
-        by_direction[str(direction_id)] = {
-            "title": direction_title,
-            "count": count
-        }
+    by_direction = {}
+    for direction in directions_registry.current().entries:
+        count = counts.get(direction.id, 0)
+        # With a date filter only directions that have appeals are listed
+        if count or not (start_date or end_date):
+            by_direction[str(direction.id)] = {
+                "title": direction.title,
+                "count": count
+            }
     
     # Daily trends (last 30 days)
     daily_trends = []
@@ -0,0 +1,79 @@
+"""
+Appeal events
+
+crud publishes an event after each committed change that someone may want
+to hear about (status change, assignment, comment, new appeal); the deadline
+scheduler adds overdue events. Subscribers (notifications.py) are called
+synchronously from the publishing thread and must only hand the event over -
+a request never waits for delivery.
+
+Event types match notification_log.event_type and the per-type columns of
+notification_settings (``email_appeal_status`` ...).
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple, Optional
+from uuid import UUID
+
+import deadlines
+
+logger = logging.getLogger(__name__)
+
+APPEAL_NEW = "appeal_new"
+APPEAL_STATUS = "appeal_status"
+APPEAL_ASSIGNED = "appeal_assigned"
+APPEAL_COMMENT = "appeal_comment"
+APPEAL_OVERDUE = "appeal_overdue"
+
+EVENT_TYPES = (APPEAL_NEW, APPEAL_STATUS, APPEAL_ASSIGNED, APPEAL_COMMENT, APPEAL_OVERDUE)
+
+
+class AppealEvent(NamedTuple):
+    type: str
+    appeal_id: UUID
+    # Title of the appeal when the publisher has it (saves a lookup)
+    title: Optional[str] = None
+    # Who should hear about it; None = the appeal's assignee at delivery time
+    recipient_id: Optional[UUID] = None
+    # New status for appeal_status
+    detail: Optional[str] = None
+    # Who caused it; not notified about their own action
+    actor_id: Optional[UUID] = None
+    occurred_at: Optional[datetime] = None
+
+
+Subscriber = Callable[[AppealEvent], None]
+
+_subscribers: List[Subscriber] = []
+
+
+def subscribe(callback: Subscriber) -> None:
+    _subscribers.append(callback)
+
+
+def publish(event: AppealEvent) -> None:
+    """Hand ``event`` to every subscriber; never raises"""
+    if event.occurred_at is None:
+        event = event._replace(occurred_at=datetime.now(timezone.utc))
+    for callback in _subscribers:
+        try:
+            callback(event)
+        except Exception:
+            logger.exception(f"Appeal event subscriber failed for {event.type}")
+
+
+def appeal_changed(appeal, old_status: Optional[str], old_assigned_to: Optional[UUID]) -> None:
+    """Events for a committed crud.update_appeal"""
+    if appeal.status != old_status:
+        publish(AppealEvent(APPEAL_STATUS, appeal.id, title=appeal.title,
+                            recipient_id=appeal.assigned_to, detail=appeal.status))
+    if appeal.assigned_to is not None and appeal.assigned_to != old_assigned_to:
+        publish(AppealEvent(APPEAL_ASSIGNED, appeal.id, title=appeal.title, recipient_id=appeal.assigned_to))
+
+
+def _publish_overdue(appeal_ids: List[UUID]) -> None:
+    for appeal_id in appeal_ids:
+        publish(AppealEvent(APPEAL_OVERDUE, appeal_id))
+
+
+deadlines.scheduler.subscribe(_publish_overdue)
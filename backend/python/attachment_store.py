@@ -0,0 +1,210 @@
+"""
+Local-disk attachment store
+
+Uploads are streamed from the request body to a temporary file in chunks while
+their SHA-256 is computed, so memory per upload is bounded by WRITE_BUFFER
+regardless of the file size. The finished file is moved to its content
+address ``<ATTACHMENT_DIR>/ab/cd/<sha256>``; an identical file that is already
+stored is reused instead (deduplication). Attachments reference the blob as
+``local://sha256/<hex>`` in ``file_url``.
+
+Blobs are never deleted together with an attachment row (another row may
+point to the same content); ``python manage.py gc-attachments`` removes
+blobs no row references any more.
+
+Environment:
+    ATTACHMENT_DIR              storage directory (default: <tmp>/oss_dvfu_attachments)
+    ATTACHMENT_MAX_BYTES        upload size limit (20 MB)
+    ATTACHMENT_ACCEL_REDIRECT   nginx internal location mapped to ATTACHMENT_DIR,
+                                e.g. /_attachments/ - downloads are then sent by
+                                nginx (sendfile, Range) via X-Accel-Redirect
+"""
+import hashlib
+import mimetypes
+import os
+import tempfile
+import time
+from typing import AsyncIterator, Iterator, NamedTuple, Optional
+
+import anyio
+
+from errors import AttachmentTooLargeError
+
+ATTACHMENT_DIR = os.getenv("ATTACHMENT_DIR") or os.path.join(tempfile.gettempdir(), "oss_dvfu_attachments")
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(20 * 1024 * 1024)))
+ATTACHMENT_ACCEL_REDIRECT = os.getenv("ATTACHMENT_ACCEL_REDIRECT", "")
+
+URL_PREFIX = "local://sha256/"
+
+# Request chunks are collected up to this size and written in a worker thread
+WRITE_BUFFER = 1024 * 1024
+
+# Leading bytes -> MIME type, for the formats students actually attach
+_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/msword"),
+    (b"Rar!", "application/vnd.rar"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+)
+SNIFF_BYTES = 16
+
+
+class StoredFile(NamedTuple):
+    sha256: str
+    size: int
+    mime_type: str
+    deduplicated: bool
+
+    @property
+    def url(self) -> str:
+        return URL_PREFIX + self.sha256
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(ATTACHMENT_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def sha256_from_url(file_url: str) -> Optional[str]:
+    """Content hash of a ``local://sha256/...`` URL, None for external URLs"""
+    if not file_url or not file_url.startswith(URL_PREFIX):
+        return None
+    sha256 = file_url[len(URL_PREFIX):]
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        return None
+    return sha256
+
+
+def detect_mime_type(head: bytes, file_name: str, declared: Optional[str] = None) -> str:
+    """
+    MIME type from the file's leading bytes; for containers and text formats
+    without a reliable signature (docx/xlsx are zip files) the file name
+    decides, then the client's Content-Type.
+    """
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    guessed, _ = mimetypes.guess_type(file_name)
+    if guessed:
+        return guessed
+    if head.startswith(b"PK\x03\x04"):
+        return "application/zip"
+    if declared and declared not in ("application/octet-stream", "application/x-www-form-urlencoded"):
+        return declared.split(";")[0].strip()
+    return "application/octet-stream"
+
+
+def blob_info(sha256: str, file_name: str) -> Optional[StoredFile]:
+    """Size and MIME type of a stored blob, None if it does not exist"""
+    try:
+        with open(blob_path(sha256), "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            size = os.fstat(f.fileno()).st_size
+    except FileNotFoundError:
+        return None
+    return StoredFile(sha256, size, detect_mime_type(head, file_name), True)
+
+
+def _finish(tmp_path: str, sha256: str) -> bool:
+    """Move the upload to its content address; True if the blob already existed"""
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        os.unlink(tmp_path)
+        # Refresh mtime: gc-attachments keeps recently used blobs
+        os.utime(path)
+        return True
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return False
+
+
+async def store_stream(
+    chunks: AsyncIterator[bytes],
+    file_name: str,
+    declared_type: Optional[str] = None
+) -> StoredFile:
+    """
+    Store an uploaded body. Raises AttachmentTooLargeError as soon as the
+    body exceeds ATTACHMENT_MAX_BYTES (the partial file is removed).
+    """
+    tmp_dir = os.path.join(ATTACHMENT_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    buffer = []
+    buffered = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > ATTACHMENT_MAX_BYTES:
+                    raise AttachmentTooLargeError(ATTACHMENT_MAX_BYTES)
+                digest.update(chunk)
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                buffer.append(chunk)
+                buffered += len(chunk)
+                if buffered >= WRITE_BUFFER:
+                    await anyio.to_thread.run_sync(f.writelines, buffer)
+                    buffer, buffered = [], 0
+            if buffer:
+                await anyio.to_thread.run_sync(f.writelines, buffer)
+        sha256 = digest.hexdigest()
+        deduplicated = await anyio.to_thread.run_sync(_finish, tmp_path, sha256)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return StoredFile(sha256, size, detect_mime_type(head, file_name, declared_type), deduplicated)
+
+
+def iter_blobs() -> Iterator[str]:
+    """sha256 of every stored blob"""
+    for root, _dirs, files in os.walk(ATTACHMENT_DIR):
+        if os.path.basename(root) == "tmp":
+            continue
+        for name in files:
+            if len(name) == 64:
+                yield name
+
+
+def remove_unreferenced(referenced: set, min_age_seconds: float = 3600) -> int:
+    """
+    Delete blobs not in ``referenced`` and untouched for ``min_age_seconds``
+    (the age check protects uploads whose row is not committed yet).
+    """
+    removed = 0
+    cutoff = time.time() - min_age_seconds
+    for sha256 in list(iter_blobs()):
+        if sha256 in referenced:
+            continue
+        path = blob_path(sha256)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.unlink(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    # Stale temporary files of interrupted uploads
+    tmp_dir = os.path.join(ATTACHMENT_DIR, "tmp")
+    if os.path.isdir(tmp_dir):
+        for name in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+    return removed
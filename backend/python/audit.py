@@ -0,0 +1,450 @@
+"""
+Appeal history (audit trail) written behind the request
+
+appeal_history used to be filled only by the log_appeal_change trigger, with
+one INSERT per changed field inside the UPDATE's transaction. Changes made
+through the API are now diffed in Python instead (crud.update_appeal,
+create_appeal_comment) and written according to AUDIT_MODE:
+
+    sync      the rows join the change's own transaction: never lost, but the
+              INSERT stays on the request path
+    buffered  the rows are queued once the transaction commits and a
+              background thread writes them as multi-row INSERTs when
+              AUDIT_FLUSH_ROWS are queued or AUDIT_FLUSH_SECONDS have passed;
+              rows still queued are lost if the process dies
+    spool     as buffered, but every row is first appended to a spool file in
+              AUDIT_SPOOL_DIR (AUDIT_SPOOL_FSYNC=1 also fsyncs it, surviving
+              a power loss, not only a crash); files left by a dead process
+              are written at the next startup
+    trigger   nothing is written here, the database trigger logs as before
+
+Rows get their id and created_at when the change is made, so the timeline
+does not depend on when they are flushed, and a spooled row that had already
+been written is skipped (ON CONFLICT (id) DO NOTHING).
+
+A transaction that records appeal changes sets ``oss.app_audit`` with SET
+LOCAL (no startup parameter, so transaction-mode poolers work); with
+migration app_appeal_history.sql applied the trigger skips those changes and
+keeps logging the ones admin pages make directly through Supabase. start()
+checks that the migration is applied and otherwise falls back to trigger
+mode, so history is not written twice.
+
+At most AUDIT_MAX_QUEUED rows are held while writes fail; the oldest are
+dropped beyond that (in spool mode their files are kept for the next start).
+
+Environment:
+    AUDIT_MODE              sync | buffered | spool | trigger (buffered)
+    AUDIT_FLUSH_ROWS        queued rows that trigger a write (200)
+    AUDIT_FLUSH_SECONDS     longest a row waits in the queue (2)
+    AUDIT_MAX_QUEUED        rows held while writes fail (50000)
+    AUDIT_SPOOL_DIR         spool directory (default: <tmp>/oss_dvfu_audit)
+    AUDIT_SPOOL_FSYNC       fsync every spooled row (0)
+"""
+import glob
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SYNC, BUFFERED, SPOOL, TRIGGER = "sync", "buffered", "spool", "trigger"
+
+AUDIT_MODE = os.getenv("AUDIT_MODE", BUFFERED)
+AUDIT_FLUSH_ROWS = int(os.getenv("AUDIT_FLUSH_ROWS", "200"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+AUDIT_MAX_QUEUED = int(os.getenv("AUDIT_MAX_QUEUED", "50000"))
+AUDIT_SPOOL_DIR = os.getenv("AUDIT_SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "oss_dvfu_audit")
+AUDIT_SPOOL_FSYNC = os.getenv("AUDIT_SPOOL_FSYNC", "0") != "0"
+
+if AUDIT_MODE not in (SYNC, BUFFERED, SPOOL, TRIGGER):
+    raise ValueError(f"AUDIT_MODE must be sync, buffered, spool or trigger, not {AUDIT_MODE!r}")
+
+# Field -> (action, description, placeholder for an empty value); the first
+# four are what the trigger logs, with the same wording
+_FIELDS = {
+    "status": ("status_changed", "Статус изменён с {old} на {new}", None),
+    "priority": ("priority_changed", "Приоритет изменён с {old} на {new}", "normal"),
+    "assigned_to": ("assigned", "Ответственный изменён", "не назначен"),
+    "deadline": ("deadline_set", "Дедлайн изменён", "не установлен"),
+    "direction_id": ("direction_changed", "Направление изменено", "не указано"),
+    "tags": ("tags_changed", "Теги изменены", ""),
+}
+
+_SPOOL_NAME = re.compile(r"appeal-history-(\d+)-\d+\.jsonl$")
+
+# Actions on the appeals row itself: those are what the trigger would log too
+_TRIGGER_ACTIONS = {action for action, _, _ in _FIELDS.values()}
+
+# Source of the trigger function; without the oss.app_audit check it would log
+# the backend's changes a second time
+_TRIGGER_SOURCE_SQL = "SELECT prosrc FROM pg_proc WHERE proname = 'log_appeal_change'"
+
+Row = Dict[str, Any]
+
+
+# ==================== Diffs ====================
+
+def _text(value, placeholder: Optional[str]) -> Optional[str]:
+    if value is None:
+        return placeholder
+    if isinstance(value, (list, tuple)):
+        return ", ".join(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _row(appeal_id: UUID, changed_by: Optional[UUID], action: str,
+         old_value: Optional[str], new_value: Optional[str], description: str) -> Row:
+    return {
+        "id": uuid.uuid4(),
+        "appeal_id": appeal_id,
+        "changed_by": changed_by,
+        "action": action,
+        "old_value": old_value,
+        "new_value": new_value,
+        "description": description,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def appeal_changes(appeal, update_data: Dict[str, Any], changed_by: Optional[UUID] = None) -> List[Row]:
+    """History rows for applying ``update_data`` to ``appeal``; call before the change"""
+    rows = []
+    for field, new in update_data.items():
+        if field not in _FIELDS:
+            continue
+        old = getattr(appeal, field)
+        if old == new:
+            continue
+        action, description, placeholder = _FIELDS[field]
+        old_text, new_text = _text(old, placeholder), _text(new, placeholder)
+        rows.append(_row(appeal.id, changed_by, action, old_text, new_text,
+                         description.format(old=old_text, new=new_text)))
+    return rows
+
+
+def comment_added(comment) -> List[Row]:
+    description = "Добавлен внутренний комментарий" if comment.is_internal else "Добавлен комментарий"
+    return [_row(comment.appeal_id, comment.author_id, "comment_added", None, str(comment.id), description)]
+
+
+# ==================== Writing ====================
+
+def _insert(rows: List[Row]) -> None:
+    """One multi-row INSERT (insertmanyvalues) on the primary"""
+    from sqlalchemy.dialects.postgresql import insert
+
+    from database import background_session
+    from models import AppealHistory
+
+    db = background_session("default")
+    try:
+        db.execute(insert(AppealHistory).on_conflict_do_nothing(index_elements=["id"]), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+class HistoryBuffer:
+    """Queue of history rows written by a background thread; thread-safe"""
+
+    def __init__(self, flush_rows: int = AUDIT_FLUSH_ROWS, flush_seconds: float = AUDIT_FLUSH_SECONDS,
+                 max_queued: int = AUDIT_MAX_QUEUED, spool_dir: Optional[str] = None, fsync: bool = False):
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_queued = max_queued
+        self.spool_dir = spool_dir
+        self.fsync = fsync
+        self._cond = threading.Condition()
+        self._rows: List[Row] = []
+        self._oldest_at: Optional[float] = None
+        # Spool files holding the queued rows; removed once the rows are written
+        self._segments: List[str] = []
+        self._spool = None
+        self._spool_seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self._flush_lock = threading.Lock()
+        self.rows_queued = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.rows_replayed = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    # ---- producers ----
+
+    def add(self, rows: List[Row]) -> None:
+        if not rows:
+            return
+        with self._cond:
+            if self.spool_dir is not None:
+                try:
+                    self._append_to_spool(rows)
+                except OSError:
+                    # The change is committed already; keep the rows in memory at least
+                    logger.exception("Could not spool appeal history rows")
+            if not self._rows:
+                self._oldest_at = time.monotonic()
+            self._rows.extend(rows)
+            self.rows_queued += len(rows)
+            if len(self._rows) >= self.flush_rows:
+                self._cond.notify()
+
+    def _append_to_spool(self, rows: List[Row]) -> None:
+        # Caller holds the lock
+        if self._spool is None:
+            self._spool_seq += 1
+            path = os.path.join(self.spool_dir, f"appeal-history-{os.getpid()}-{self._spool_seq}.jsonl")
+            self._spool = open(path, "ab")
+            self._segments.append(path)
+        self._spool.write(b"".join(orjson.dumps(row) + b"\n" for row in rows))
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+    # ---- writer ----
+
+    def flush(self) -> int:
+        """Write everything queued; returns the number of rows written"""
+        with self._flush_lock:
+            with self._cond:
+                rows, self._rows = self._rows, []
+                segments, self._segments = self._segments, []
+                if self._spool is not None:
+                    self._spool.close()
+                    self._spool = None
+                self._oldest_at = None
+            if not rows:
+                return 0
+            try:
+                _insert(rows)
+            except Exception:
+                self.flush_errors += 1
+                self._requeue(rows, segments)
+                raise
+            self.flushes += 1
+            self.rows_written += len(rows)
+        for path in segments:
+            _remove(path)
+        return len(rows)
+
+    def _requeue(self, rows: List[Row], segments: List[str]) -> None:
+        with self._cond:
+            self._rows[:0] = rows
+            self._segments[:0] = segments
+            self._oldest_at = time.monotonic()
+            excess = len(self._rows) - self.max_queued
+            if excess > 0:
+                del self._rows[:excess]
+                self.rows_dropped += excess
+                # The dropped rows are still in these files: leave them for the next start
+                kept = self._segments if self._spool is None else self._segments[:-1]
+                self._segments = self._segments[len(kept):]
+                logger.error(f"Audit queue full, dropped {excess} history rows"
+                             + (f" (kept in {len(kept)} spool files)" if kept else ""))
+
+    def _due(self) -> bool:
+        # Caller holds the lock
+        return bool(self._rows) and (
+            len(self._rows) >= self.flush_rows
+            or time.monotonic() - self._oldest_at >= self.flush_seconds
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._due():
+                    timeout = self.flush_seconds
+                    if self._rows:
+                        timeout = max(0.0, self._oldest_at + self.flush_seconds - time.monotonic())
+                    self._cond.wait(timeout)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not write appeal history, retrying")
+                time.sleep(self.flush_seconds)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="audit", daemon=True)
+        self._thread.start()
+
+    # ---- spool recovery ----
+
+    def replay_spool(self) -> int:
+        """Write the spool files of dead processes (and of this pid's predecessor)"""
+        written = 0
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "appeal-history-*.jsonl"))):
+            match = _SPOOL_NAME.search(path)
+            if match is None or path in self._segments:
+                continue
+            pid = int(match.group(1))
+            if pid != os.getpid() and _alive(pid):
+                continue
+            try:
+                with open(path, "rb") as f:
+                    rows = [_decode(line) for line in f if line.strip()]
+            except FileNotFoundError:
+                continue  # replayed by another worker
+            except ValueError:
+                # A crash can leave the last line half-written; keep the file for a look
+                logger.exception(f"Unreadable audit spool file {path}")
+                continue
+            if rows:
+                _insert(rows)
+            _remove(path)
+            written += len(rows)
+        self.rows_replayed += written
+        return written
+
+    def metric_values(self) -> Dict[str, float]:
+        with self._cond:
+            queued = len(self._rows)
+        return {
+            "queued": queued,
+            "rows_queued": self.rows_queued,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "rows_replayed": self.rows_replayed,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
+
+
+def _decode(line: bytes) -> Row:
+    row = orjson.loads(line)
+    for key in ("id", "appeal_id", "changed_by"):
+        if row[key] is not None:
+            row[key] = UUID(row[key])
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+buffer = HistoryBuffer(
+    spool_dir=AUDIT_SPOOL_DIR if AUDIT_MODE == SPOOL else None,
+    fsync=AUDIT_SPOOL_FSYNC,
+)
+metrics.register("audit", buffer.metric_values)
+
+
+# ==================== Session integration ====================
+
+def record(db: Session, rows: List[Row]) -> None:
+    """
+    Record history rows of the change pending in ``db``; call before
+    db.commit(). In sync mode they are added to the transaction, otherwise
+    queued once it commits (and forgotten if it rolls back).
+    """
+    if not rows or AUDIT_MODE == TRIGGER:
+        return
+    if any(row["action"] in _TRIGGER_ACTIONS for row in rows):
+        connection = db.connection()
+        if connection.dialect.name == "postgresql":
+            # Before the UPDATE is flushed: the trigger skips it
+            connection.exec_driver_sql("SET LOCAL oss.app_audit = on")
+    if AUDIT_MODE == SYNC:
+        from models import AppealHistory
+        db.add_all(AppealHistory(**row) for row in rows)
+    else:
+        db.info.setdefault("audit_rows", []).extend(rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    rows = session.info.pop("audit_rows", None)
+    if rows:
+        buffer.add(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("audit_rows", None)
+
+
+def _trigger_migrated() -> bool:
+    """False if log_appeal_change exists but does not skip the backend's changes yet"""
+    from sqlalchemy import text
+
+    from database import background_session
+
+    db = background_session("default")
+    try:
+        sources = db.execute(text(_TRIGGER_SOURCE_SQL)).scalars().all()
+    finally:
+        db.close()
+    return all("oss.app_audit" in source for source in sources)
+
+
+def start() -> None:
+    """
+    Check the trigger migration, then replay leftover spool files and start
+    the writer in this (worker) process
+    """
+    global AUDIT_MODE
+    if AUDIT_MODE == TRIGGER:
+        return
+    try:
+        migrated = _trigger_migrated()
+    except Exception:
+        logger.exception("Could not check the log_appeal_change trigger, keeping AUDIT_MODE")
+        migrated = True
+    if not migrated:
+        logger.warning(
+            f"AUDIT_MODE={AUDIT_MODE} needs migration app_appeal_history.sql; "
+            "until it is applied the trigger writes the history"
+        )
+        AUDIT_MODE = TRIGGER
+        return
+    if AUDIT_MODE not in (BUFFERED, SPOOL):
+        return
+    if AUDIT_MODE == SPOOL:
+        os.makedirs(AUDIT_SPOOL_DIR, exist_ok=True)
+        try:
+            replayed = buffer.replay_spool()
+            if replayed:
+                logger.info(f"Replayed {replayed} spooled appeal history rows")
+        except Exception:
+            logger.exception("Could not replay the audit spool, files kept for the next start")
+    buffer.start()
+
+
+def stop() -> None:
+    """Write what is still queued (shutdown)"""
+    if AUDIT_MODE not in (BUFFERED, SPOOL):
+        return
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception("Could not write queued appeal history at shutdown")
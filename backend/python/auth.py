@@ -6,7 +6,6 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from uuid import UUID
 import os
-import httpx
 
 # Supabase configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -22,6 +21,8 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     In production, this should verify the token with Supabase.
     For now, it's a placeholder that extracts user_id from token.
     """
+    import httpx
+
     token = credentials.credentials
     
     if not SUPABASE_URL or not SUPABASE_ANON_KEY:
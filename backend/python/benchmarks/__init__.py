@@ -0,0 +1,7 @@
+"""
+Benchmark harness for the OSS DVFU backend
+
+Run modules from backend/python, e.g.:
+    python -m benchmarks.seed --appeals 100000
+    python -m benchmarks.http_load --output results.json
+"""
@@ -0,0 +1,104 @@
+"""
+Memory and time of the deadline scheduler (deadlines.py)
+
+Loads N synthetic open appeals (deadlines spread over the past 30 and the
+next 60 days) into a DeadlineScheduler and reports:
+
+- retained memory after the load (tracemalloc) in total and per appeal, and
+  the peak during the load - the rows as the database cursor would yield
+  them are built beforehand and not counted;
+- load time, one tick moving a day's worth of deadlines to the overdue set,
+  a page of the overdue set (first call sorts, later calls reuse the order)
+  and a burst of track() calls as update_appeal makes them.
+
+No database is needed.
+
+Usage (from backend/python):
+    python -m benchmarks.bench_deadlines
+    python -m benchmarks.bench_deadlines --appeals 100000,500000 --output results/deadlines.json
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+from typing import Dict
+
+from benchmarks.common import environment_info, print_table, save_results
+
+
+def run_case(appeals: int, seed: int = 42) -> Dict:
+    from deadlines import DeadlineScheduler
+
+    rng = random.Random(seed)
+    today = date.today()
+    rows = [
+        (uuid.UUID(int=rng.getrandbits(128)), today + timedelta(days=rng.randint(-30, 60)))
+        for _ in range(appeals)
+    ]
+    scheduler = DeadlineScheduler()
+    scheduler.subscribe(lambda batch: None)
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    scheduler.load(rows, today=today)
+    load_ms = (time.perf_counter() - started) * 1000
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    passed = scheduler.tick(today=today + timedelta(days=1))
+    tick_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    scheduler.overdue_page(0, 100)
+    page_first_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    scheduler.overdue_page(1000, 100)
+    page_ms = (time.perf_counter() - started) * 1000
+
+    updates = min(appeals, 10000)
+    started = time.perf_counter()
+    for appeal_id, deadline in rows[:updates]:
+        scheduler.track(appeal_id, deadline + timedelta(days=7), "in_progress")
+    track_us = (time.perf_counter() - started) / updates * 1_000_000
+
+    return {
+        "appeals": appeals,
+        "retained_mib": round(retained / 1024 / 1024, 2),
+        "peak_mib": round(peak / 1024 / 1024, 2),
+        "bytes_per_appeal": round(retained / appeals),
+        "load_ms": round(load_ms, 1),
+        "tick_ms": round(tick_ms, 2),
+        "tick_passed": len(passed),
+        "overdue": scheduler.overdue_count(),
+        "page_first_ms": round(page_first_ms, 2),
+        "page_ms": round(page_ms, 3),
+        "track_us": round(track_us, 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Memory and time of the deadline scheduler")
+    parser.add_argument("--appeals", default="100000", help="comma-separated open appeal counts")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = [run_case(int(n)) for n in args.appeals.split(",")]
+    print_table(results, [
+        "appeals", "retained_mib", "peak_mib", "bytes_per_appeal", "load_ms",
+        "tick_ms", "tick_passed", "page_first_ms", "page_ms", "track_us",
+    ], "deadline scheduler")
+
+    if args.output:
+        save_results(args.output, {"environment": environment_info(), "results": results})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
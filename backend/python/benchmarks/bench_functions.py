@@ -0,0 +1,279 @@
+"""
+Function-level benchmarks for export and analytics routines
+
+Measures each routine on datasets of increasing size and reports wall time,
+peak Python memory (tracemalloc) and the number of SQL statements executed,
+so the scaling curve of every function is visible and regressions are caught
+before they ship.
+
+Datasets come from the benchmark database (see benchmarks.seed):
+- export_csv / export_excel: the N most recent appeals loaded via crud.get_appeals;
+  only the export call itself is measured, so lazy loads it triggers show up
+  in the query count
+- detailed_stats / appeals_by_school: start_date chosen so that ~N appeals fall
+  into the period
+- normalize_school_name: N synthetic institute strings (no database)
+
+Usage (from backend/python):
+    python -m benchmarks.bench_functions --sizes 1000,10000,50000 --output results/functions.json
+    python -m benchmarks.bench_functions --functions normalize_school_name --sizes 100000
+    python -m benchmarks.bench_functions --baseline results/functions.json
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, text
+
+from benchmarks.common import (
+    compare_with_baseline, environment_info, load_results, print_table, save_results,
+)
+
+
+class QueryCounter:
+    """Counts statements sent to the database while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        return False
+
+
+def measure(fn: Callable[[], object], repeat: int, engine=None) -> Dict:
+    """
+    Best-of-``repeat`` wall time of an untraced run, then a single run under
+    tracemalloc for peak memory and query count.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    gc.collect()
+    queries = None
+    tracemalloc.start()
+    try:
+        if engine is not None:
+            with QueryCounter(engine) as counter:
+                fn()
+            queries = counter.count
+        else:
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "wall_ms": round(min(timings), 3),
+        "wall_ms_mean": round(sum(timings) / len(timings), 3),
+        "peak_kib": round(peak / 1024, 1),
+        "queries": queries,
+    }
+
+
+# ---------------------------------------------------------------- datasets
+
+def synthetic_institutes(size: int, seed: int = 42) -> List[Optional[str]]:
+    from analytics import SCHOOL_CODES, SCHOOLS_MAPPING
+
+    rng = random.Random(seed)
+    pool: List[Optional[str]] = []
+    pool.extend(SCHOOL_CODES)
+    pool.extend(SCHOOLS_MAPPING.values())
+    pool.extend(f"  {code.lower()} " for code in SCHOOL_CODES)
+    pool.extend(["Неизвестный институт", "ДВФУ", "", None])
+    return [rng.choice(pool) for _ in range(size)]
+
+
+def start_date_for_rows(db, rows: int):
+    """Earliest date such that roughly ``rows`` appeals were created since then"""
+    value = db.execute(
+        text("SELECT created_at::date FROM appeals ORDER BY created_at DESC OFFSET :offset LIMIT 1"),
+        {"offset": max(rows - 1, 0)},
+    ).scalar()
+    if value is None:
+        value = db.execute(text("SELECT min(created_at)::date FROM appeals")).scalar()
+    return value
+
+
+# ---------------------------------------------------------------- cases
+
+def case_export_csv(size: int, repeat: int) -> Dict:
+    import crud
+    import export
+    from database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        appeals = crud.get_appeals(db, skip=0, limit=size)
+
+        def run():
+            # Drop identity map state so each run sees the same lazy loads
+            for appeal in appeals:
+                db.expire(appeal, ["direction"])
+            export.export_appeals_to_csv(db, appeals, include_internal=True)
+
+        result = measure(run, repeat, engine)
+        result["rows"] = len(appeals)
+        return result
+    finally:
+        db.close()
+
+
+def case_export_excel(size: int, repeat: int) -> Dict:
+    import crud
+    import export
+    from database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        appeals = crud.get_appeals(db, skip=0, limit=size)
+
+        def run():
+            for appeal in appeals:
+                db.expire(appeal, ["direction"])
+            export.export_appeals_to_excel(db, appeals, include_internal=True)
+
+        result = measure(run, repeat, engine)
+        result["rows"] = len(appeals)
+        return result
+    finally:
+        db.close()
+
+
+def case_detailed_stats(size: int, repeat: int) -> Dict:
+    import analytics
+    from database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        start_date = start_date_for_rows(db, size)
+
+        def run():
+            db.expunge_all()
+            analytics.get_detailed_appeal_stats(db, start_date=start_date)
+
+        result = measure(run, repeat, engine)
+        result["start_date"] = start_date.isoformat() if start_date else None
+        return result
+    finally:
+        db.close()
+
+
+def case_appeals_by_school(size: int, repeat: int) -> Dict:
+    import analytics
+    from database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        start_date = start_date_for_rows(db, size)
+
+        def run():
+            db.expunge_all()
+            analytics.get_appeals_by_school(db, start_date=start_date)
+
+        result = measure(run, repeat, engine)
+        result["start_date"] = start_date.isoformat() if start_date else None
+        return result
+    finally:
+        db.close()
+
+
+def case_normalize_school_name(size: int, repeat: int) -> Dict:
+    import analytics
+
+    values = synthetic_institutes(size)
+
+    def run():
+        normalize = analytics.normalize_school_name
+        for value in values:
+            normalize(value)
+
+    result = measure(run, repeat)
+    result["rows"] = size
+    return result
+
+
+CASES: Dict[str, Callable[[int, int], Dict]] = {
+    "export_csv": case_export_csv,
+    "export_excel": case_export_excel,
+    "detailed_stats": case_detailed_stats,
+    "appeals_by_school": case_appeals_by_school,
+    "normalize_school_name": case_normalize_school_name,
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Function-level benchmarks for export and analytics")
+    parser.add_argument("--functions", help=f"comma-separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="comma-separated dataset sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is reported)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previous results JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed relative regression vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.functions.split(",")] if args.functions else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown functions: {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    results: Dict[str, Dict] = {}
+    for name in names:
+        case = CASES[name]
+        for size in sizes:
+            key = f"{name}@{size}"
+            results[key] = case(size, args.repeat)
+            r = results[key]
+            print(f"{key:32s} {r['wall_ms']:10.2f} ms  peak {r['peak_kib']:10.1f} KiB  queries {r['queries']}")
+
+    output = {"meta": {**environment_info(), "repeat": args.repeat, "sizes": sizes}, "results": results}
+    if args.output:
+        save_results(args.output, output)
+        print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        baseline = load_results(args.baseline).get("results", {})
+        regressions = compare_with_baseline(
+            results, baseline, lower_is_better=["wall_ms", "peak_kib", "queries"], tolerance=args.max_regression
+        )
+        rows = [
+            {
+                "case": key,
+                "wall_ms": r["wall_ms"],
+                "base_wall_ms": baseline.get(key, {}).get("wall_ms", "-"),
+                "queries": r["queries"],
+                "base_queries": baseline.get(key, {}).get("queries", "-"),
+            }
+            for key, r in results.items()
+        ]
+        print_table(rows, ["case", "wall_ms", "base_wall_ms", "queries", "base_queries"], title="Baseline comparison")
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Round trips and latency of pool liveness strategies (DB_LIVENESS)
+
+Runs the same short read "requests" (session checkout, crud.directions_query,
+close) against two engines built like database.engine:
+
+- pre_ping:   pool_pre_ping=True, one SELECT 1 per checkout
+- background: no pre-ping; pool_liveness.LivenessChecker pings idle
+              connections every --interval seconds, RetryingSession retries
+              the first statement after a disconnect
+
+and reports statements, pings and round trips per request plus latency.
+With --kill-idle the pooled backends are terminated (pg_terminate_backend)
+halfway through, to show that both strategies recover without failed requests.
+
+Usage (from backend/python, against the benchmark database):
+    python -m benchmarks.bench_liveness
+    python -m benchmarks.bench_liveness --requests 5000 --concurrency 8 --kill-idle --output results/liveness.json
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from benchmarks.bench_functions import QueryCounter
+from benchmarks.common import environment_info, latency_summary, print_table, save_results
+
+
+def build_engine(mode: str, pool_size: int):
+    import database
+    import pool_metrics
+
+    return create_engine(
+        database.DATABASE_URL,
+        pool_pre_ping=(mode == "pre_ping"),
+        poolclass=pool_metrics.TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+        connect_args={"application_name": f"oss_bench_liveness_{mode}"},
+    )
+
+
+def count_pings(engine) -> List[int]:
+    """Wrap the dialect's ping so every liveness round trip is counted"""
+    counter = [0]
+    original = engine.dialect.do_ping
+
+    def do_ping(dbapi_connection):
+        counter[0] += 1
+        return original(dbapi_connection)
+
+    engine.dialect.do_ping = do_ping
+    return counter
+
+
+def kill_idle_backends(mode: str) -> int:
+    import database
+
+    admin = create_engine(database.DATABASE_URL, poolclass=NullPool)
+    with admin.connect() as conn:
+        killed = conn.execute(text(
+            "SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity "
+            "WHERE application_name = :name AND state = 'idle'"
+        ), {"name": f"oss_bench_liveness_{mode}"}).scalar()
+    admin.dispose()
+    return killed
+
+
+def run_mode(mode: str, args) -> Dict:
+    import crud
+    import database
+    import pool_liveness
+
+    engine = build_engine(mode, args.concurrency)
+    pings = count_pings(engine)
+    Session = sessionmaker(class_=database.RetryingSession, autocommit=False, autoflush=False, bind=engine)
+    checker = None
+    if mode == "background":
+        checker = pool_liveness.LivenessChecker(engine, f"bench_{mode}", args.interval)
+        checker.start()
+
+    errors = [0]
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def request():
+        started = time.perf_counter()
+        db = Session()
+        try:
+            crud.directions_query(db, limit=20).all()
+        except Exception:
+            with lock:
+                errors[0] += 1
+        finally:
+            db.close()
+        with lock:
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    # Warm up: fill the pool
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(lambda _: request(), range(args.concurrency * 4)))
+    latencies.clear()
+    pings[0] = 0
+
+    killed = 0
+    with QueryCounter(engine) as statements:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            half = args.requests // 2
+            list(pool.map(lambda _: request(), range(half)))
+            if args.kill_idle:
+                killed = kill_idle_backends(mode)
+                # Idle period in which the background checker may run
+                time.sleep(args.idle)
+            list(pool.map(lambda _: request(), range(args.requests - half)))
+        elapsed = time.perf_counter() - started
+
+    if checker is not None:
+        checker.stop()
+    engine.dispose()
+
+    summary = latency_summary(latencies)
+    return {
+        "requests": args.requests,
+        "statements": statements.count,
+        "pings": pings[0],
+        "round_trips_per_request": round((statements.count + pings[0]) / args.requests, 3),
+        "rps": round(args.requests / elapsed, 1),
+        "killed_backends": killed,
+        "errors": errors[0],
+        **summary,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare pre-ping and background liveness checks")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=1.0, help="background check interval, seconds")
+    parser.add_argument("--kill-idle", action="store_true", help="terminate pooled backends halfway through")
+    parser.add_argument("--idle", type=float, default=0.0, help="pause after --kill-idle, seconds")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {mode: run_mode(mode, args) for mode in ("pre_ping", "background")}
+    rows = [{"mode": mode, **values} for mode, values in results.items()]
+    print_table(
+        rows,
+        ["mode", "requests", "statements", "pings", "round_trips_per_request", "p50_ms", "p95_ms", "rps", "errors"],
+        "Pool liveness strategies",
+    )
+    saved = results["pre_ping"]["pings"] - results["background"]["pings"]
+    print(f"\nRound trips saved by background checks: {saved} "
+          f"({saved / args.requests:.2f} per request)")
+
+    if args.output:
+        save_results(args.output, {"meta": environment_info(), "modes": results})
+        print(f"Results saved to {args.output}")
+    return 1 if any(r["errors"] for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Python overhead of the hot crud point lookups
+
+Compares the former per-call ``db.query(...).filter(...).first()`` form with
+the pre-built ``select()`` statements now used by crud.get_appeal,
+get_appeal_by_token, get_content_by_slug and get_user_roles.
+(get_direction_by_slug no longer queries: see directions_registry.py.)
+
+Two measurements per lookup:
+- construct: building the statement and its cache key - the Python work
+  done on every call before SQLAlchemy finds the compiled SQL in its cache.
+  Needs no database.
+- execute: the complete lookup against the benchmark database (round trip
+  included), skipped with --no-db.
+
+Usage (from backend/python):
+    python -m benchmarks.bench_lookups --no-db
+    python -m benchmarks.bench_lookups --iterations 5000 --output results/lookups.json
+"""
+import argparse
+import sys
+import time
+import uuid
+from typing import Callable, Dict
+
+from benchmarks.common import environment_info, print_table, save_results
+
+
+def legacy_queries() -> Dict[str, Callable]:
+    """The lookups as they were written before: a new Query per call"""
+    from models import Appeal, Content, UserRole
+
+    return {
+        "get_appeal": lambda db, v: db.query(Appeal).filter(Appeal.id == v).first(),
+        "get_appeal_by_token": lambda db, v: db.query(Appeal).filter(Appeal.public_token == v).first(),
+        "get_content_by_slug": lambda db, v: db.query(Content).filter(Content.slug == v).first(),
+        "get_user_roles": lambda db, v: db.query(UserRole).filter(UserRole.user_id == v).all(),
+    }
+
+
+def legacy_statements() -> Dict[str, Callable]:
+    from models import Appeal, Content, UserRole
+    from sqlalchemy.orm import Query
+
+    # Query(...) without a session builds the same statement db.query() does
+    return {
+        "get_appeal": lambda v: Query(Appeal).filter(Appeal.id == v).limit(1).statement,
+        "get_appeal_by_token": lambda v: Query(Appeal).filter(Appeal.public_token == v).limit(1).statement,
+        "get_content_by_slug": lambda v: Query(Content).filter(Content.slug == v).limit(1).statement,
+        "get_user_roles": lambda v: Query(UserRole).filter(UserRole.user_id == v).statement,
+    }
+
+
+def prebuilt_statements() -> Dict[str, object]:
+    import crud
+
+    return {
+        "get_appeal": crud._APPEAL_BY_ID,
+        "get_appeal_by_token": crud._APPEAL_BY_TOKEN,
+        "get_content_by_slug": crud._CONTENT_BY_SLUG,
+        "get_user_roles": crud._USER_ROLES,
+    }
+
+
+def _per_call_us(fn: Callable[[], object], iterations: int) -> float:
+    for _ in range(min(200, iterations)):
+        fn()
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1_000_000
+
+
+def measure_construct(iterations: int) -> Dict[str, Dict]:
+    legacy = legacy_statements()
+    prebuilt = prebuilt_statements()
+    value = uuid.uuid4()
+    results = {}
+    for name, build in legacy.items():
+        stmt = prebuilt[name]
+        old = _per_call_us(lambda: build(value)._generate_cache_key(), iterations)
+        new = _per_call_us(lambda: stmt._generate_cache_key(), iterations)
+        results[name] = {"legacy_us": round(old, 2), "prebuilt_us": round(new, 2)}
+    return results
+
+
+def measure_execute(iterations: int) -> Dict[str, Dict]:
+    import crud
+    from benchmarks.http_load import Samples
+    from database import SessionLocal
+
+    samples = Samples.load(limit=100)
+    values = {
+        "get_appeal": uuid.UUID(samples.appeal_ids[0]),
+        "get_appeal_by_token": uuid.UUID(samples.tokens[0]),
+        "get_content_by_slug": samples.content_slugs[0],
+        "get_user_roles": uuid.UUID(samples.assignees[0]),
+    }
+    legacy = legacy_queries()
+    results = {}
+    db = SessionLocal()
+    try:
+        for name, value in values.items():
+            current = getattr(crud, name)
+            old = legacy[name]
+            # expunge_all keeps the identity map from turning lookups into no-ops
+            old_us = _per_call_us(lambda: (old(db, value), db.expunge_all()), iterations)
+            new_us = _per_call_us(lambda: (current(db, value), db.expunge_all()), iterations)
+            results[name] = {"legacy_us": round(old_us, 2), "prebuilt_us": round(new_us, 2)}
+    finally:
+        db.close()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-lookup overhead of crud point lookups")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--no-db", action="store_true", help="only measure statement construction")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {"construct": measure_construct(args.iterations * 10)}
+    if not args.no_db:
+        results["execute"] = measure_execute(args.iterations)
+
+    for kind, values in results.items():
+        rows = [
+            {"lookup": name, **v, "saved_us": round(v["legacy_us"] - v["prebuilt_us"], 2)}
+            for name, v in values.items()
+        ]
+        print_table(rows, ["lookup", "legacy_us", "prebuilt_us", "saved_us"], f"{kind} (µs per call)")
+
+    if args.output:
+        save_results(args.output, {"meta": environment_info(), **results})
+        print(f"\nResults saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Per-check overhead of rate limit storages and cross-process correctness
+
+For every storage URI measures the latency of one FixedWindowRateLimiter.hit()
+(what slowapi does per decorated request) in microseconds, then hammers a
+single key from several processes at once and verifies that no increment was
+lost, i.e. that the limit really is shared between workers.
+
+Usage (from backend/python):
+    python -m benchmarks.bench_ratelimit
+    python -m benchmarks.bench_ratelimit --storages memory://,sqlite:///tmp/rl.db,redis://localhost:6379/15
+    python -m benchmarks.bench_ratelimit --processes 8 --output results/ratelimit.json
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+from benchmarks.common import environment_info, latency_summary, save_results
+
+
+def _limiter(uri: str):
+    from limits.storage import storage_from_string
+    from limits.strategies import FixedWindowRateLimiter
+    import ratelimit_storage  # noqa: F401
+
+    storage = storage_from_string(uri)
+    return storage, FixedWindowRateLimiter(storage)
+
+
+def measure_overhead(uri: str, checks: int) -> Dict:
+    from limits import parse
+
+    storage, limiter = _limiter(uri)
+    item = parse("1000000/minute")
+    prefix = uuid.uuid4().hex
+    # Mix of hot keys (same client hitting repeatedly) and distinct clients
+    keys = [f"{prefix}:{i % 200}" for i in range(checks)]
+
+    for key in keys[:100]:
+        limiter.hit(item, key)
+
+    latencies_us: List[float] = []
+    for key in keys:
+        started = time.perf_counter()
+        limiter.hit(item, key)
+        latencies_us.append((time.perf_counter() - started) * 1_000_000)
+
+    summary = latency_summary(latencies_us)
+    # latency_summary labels values as ms; these are microseconds
+    return {key.replace("_ms", "_us"): value for key, value in summary.items()}
+
+
+def _worker(uri: str, key: str, hits: int, start_at: float, queue) -> None:
+    from limits import parse
+
+    _, limiter = _limiter(uri)
+    item = parse("100000000/hour")
+    while time.time() < start_at:
+        time.sleep(0.001)
+    for _ in range(hits):
+        limiter.hit(item, key)
+    queue.put(hits)
+
+
+def measure_shared(uri: str, processes: int, hits: int) -> Dict:
+    from limits import parse
+
+    if uri.startswith("memory://"):
+        return {"skipped": "memory storage is per-process by design"}
+
+    key = f"shared:{uuid.uuid4().hex}"
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    start_at = time.time() + 1.0
+    workers = [ctx.Process(target=_worker, args=(uri, key, hits, start_at, queue)) for _ in range(processes)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.time() - start_at
+    done = sum(queue.get() for _ in workers)
+
+    storage, _ = _limiter(uri)
+    counted = storage.get(parse("100000000/hour").key_for(key))
+    return {
+        "processes": processes,
+        "hits": done,
+        "counted": counted,
+        "lost": done - counted,
+        "hits_per_second": round(done / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rate limit storage overhead benchmark")
+    parser.add_argument("--storages", default="memory://,sqlite:///tmp/oss_bench_ratelimit.db",
+                        help="comma-separated storage URIs")
+    parser.add_argument("--checks", type=int, default=20000, help="checks per storage")
+    parser.add_argument("--processes", type=int, default=4, help="processes for the shared-counter test")
+    parser.add_argument("--hits", type=int, default=2000, help="hits per process")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Dict] = {}
+    exit_code = 0
+    for uri in [u.strip() for u in args.storages.split(",") if u.strip()]:
+        overhead = measure_overhead(uri, args.checks)
+        shared = measure_shared(uri, args.processes, args.hits)
+        results[uri] = {"overhead": overhead, "shared": shared}
+        print(f"{uri:45s} p50 {overhead['p50_us']:8.1f} us  p99 {overhead['p99_us']:8.1f} us  "
+              f"mean {overhead['mean_us']:8.1f} us")
+        if "lost" in shared:
+            print(f"{'':45s} {shared['processes']} processes: {shared['hits_per_second']} hits/s, "
+                  f"lost increments: {shared['lost']}")
+            if shared["lost"]:
+                exit_code = 1
+
+    if args.output:
+        save_results(args.output, {"meta": environment_info(), "storages": results})
+        print(f"\nResults saved to {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+EXPLAIN-based check that backend queries use indexes on large tables
+
+Runs the real functions from crud, search and analytics against the seeded
+benchmark database, captures every SQL statement they send, EXPLAINs each one
+with the same parameters and fails if any plan contains a Seq Scan over a
+large table (reltuples >= --min-rows). Small tables (directions, content on a
+fresh install) are skipped: a sequential scan is the right plan for them.
+
+Cases marked ``allow_seq_scan`` aggregate over most of the table (e.g. total
+counts without a period), where a full scan is expected.
+
+Usage (from backend/python, after benchmarks.seed and
+database/migrations/add_query_indexes.sql):
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --min-rows 50000 --verbose
+
+Exit code 1 if any query falls back to a sequential scan.
+"""
+import argparse
+import json
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, NamedTuple
+
+from sqlalchemy import event, text
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable
+    allow_seq_scan: bool = False
+
+
+def build_cases(samples: Dict) -> List[Case]:
+    import analytics
+    import crud
+    import search
+
+    direction_id = samples["direction_id"]
+    appeal_id = samples["appeal_id"]
+    token = samples["public_token"]
+    assignee = samples["assignee"]
+    month_ago = date.today() - timedelta(days=30)
+
+    return [
+        # crud: appeal lists
+        Case("crud.get_appeals", lambda db: crud.get_appeals(db)),
+        Case("crud.get_appeals[direction]", lambda db: crud.get_appeals(db, direction_id=direction_id)),
+        Case("crud.get_appeals[status]", lambda db: crud.get_appeals(db, status="new")),
+        Case("crud.get_appeals[direction+status]",
+             lambda db: crud.get_appeals(db, direction_id=direction_id, status="in_progress")),
+        Case("crud.get_appeals[priority]", lambda db: crud.get_appeals(db, priority="urgent")),
+        Case("crud.get_appeals[assigned_to]", lambda db: crud.get_appeals(db, assigned_to=assignee)),
+        Case("crud.get_appeals_by_priority", lambda db: crud.get_appeals_by_priority(db, "high")),
+        Case("crud.get_appeals_by_assigned", lambda db: crud.get_appeals_by_assigned(db, assignee)),
+        Case("crud.get_overdue_appeals", lambda db: crud.get_overdue_appeals(db)),
+        # crud: point lookups
+        Case("crud.get_appeal", lambda db: crud.get_appeal(db, appeal_id)),
+        Case("crud.get_appeal_by_token", lambda db: crud.get_appeal_by_token(db, token)),
+        Case("crud.get_appeal_comments", lambda db: crud.get_appeal_comments(db, appeal_id)),
+        Case("crud.get_appeal_comments[cursor]",
+             lambda db: crud.get_appeal_comments(db, appeal_id, after=(datetime(2000, 1, 1, tzinfo=timezone.utc), appeal_id))),
+        Case("crud.get_appeal_counters", lambda db: crud.get_appeal_counters(db, samples["appeal_ids"])),
+        Case("crud.get_appeal_attachments", lambda db: crud.get_appeal_attachments(db, appeal_id)),
+        # crud: statistics over the whole table
+        Case("crud.get_appeal_stats", lambda db: crud.get_appeal_stats(db), allow_seq_scan=True),
+        # search
+        Case("search.search_appeals", lambda db: search.search_appeals(db, "общага")),
+        Case("search.search_appeals[direction+status]",
+             lambda db: search.search_appeals(db, "ремонт", direction_id=direction_id, status="new")),
+        Case("search.search_appeals_by_tags", lambda db: search.search_appeals_by_tags(db, ["срочно"])),
+        Case("search.search_content", lambda db: search.search_content(db, "публикации")),
+        # analytics
+        Case("analytics.get_detailed_appeal_stats[last 30 days]",
+             lambda db: analytics.get_detailed_appeal_stats(db, start_date=month_ago)),
+        Case("analytics.get_detailed_appeal_stats[all time]",
+             lambda db: analytics.get_detailed_appeal_stats(db), allow_seq_scan=True),
+        Case("analytics.get_user_performance_stats",
+             lambda db: analytics.get_user_performance_stats(db, assignee)),
+        Case("analytics.get_appeals_by_school[last 30 days]",
+             lambda db: analytics.get_appeals_by_school(db, start_date=month_ago)),
+        Case("analytics.get_appeals_by_school[school]",
+             lambda db: analytics.get_appeals_by_school(db, school_code="ИМКТ", start_date=month_ago)),
+        Case("analytics.get_appeals_by_school[all time]",
+             lambda db: analytics.get_appeals_by_school(db), allow_seq_scan=True),
+    ]
+
+
+def load_samples(db) -> Dict:
+    row = db.execute(text(
+        "SELECT id, public_token, direction_id FROM appeals "
+        "WHERE direction_id IS NOT NULL ORDER BY created_at DESC LIMIT 1"
+    )).first()
+    if row is None:
+        raise SystemExit("No appeals found - seed the database first: python -m benchmarks.seed")
+    appeal_ids = [r[0] for r in db.execute(text(
+        "SELECT id FROM appeals ORDER BY created_at DESC LIMIT 50"
+    )).all()]
+    assignee = db.execute(text(
+        "SELECT assigned_to FROM appeals WHERE assigned_to IS NOT NULL LIMIT 1"
+    )).scalar()
+    return {
+        "appeal_id": row[0],
+        "public_token": row[1],
+        "direction_id": row[2],
+        "assignee": assignee,
+        "appeal_ids": appeal_ids,
+    }
+
+
+def large_tables(db, min_rows: int) -> Dict[str, int]:
+    rows = db.execute(text(
+        "SELECT relname, reltuples::bigint FROM pg_class "
+        "WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace AND reltuples >= :min_rows"
+    ), {"min_rows": min_rows}).all()
+    return {name: count for name, count in rows}
+
+
+def iter_nodes(plan: Dict) -> Iterator[Dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_nodes(child)
+
+
+def capture_statements(engine, db, fn) -> List:
+    """Run ``fn(db)`` and return every (statement, parameters) it executed"""
+    captured = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        fn(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        db.rollback()
+        db.expunge_all()
+    return captured
+
+
+def explain(engine, statement: str, parameters) -> Dict:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]
+    finally:
+        raw.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fail if backend queries seq-scan large tables")
+    parser.add_argument("--min-rows", type=int, default=10000,
+                        help="tables with at least this many rows count as large")
+    parser.add_argument("--cases", help="comma-separated subset of case names")
+    parser.add_argument("--verbose", action="store_true", help="print every statement and its scan nodes")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        samples = load_samples(db)
+        large = large_tables(db, args.min_rows)
+        if not large:
+            raise SystemExit(f"No table has >= {args.min_rows} rows - seed more data or lower --min-rows")
+        print(f"Large tables: {', '.join(f'{t} (~{n})' for t, n in sorted(large.items()))}\n")
+
+        cases = build_cases(samples)
+        if args.cases:
+            wanted = {c.strip() for c in args.cases.split(",")}
+            cases = [c for c in cases if c.name in wanted]
+
+        failures = []
+        for case in cases:
+            statements = capture_statements(engine, db, case.run)
+            seq_scans = []
+            for statement, parameters in statements:
+                plan = explain(engine, statement, parameters)
+                nodes = list(iter_nodes(plan))
+                scans = [n for n in nodes if n.get("Node Type") == "Seq Scan" and n.get("Relation Name") in large]
+                seq_scans.extend((statement, n["Relation Name"]) for n in scans)
+                if args.verbose:
+                    kinds = sorted({
+                        f"{n['Node Type']}({n.get('Index Name') or n.get('Relation Name')})"
+                        for n in nodes if "Relation Name" in n or "Index Name" in n
+                    })
+                    print(f"    {' '.join(statement.split())[:140]}\n      -> {', '.join(kinds)}")
+
+            if seq_scans and not case.allow_seq_scan:
+                failures.append(case.name)
+                print(f"FAIL  {case.name}")
+                for statement, relation in seq_scans:
+                    print(f"      Seq Scan on {relation}: {' '.join(statement.split())[:160]}")
+            else:
+                marker = "ok*" if seq_scans else "ok"
+                print(f"{marker:5s} {case.name} ({len(statements)} queries)")
+
+        print()
+        if failures:
+            print(f"{len(failures)} case(s) fall back to sequential scans: {', '.join(failures)}")
+            return 1
+        print("All queries use indexes on large tables (ok* = full scan allowed for this case)")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
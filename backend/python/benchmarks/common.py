@@ -0,0 +1,105 @@
+"""
+Shared helpers for benchmarks: percentiles, result files and baseline comparison
+"""
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Percentile with linear interpolation between closest ranks
+    (same definition as numpy's default)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    weight = rank - lower
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * weight
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of latencies (milliseconds)"""
+    if not latencies_ms:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3),
+        "max_ms": round(max(latencies_ms), 3),
+    }
+
+
+def environment_info() -> Dict:
+    """Describe where the benchmark ran, so results are comparable"""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_results(path: str, results: Dict) -> None:
+    """Write results as pretty-printed JSON"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_with_baseline(
+    current: Dict[str, Dict],
+    baseline: Dict[str, Dict],
+    lower_is_better: Sequence[str],
+    higher_is_better: Sequence[str] = (),
+    tolerance: float = 0.2,
+) -> List[str]:
+    """
+    Compare per-case metrics against a stored baseline.
+
+    Both arguments map a case name (endpoint, function@size, ...) to a dict of
+    metrics. Returns a list of human-readable regressions; an empty list means
+    every shared case is within ``tolerance`` (0.2 = 20%) of the baseline.
+    Cases missing from either side are ignored.
+    """
+    regressions = []
+    for name, metrics in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in lower_is_better:
+            old, new = base.get(key), metrics.get(key)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append(f"{name}: {key} {old} -> {new} (+{(new / old - 1) * 100:.1f}%)")
+        for key in higher_is_better:
+            old, new = base.get(key), metrics.get(key)
+            if old and new is not None and new < old * (1 - tolerance):
+                regressions.append(f"{name}: {key} {old} -> {new} (-{(1 - new / old) * 100:.1f}%)")
+    return regressions
+
+
+def print_table(rows: List[Dict], columns: Sequence[str], title: Optional[str] = None) -> None:
+    """Print a simple aligned text table"""
+    if title:
+        print(f"\n{title}")
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) if rows else len(c) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).ljust(widths[c]) for c in columns))
@@ -0,0 +1,254 @@
+"""
+End-to-end HTTP load test for the key /api/... endpoints
+
+By default requests are driven in-process against main.app through an ASGI
+transport (no network, no uvicorn), which isolates application + database
+cost. With --base-url the same scenario runs against a live server instead.
+
+Usage (from backend/python, database seeded with benchmarks.seed):
+    python -m benchmarks.http_load --requests 500 --concurrency 16 --output results.json
+    python -m benchmarks.http_load --baseline baseline.json --max-regression 0.2
+    python -m benchmarks.http_load --endpoints appeals_list,content_by_slug
+
+Output JSON: {"meta": {...}, "endpoints": {name: {rps, p50_ms, p95_ms, p99_ms, ...}}}.
+With --baseline the exit code is 1 if p95 latency or throughput of any
+endpoint regressed by more than --max-regression.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks.common import (
+    compare_with_baseline, environment_info, latency_summary,
+    load_results, print_table, save_results,
+)
+
+
+class Samples:
+    """Real identifiers taken from the seeded database"""
+
+    def __init__(self, appeal_ids, tokens, direction_ids, content_slugs, assignees):
+        self.appeal_ids = appeal_ids
+        self.tokens = tokens
+        self.direction_ids = direction_ids
+        self.content_slugs = content_slugs
+        self.assignees = assignees
+
+    @classmethod
+    def load(cls, limit: int = 1000) -> "Samples":
+        from database import engine
+
+        with engine.connect() as conn:
+            appeals = conn.execute(
+                text("SELECT id, public_token FROM appeals ORDER BY random() LIMIT :limit"),
+                {"limit": limit},
+            ).all()
+            direction_ids = [str(r[0]) for r in conn.execute(text("SELECT id FROM directions")).all()]
+            slugs = [
+                r[0] for r in conn.execute(
+                    text("SELECT slug FROM content WHERE status = 'published' ORDER BY random() LIMIT :limit"),
+                    {"limit": limit},
+                ).all()
+            ]
+            assignees = [
+                str(r[0]) for r in conn.execute(
+                    text("SELECT DISTINCT assigned_to FROM appeals WHERE assigned_to IS NOT NULL LIMIT 50")
+                ).all()
+            ]
+        if not appeals:
+            raise SystemExit("No appeals found - seed the database first: python -m benchmarks.seed")
+        return cls(
+            appeal_ids=[str(r[0]) for r in appeals],
+            tokens=[str(r[1]) for r in appeals],
+            direction_ids=direction_ids,
+            content_slugs=slugs or ["missing-slug"],
+            assignees=assignees or [str(r[0]) for r in appeals[:1]],
+        )
+
+
+def build_scenarios(s: Samples) -> Dict[str, Callable[[random.Random], str]]:
+    """Endpoint name -> function producing a request path"""
+    return {
+        "health": lambda r: "/health",
+        "directions_list": lambda r: "/api/directions",
+        "appeals_list": lambda r: "/api/appeals?limit=50",
+        "appeals_list_summary": lambda r: "/api/appeals?limit=50&fields=summary",
+        "appeals_by_direction_status": lambda r: (
+            f"/api/appeals?direction_id={r.choice(s.direction_ids)}"
+            f"&status={r.choice(['new', 'in_progress', 'waiting', 'closed'])}&limit=50"
+        ),
+        "appeals_by_assignee": lambda r: f"/api/appeals?assigned_to={r.choice(s.assignees)}&limit=50",
+        "appeals_overdue": lambda r: "/api/appeals?overdue_only=true&limit=50",
+        "appeal_by_id": lambda r: f"/api/appeals/{r.choice(s.appeal_ids)}",
+        "appeal_full": lambda r: f"/api/appeals/{r.choice(s.appeal_ids)}/full",
+        "appeal_by_token": lambda r: f"/api/appeals/token/{r.choice(s.tokens)}",
+        "appeal_comments": lambda r: f"/api/appeals/{r.choice(s.appeal_ids)}/comments",
+        "appeal_attachments": lambda r: f"/api/appeals/{r.choice(s.appeal_ids)}/attachments",
+        "stats_summary": lambda r: "/api/appeals/stats/summary",
+        "stats_detailed": lambda r: "/api/appeals/stats/detailed",
+        "search_appeals": lambda r: f"/api/search/appeals?q={r.choice(['общага', 'стипенд', 'ремонт', 'экзамен'])}&limit=50",
+        "content_list": lambda r: "/api/content?limit=20",
+        "content_list_summary": lambda r: "/api/content?limit=20&fields=summary",
+        "content_by_slug": lambda r: f"/api/content/slug/{r.choice(s.content_slugs)}",
+        "schools_analytics": lambda r: "/api/analytics/schools",
+    }
+
+
+# Heavy endpoints are opt-in: they are useful to track but dominate total run time
+DEFAULT_EXCLUDED = {"stats_detailed", "schools_analytics"}
+
+
+def make_client(base_url: Optional[str]) -> httpx.AsyncClient:
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=120.0)
+
+    import main
+
+    # Per-IP rate limits would turn an in-process load test into a 429 test
+    main.limiter.enabled = False
+    transport = httpx.ASGITransport(app=main.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0)
+
+
+async def run_endpoint(
+    client: httpx.AsyncClient,
+    path_for: Callable[[random.Random], str],
+    requests: int,
+    concurrency: int,
+    seed: int,
+) -> Dict:
+    rng = random.Random(seed)
+    paths = [path_for(rng) for _ in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+    status_codes: Dict[str, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                code = str(response.status_code)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                code = "error"
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+            status_codes[code] = status_codes.get(code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "status_codes": status_codes,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        **latency_summary(latencies),
+    }
+
+
+async def run(args) -> Dict:
+    samples = Samples.load()
+    scenarios = build_scenarios(samples)
+    if args.endpoints:
+        names = [n.strip() for n in args.endpoints.split(",") if n.strip()]
+        unknown = [n for n in names if n not in scenarios]
+        if unknown:
+            raise SystemExit(f"Unknown endpoints: {', '.join(unknown)}. Available: {', '.join(scenarios)}")
+    else:
+        names = [n for n in scenarios if n not in DEFAULT_EXCLUDED]
+
+    results: Dict[str, Dict] = {}
+    async with make_client(args.base_url) as client:
+        for name in names:
+            # Warm-up: connection pool, statement caches, lazy imports
+            await run_endpoint(client, scenarios[name], args.warmup, min(args.concurrency, args.warmup or 1), args.seed)
+            results[name] = await run_endpoint(
+                client, scenarios[name], args.requests, args.concurrency, args.seed
+            )
+            r = results[name]
+            print(f"{name:32s} {r['rps']:9.1f} req/s  p50 {r['p50_ms']:8.2f}  p95 {r['p95_ms']:8.2f}  "
+                  f"p99 {r['p99_ms']:8.2f} ms  errors {r['errors']}")
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP load test for main.app")
+    parser.add_argument("--base-url", help="test a running server instead of main.app in-process")
+    parser.add_argument("--endpoints", help="comma-separated endpoint names (default: all but heavy ones)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent requests")
+    parser.add_argument("--warmup", type=int, default=20, help="warm-up requests per endpoint")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for request parameters")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previous results JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed relative regression vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    endpoints = asyncio.run(run(args))
+    results = {
+        "meta": {
+            **environment_info(),
+            "mode": "remote" if args.base_url else "in-process",
+            "base_url": args.base_url,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "endpoints": endpoints,
+    }
+
+    if args.output:
+        save_results(args.output, results)
+        print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        baseline = load_results(args.baseline)
+        regressions = compare_with_baseline(
+            endpoints,
+            baseline.get("endpoints", {}),
+            lower_is_better=["p95_ms"],
+            higher_is_better=["rps"],
+            tolerance=args.max_regression,
+        )
+        rows = [
+            {
+                "endpoint": name,
+                "p95_ms": r["p95_ms"],
+                "base_p95_ms": baseline.get("endpoints", {}).get(name, {}).get("p95_ms", "-"),
+                "rps": r["rps"],
+                "base_rps": baseline.get("endpoints", {}).get(name, {}).get("rps", "-"),
+            }
+            for name, r in endpoints.items()
+        ]
+        print_table(rows, ["endpoint", "p95_ms", "base_p95_ms", "rps", "base_rps"], title="Baseline comparison")
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
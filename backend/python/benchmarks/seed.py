@@ -0,0 +1,266 @@
+"""
+Seed a local PostgreSQL database with a configurable volume of synthetic data
+
+Unlike database/load_test_appeals.sql (a few hundred rows for charts), this
+generates from 10k up to millions of appeals together with comments and
+attachments, entirely server-side via generate_series, so that query plans and
+endpoint latencies can be measured at realistic scale.
+
+Usage (from backend/python, DATABASE_URL pointing at a *local* database):
+    python -m benchmarks.seed --appeals 100000
+    python -m benchmarks.seed --appeals 1000000 --comments-per-appeal 3
+    python -m benchmarks.seed --reset
+
+All generated appeals have category = 'benchmark' and generated content/slugs
+start with 'bench-', so --reset removes exactly what was seeded.
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+
+from sqlalchemy import text
+
+from database import engine, init_db
+from analytics import SCHOOL_CODES, SCHOOLS_MAPPING
+
+BENCH_CATEGORY = "benchmark"
+BENCH_SLUG_PREFIX = "bench-"
+
+DIRECTIONS = [
+    ("legal", "Правовой комитет", "legal"),
+    ("infrastructure", "Инфраструктурный комитет", "infrastructure"),
+    ("scholarship", "Стипендиальный комитет", "scholarship"),
+    ("international", "Международный комитет", "international"),
+    ("other", "Другое", "other"),
+]
+
+TAG_SETS = [
+    "{общага,ремонт}",
+    "{стипендия}",
+    "{учеба,экзамены}",
+    "{срочно}",
+    None,
+]
+
+INSERT_APPEALS_SQL = """
+WITH src AS (
+    SELECT
+        g,
+        random() AS r_status,
+        random() AS r_prio,
+        random() AS r_misc,
+        now() - random() * interval '365 days' AS created
+    FROM generate_series(:start, :stop) AS g
+),
+ins AS (
+    INSERT INTO appeals (
+        direction_id, category, title, description, institute, is_anonymous,
+        contact_type, contact_value, status, priority, tags, public_token,
+        deadline, assigned_to, created_at, first_response_at, closed_at
+    )
+    SELECT
+        CASE WHEN r_misc < 0.05 THEN NULL
+             ELSE (CAST(:directions AS uuid[]))[1 + (g % :n_directions)] END,
+        :category,
+        'Обращение №' || g || ' для нагрузочного теста',
+        'Описание обращения №' || g || '. '
+            || repeat('Подробный текст обращения студента для проверки производительности. ', 3 + (g % 12)),
+        CASE WHEN r_misc < 0.1 THEN NULL
+             WHEN r_misc < 0.3 THEN (CAST(:institute_names AS text[]))[1 + (g % :n_institutes)]
+             ELSE (CAST(:institute_codes AS text[]))[1 + (g % :n_institutes)] END,
+        r_misc > 0.8,
+        CASE WHEN g % 2 = 0 THEN 'email' ELSE 'telegram' END,
+        CASE WHEN g % 2 = 0 THEN 'student' || g || '@example.com' ELSE '@student' || g END,
+        CASE WHEN r_status < 0.25 THEN 'new'
+             WHEN r_status < 0.45 THEN 'in_progress'
+             WHEN r_status < 0.55 THEN 'waiting'
+             ELSE 'closed' END,
+        CASE WHEN r_prio < 0.15 THEN 'low'
+             WHEN r_prio < 0.75 THEN 'normal'
+             WHEN r_prio < 0.95 THEN 'high'
+             ELSE 'urgent' END,
+        CAST((CAST(:tag_sets AS text[]))[1 + (g % :n_tag_sets)] AS text[]),
+        gen_random_uuid(),
+        CASE WHEN r_misc < 0.6 THEN (created + interval '14 days')::date END,
+        CASE WHEN r_status >= 0.25 THEN (CAST(:assignees AS uuid[]))[1 + (g % :n_assignees)] END,
+        created,
+        CASE WHEN r_status >= 0.25 THEN created + interval '1 hour' * (1 + r_prio * 48) END,
+        CASE WHEN r_status >= 0.55 THEN created + interval '1 day' * (1 + r_prio * 14) END
+    FROM src
+    RETURNING id, created_at
+),
+comments AS (
+    INSERT INTO appeal_comments (appeal_id, author_id, message, is_internal, created_at)
+    SELECT
+        ins.id,
+        (CAST(:assignees AS uuid[]))[1 + (n % :n_assignees)],
+        'Комментарий №' || n || ' к обращению. ' || repeat('Текст комментария. ', 1 + n % 5),
+        n % 3 <> 0,
+        ins.created_at + interval '1 hour' * n
+    FROM ins
+    CROSS JOIN LATERAL generate_series(1, floor(random() * (2 * :comments_per_appeal + 1))::int) AS n
+    RETURNING 1
+)
+INSERT INTO appeal_attachments (appeal_id, file_name, file_url, file_size, mime_type, uploaded_at)
+SELECT
+    ins.id,
+    'document_' || n || '.pdf',
+    'https://storage.example.com/benchmark/' || ins.id || '/' || n || '.pdf',
+    10000 + floor(random() * 5000000)::int,
+    'application/pdf',
+    ins.created_at + interval '1 minute' * n
+FROM ins
+CROSS JOIN LATERAL generate_series(1, floor(random() * (2 * :attachments_per_appeal + 1))::int) AS n
+"""
+
+INSERT_CONTENT_SQL = """
+INSERT INTO content (type, title, slug, body, direction_id, status, published_at, updated_at)
+SELECT
+    (ARRAY['news', 'guide', 'faq'])[1 + (g % 3)],
+    'Материал №' || g,
+    :slug_prefix || g,
+    repeat('Текст публикации для нагрузочного теста. ', 20 + (g % 80)),
+    (CAST(:directions AS uuid[]))[1 + (g % :n_directions)],
+    CASE WHEN g % 10 = 0 THEN 'draft' ELSE 'published' END,
+    CASE WHEN g % 10 = 0 THEN NULL ELSE now() - interval '1 hour' * g END,
+    now()
+FROM generate_series(1, :count) AS g
+"""
+
+INSERT_DOCUMENTS_SQL = """
+INSERT INTO documents (title, file_url, direction_id)
+SELECT
+    'Документ №' || g,
+    'https://storage.example.com/' || :slug_prefix || 'documents/' || g || '.pdf',
+    (CAST(:directions AS uuid[]))[1 + (g % :n_directions)]
+FROM generate_series(1, :count) AS g
+"""
+
+
+def ensure_directions(conn) -> list:
+    """Make sure the standard directions exist and return their ids"""
+    ids = []
+    for slug, title, color_key in DIRECTIONS:
+        row = conn.execute(text("SELECT id FROM directions WHERE slug = :slug"), {"slug": slug}).first()
+        if row is None:
+            row = conn.execute(
+                text(
+                    "INSERT INTO directions (id, slug, title, color_key, is_active) "
+                    "VALUES (:id, :slug, :title, :color_key, true) RETURNING id"
+                ),
+                {"id": uuid.uuid4(), "slug": slug, "title": title, "color_key": color_key},
+            ).first()
+        ids.append(str(row[0]))
+    return ids
+
+
+def reset(conn) -> None:
+    """Remove everything previously generated by this script"""
+    conn.execute(text("DELETE FROM appeals WHERE category = :category"), {"category": BENCH_CATEGORY})
+    conn.execute(text("DELETE FROM content WHERE slug LIKE :prefix"), {"prefix": BENCH_SLUG_PREFIX + "%"})
+    conn.execute(
+        text("DELETE FROM documents WHERE file_url LIKE :prefix"),
+        {"prefix": f"%/{BENCH_SLUG_PREFIX}documents/%"},
+    )
+
+
+def seed(
+    appeals: int,
+    comments_per_appeal: float,
+    attachments_per_appeal: float,
+    content: int,
+    documents: int,
+    batch_size: int,
+    seed_value: int,
+) -> None:
+    rng = random.Random(seed_value)
+    assignees = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(20)]
+
+    init_db()
+
+    with engine.begin() as conn:
+        direction_ids = ensure_directions(conn)
+
+    common = {
+        "directions": direction_ids,
+        "n_directions": len(direction_ids),
+        "slug_prefix": BENCH_SLUG_PREFIX,
+    }
+
+    started = time.perf_counter()
+    for start in range(1, appeals + 1, batch_size):
+        stop = min(start + batch_size - 1, appeals)
+        with engine.begin() as conn:
+            # Deterministic random() sequence for the same seed and batch layout
+            conn.execute(text("SELECT setseed(:s)"), {"s": ((seed_value + start) % 1000) / 1000.0})
+            conn.execute(
+                text(INSERT_APPEALS_SQL),
+                {
+                    **common,
+                    "start": start,
+                    "stop": stop,
+                    "category": BENCH_CATEGORY,
+                    "institute_codes": SCHOOL_CODES,
+                    "institute_names": [SCHOOLS_MAPPING[code] for code in SCHOOL_CODES],
+                    "n_institutes": len(SCHOOL_CODES),
+                    "tag_sets": TAG_SETS,
+                    "n_tag_sets": len(TAG_SETS),
+                    "assignees": assignees,
+                    "n_assignees": len(assignees),
+                    "comments_per_appeal": comments_per_appeal,
+                    "attachments_per_appeal": attachments_per_appeal,
+                },
+            )
+        print(f"  appeals {stop}/{appeals} ({time.perf_counter() - started:.1f}s)")
+
+    with engine.begin() as conn:
+        if content:
+            conn.execute(text(INSERT_CONTENT_SQL), {**common, "count": content})
+        if documents:
+            conn.execute(text(INSERT_DOCUMENTS_SQL), {**common, "count": documents})
+
+    # Fresh statistics (otherwise the planner works with empty-table estimates)
+    # and an up-to-date visibility map, so index-only scans are possible
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in ("directions", "appeals", "appeal_comments", "appeal_attachments", "content", "documents"):
+            conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Seed benchmark data into the database from DATABASE_URL")
+    parser.add_argument("--appeals", type=int, default=10000, help="number of appeals to generate")
+    parser.add_argument("--comments-per-appeal", type=float, default=2.0, help="average comments per appeal")
+    parser.add_argument("--attachments-per-appeal", type=float, default=0.5, help="average attachments per appeal")
+    parser.add_argument("--content", type=int, default=500, help="number of content items")
+    parser.add_argument("--documents", type=int, default=200, help="number of documents")
+    parser.add_argument("--batch-size", type=int, default=50000, help="appeals per transaction")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--reset", action="store_true", help="delete previously seeded rows first")
+    parser.add_argument("--reset-only", action="store_true", help="only delete previously seeded rows")
+    args = parser.parse_args(argv)
+
+    if args.reset or args.reset_only:
+        with engine.begin() as conn:
+            reset(conn)
+        print("Removed previously seeded benchmark data")
+        if args.reset_only:
+            return 0
+
+    seed(
+        appeals=args.appeals,
+        comments_per_appeal=args.comments_per_appeal,
+        attachments_per_appeal=args.attachments_per_appeal,
+        content=args.content,
+        documents=args.documents,
+        batch_size=args.batch_size,
+        seed_value=args.seed,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
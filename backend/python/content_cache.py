@@ -0,0 +1,269 @@
+"""
+Hot cache of published content by slug
+
+GET /api/content/slug/{slug} serves every news, guide and FAQ page view. The
+published entries are kept per worker process as ready JSON bodies, so a hit
+costs neither a query nor serialization. Unknown slugs (broken links, bots)
+are cached as negative entries, so they do not reach the database either.
+
+The cache is bounded by the bytes it holds (bodies plus keys plus a fixed
+per-entry overhead), not by the number of entries: one long guide weighs
+as much as hundreds of short FAQ answers. The least recently used entries
+are evicted first; bodies larger than 1/MAX_ENTRY_FRACTION of the budget are
+never cached.
+
+crud.create_content and update_content invalidate the slug in the process
+that wrote and append it to CONTENT_CACHE_SHARED_FILE. Every worker checks
+that file (one stat) before using its cache and drops the slugs appended
+since it last looked, so other workers on the host stop serving the old or
+unpublished body at once. Without the file (or on another host) they see the
+change after CONTENT_CACHE_TTL_SECONDS at the latest (negative entries:
+CONTENT_CACHE_NEGATIVE_TTL_SECONDS). A client that has just written reads
+past the cache either way (read-your-writes cookie).
+
+Environment:
+    CONTENT_CACHE_MAX_BYTES             memory budget per worker (8 MB; 0 disables the cache)
+    CONTENT_CACHE_TTL_SECONDS           lifetime of a cached body (60)
+    CONTENT_CACHE_NEGATIVE_TTL_SECONDS  lifetime of a "no such slug" entry (10)
+    CONTENT_CACHE_SHARED_FILE           invalidation log shared by the workers of a host
+                                        (default: <tmp>/oss_dvfu_content_cache.log; empty disables)
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CONTENT_CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+CONTENT_CACHE_TTL_SECONDS = float(os.getenv("CONTENT_CACHE_TTL_SECONDS", "60"))
+CONTENT_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("CONTENT_CACHE_NEGATIVE_TTL_SECONDS", "10"))
+CONTENT_CACHE_SHARED_FILE = os.getenv(
+    "CONTENT_CACHE_SHARED_FILE", os.path.join(tempfile.gettempdir(), "oss_dvfu_content_cache.log")
+)
+
+# Approximate bookkeeping cost of one entry (dict slot, tuple, key object)
+ENTRY_OVERHEAD = 200
+MAX_ENTRY_FRACTION = 8
+
+# Returned by get() for a cached "not found"
+MISSING = b""
+
+# The shared log is started afresh (new inode: every reader drops its whole
+# cache once) when it grows past this size
+SHARED_LOG_MAX_BYTES = 64 * 1024
+
+
+class ByteLRUCache:
+    """Thread-safe LRU of ``str -> bytes`` bounded by total size, with per-entry expiry"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a put() whose read began earlier is dropped
+        self._generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _cost(key: str, body: bytes) -> int:
+        return len(key) + len(body) + ENTRY_OVERHEAD
+
+    def _remove(self, key: str) -> None:
+        body, _ = self._entries.pop(key)
+        self._bytes -= self._cost(key, body)
+
+    def generation(self) -> int:
+        """Take before reading from the database; pass to put()"""
+        return self._generation
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached body, MISSING for a negative entry, None if not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            body, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if not body:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes, ttl: float, generation: int) -> bool:
+        """Store ``body`` unless it is too large or the key was invalidated since ``generation``"""
+        cost = self._cost(key, body)
+        if self.max_bytes <= 0 or cost > self.max_bytes // MAX_ENTRY_FRACTION:
+            self.rejected += 1
+            return False
+        with self._lock:
+            if generation != self._generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, time.monotonic() + ttl)
+            self._bytes += cost
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def metric_values(self) -> Dict[str, float]:
+        with self._lock:
+            entries, size = len(self._entries), self._bytes
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "rejected": self.rejected,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class SharedInvalidations:
+    """
+    Append-only file of invalidated slugs, one per line, shared by the
+    worker processes; each reader remembers how far it has read
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        stat_result = self._stat()
+        # Start at the current end: this process has nothing cached yet
+        self._inode = stat_result.st_ino if stat_result else None
+        self._offset = stat_result.st_size if stat_result else 0
+        self.rotations_seen = 0
+
+    def _stat(self) -> Optional[os.stat_result]:
+        try:
+            return os.stat(self.path)
+        except OSError:
+            return None
+
+    def poll(self) -> Optional[List[str]]:
+        """Slugs invalidated since the last poll; None if everything must be dropped"""
+        stat_result = self._stat()
+        if stat_result is None:
+            return []
+        if stat_result.st_ino == self._inode and stat_result.st_size == self._offset:
+            return []
+        with self._lock:
+            if stat_result.st_ino != self._inode or stat_result.st_size < self._offset:
+                # Created or started afresh since: what was appended before is unknown
+                self._inode, self._offset = stat_result.st_ino, stat_result.st_size
+                self.rotations_seen += 1
+                return None
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(self._offset)
+                    data = f.read(stat_result.st_size - self._offset)
+            except OSError:
+                return []
+            # A line still being appended is read on the next poll
+            end = data.rfind(b"\n") + 1
+            self._offset += end
+            return data[:end].decode("utf-8", "replace").splitlines()
+
+    def publish(self, slug: str) -> None:
+        with open(self.path, "ab") as f:
+            f.write(slug.encode() + b"\n")
+            size = f.tell()
+        if size > SHARED_LOG_MAX_BYTES:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", prefix=".tmp-")
+            os.close(fd)
+            os.replace(tmp_path, self.path)
+
+
+_cache = ByteLRUCache(CONTENT_CACHE_MAX_BYTES)
+metrics.register("content_cache", _cache.metric_values)
+
+enabled = CONTENT_CACHE_MAX_BYTES > 0
+
+_shared = SharedInvalidations(CONTENT_CACHE_SHARED_FILE) if enabled and CONTENT_CACHE_SHARED_FILE else None
+
+
+def _sync() -> None:
+    """Apply invalidations published by other processes"""
+    if _shared is None:
+        return
+    slugs = _shared.poll()
+    if slugs is None:
+        _cache.clear()
+        return
+    for slug in slugs:
+        _cache.invalidate(slug)
+
+
+def get(slug: str) -> Optional[bytes]:
+    if not enabled:
+        return None
+    _sync()
+    return _cache.get(slug)
+
+
+def generation() -> int:
+    _sync()
+    return _cache.generation()
+
+
+def put(slug: str, body: bytes, generation: int) -> None:
+    if enabled:
+        # A write published since generation() was taken bumps it: the stale body is dropped
+        _sync()
+        _cache.put(slug, body, CONTENT_CACHE_TTL_SECONDS, generation)
+
+
+def put_missing(slug: str, generation: int) -> None:
+    if enabled:
+        _sync()
+        _cache.put(slug, MISSING, CONTENT_CACHE_NEGATIVE_TTL_SECONDS, generation)
+
+
+def invalidate(slug: str) -> None:
+    _cache.invalidate(slug)
+    if _shared is not None:
+        try:
+            _shared.publish(slug)
+        except OSError as e:
+            logger.warning(f"Could not publish content cache invalidation of {slug!r}: {e}")
@@ -1,35 +1,78 @@
 """
 CRUD operations for database models
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from typing import Optional, List
-from uuid import UUID
-from datetime import datetime, date
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, and_, select, bindparam, literal_column, tuple_, union_all
+from typing import Optional, List, Tuple
+from uuid import UUID, uuid4
+from datetime import datetime, date, time, timedelta
 from models import (
-    Direction, Appeal, AppealComment, Content, Document, UserRole, AppealAttachment
+    Direction, Appeal, AppealComment, AppealHistory, Content, Document, UserRole, AppealAttachment
 )
 from schemas import (
     DirectionCreate, AppealCreate, AppealUpdate, AppealCommentCreate,
     ContentCreate, ContentUpdate, DocumentCreate, UserRoleCreate,
     AppealAttachmentCreate
 )
+import appeal_events
+import audit
+import content_cache
+import deadlines
+import directions_registry
+from directions_registry import DirectionEntry
+
+
+# Hot point lookups use statements built once at import with bound parameters:
+# no Query object is constructed per call and the compiled form is reused from
+# SQLAlchemy's statement cache. (psycopg2 has no server-side prepared
+# statements, so parameters are still sent inline with each query.)
+_APPEAL_BY_ID = select(Appeal).where(Appeal.id == bindparam("appeal_id")).limit(1)
+_APPEAL_BY_TOKEN = select(Appeal).where(Appeal.public_token == bindparam("token")).limit(1)
+_CONTENT_BY_SLUG = select(Content).where(Content.slug == bindparam("slug")).limit(1)
+_USER_ROLES = select(UserRole).where(UserRole.user_id == bindparam("user_id"))
+# Batch lookups: one IN (...) query per batch, rendered for the list length at execution
+_APPEALS_BY_IDS = select(Appeal).where(Appeal.id.in_(bindparam("ids", expanding=True)))
+_CONTENTS_BY_IDS = select(Content).where(Content.id.in_(bindparam("ids", expanding=True)))
+
+
+def _by_ids(db: Session, statement, ids: List[UUID]) -> Tuple[List, List[UUID]]:
+    """Rows of a *_BY_IDS statement in the order of ``ids`` and the IDs not found"""
+    found = {row.id: row for row in db.execute(statement, {"ids": list(ids)}).scalars()}
+    return [found[i] for i in ids if i in found], [i for i in ids if i not in found]
+
+
+def _public_lists_changed() -> None:
+    """Re-render the precompressed public list snapshots (see snapshots.py)"""
+    import snapshots
+    snapshots.schedule_rebuild()
 
 
 # Direction CRUD
-def get_direction(db: Session, direction_id: UUID) -> Optional[Direction]:
-    return db.query(Direction).filter(Direction.id == direction_id).first()
+# Reads are served from the in-memory registry (directions_registry.py); ``db``
+# stays in the signatures for the callers and for directions_query.
+def get_direction(db: Session, direction_id: UUID) -> Optional[DirectionEntry]:
+    return directions_registry.current().get(direction_id)
 
 
-def get_direction_by_slug(db: Session, slug: str) -> Optional[Direction]:
-    return db.query(Direction).filter(Direction.slug == slug).first()
+def get_direction_by_slug(db: Session, slug: str) -> Optional[DirectionEntry]:
+    return directions_registry.current().get_by_slug(slug)
 
 
-def get_directions(db: Session, skip: int = 0, limit: int = 100, active_only: bool = True) -> List[Direction]:
+def directions_query(db: Session, skip: int = 0, limit: int = 100, active_only: bool = True):
+    """Directions from the database, in registry order (snapshots build from this)"""
     query = db.query(Direction)
     if active_only:
         query = query.filter(Direction.is_active == True)
-    return query.offset(skip).limit(limit).all()
+    return query.order_by(Direction.created_at, Direction.id).offset(skip).limit(limit)
+
+
+def get_directions(db: Session, skip: int = 0, limit: int = 100, active_only: bool = True) -> List[DirectionEntry]:
+    return directions_registry.current().list(skip=skip, limit=limit, active_only=active_only)
+
+
+def get_directions_by_ids(db: Session, ids: List[UUID]) -> Tuple[List[DirectionEntry], List[UUID]]:
+    registry = directions_registry.current()
+    return [registry.by_id[i] for i in ids if i in registry.by_id], [i for i in ids if i not in registry.by_id]
 
 
 def create_direction(db: Session, direction: DirectionCreate) -> Direction:
@@ -37,19 +80,49 @@ def create_direction(db: Session, direction: DirectionCreate) -> Direction:
     db.add(db_direction)
     db.commit()
     db.refresh(db_direction)
+    directions_registry.reload_after_write()
+    _public_lists_changed()
     return db_direction
 
 
 # Appeal CRUD
 def get_appeal(db: Session, appeal_id: UUID) -> Optional[Appeal]:
-    return db.query(Appeal).filter(Appeal.id == appeal_id).first()
+    return db.execute(_APPEAL_BY_ID, {"appeal_id": appeal_id}).scalars().first()
 
 
 def get_appeal_by_token(db: Session, token: UUID) -> Optional[Appeal]:
-    return db.query(Appeal).filter(Appeal.public_token == token).first()
+    return db.execute(_APPEAL_BY_TOKEN, {"token": token}).scalars().first()
+
+
+def get_appeals_by_ids(db: Session, ids: List[UUID]) -> Tuple[List[Appeal], List[UUID]]:
+    """Appeals in the order of ``ids`` (one query) and the IDs that do not exist"""
+    return _by_ids(db, _APPEALS_BY_IDS, ids)
+
+
+def get_appeal_full(db: Session, appeal_id: UUID, include_internal: bool = True) -> Optional[Appeal]:
+    """
+    Appeal with direction, comments and attachments for the detail page, in
+    three queries on one connection: the appeal joined with its direction,
+    then the comments and the attachments (selectinload). With
+    include_internal=False internal comments are filtered in SQL.
+    """
+    comments = Appeal.comments if include_internal else Appeal.comments.and_(AppealComment.is_internal.is_(False))
+    appeal = db.execute(
+        select(Appeal)
+        .where(Appeal.id == appeal_id)
+        .options(joinedload(Appeal.direction), selectinload(comments), selectinload(Appeal.attachments))
+        # Collections may already be loaded with a different comment filter
+        .execution_options(populate_existing=True)
+    ).unique().scalars().first()
+    if appeal is None:
+        return None
+    # Timestamps are server defaults; rows without one go last
+    appeal.comments.sort(key=lambda c: (c.created_at is None, c.created_at or 0, c.id))
+    appeal.attachments.sort(key=lambda a: (a.uploaded_at is None, a.uploaded_at or 0, a.id))
+    return appeal
 
 
-def get_appeals(
+def appeals_query(
     db: Session,
     skip: int = 0,
     limit: int = 100,
@@ -59,7 +132,8 @@ def get_appeals(
     assigned_to: Optional[UUID] = None,
     sort_by: str = "created_at",
     sort_order: str = "desc"
-) -> List[Appeal]:
+):
+    """Query behind get_appeals (filters, sorting and paging applied)"""
     query = db.query(Appeal)
     if direction_id:
         query = query.filter(Appeal.direction_id == direction_id)
@@ -77,7 +151,12 @@ def get_appeals(
     else:
         query = query.order_by(sort_column.asc())
     
-    return query.offset(skip).limit(limit).all()
+    return query.offset(skip).limit(limit)
+
+
+def get_appeals(db: Session, **filters) -> List[Appeal]:
+    """Appeals matching the filters of appeals_query"""
+    return appeals_query(db, **filters).all()
 
 
 def create_appeal(db: Session, appeal: AppealCreate) -> Appeal:
@@ -85,10 +164,17 @@ def create_appeal(db: Session, appeal: AppealCreate) -> Appeal:
     db.add(db_appeal)
     db.commit()
     db.refresh(db_appeal)
+    deadlines.track(db_appeal.id, db_appeal.deadline, db_appeal.status)
+    appeal_events.publish(appeal_events.AppealEvent(appeal_events.APPEAL_NEW, db_appeal.id, title=db_appeal.title))
     return db_appeal
 
 
-def update_appeal(db: Session, appeal_id: UUID, appeal_update: AppealUpdate) -> Optional[Appeal]:
+def update_appeal(
+    db: Session,
+    appeal_id: UUID,
+    appeal_update: AppealUpdate,
+    changed_by: Optional[UUID] = None
+) -> Optional[Appeal]:
     db_appeal = get_appeal(db, appeal_id)
     if not db_appeal:
         return None
@@ -101,11 +187,15 @@ def update_appeal(db: Session, appeal_id: UUID, appeal_update: AppealUpdate) ->
     elif update_data.get("status") == "in_progress" and not db_appeal.first_response_at:
         update_data["first_response_at"] = datetime.now()
 
+    old_status, old_assigned_to = db_appeal.status, db_appeal.assigned_to
+    audit.record(db, audit.appeal_changes(db_appeal, update_data, changed_by))
     for key, value in update_data.items():
         setattr(db_appeal, key, value)
 
     db.commit()
     db.refresh(db_appeal)
+    deadlines.track(db_appeal.id, db_appeal.deadline, db_appeal.status)
+    appeal_events.appeal_changed(db_appeal, old_status, old_assigned_to)
     return db_appeal
 
 
@@ -133,13 +223,51 @@ def get_appeals_by_assigned(
     ).order_by(Appeal.created_at.desc()).offset(skip).limit(limit).all()
 
 
-def get_overdue_appeals(db: Session, skip: int = 0, limit: int = 100) -> List[Appeal]:
-    """Get appeals with overdue deadlines"""
+# Candidates re-checked per query when paging the in-memory overdue set
+OVERDUE_CHECK_BATCH = 1000
+
+
+def _overdue_page_ids(db: Session, today: date, skip: int, limit: int) -> List[UUID]:
+    """
+    Ids of one page of the in-memory overdue set, re-checked in SQL before
+    the window is applied: entries another process has changed since are
+    skipped and the page is filled from the following ones
+    """
+    wanted = skip + limit
+    valid: List[UUID] = []
+    position = 0
+    while len(valid) < wanted:
+        candidates = deadlines.scheduler.overdue_page(position, min(wanted - len(valid), OVERDUE_CHECK_BATCH))
+        if not candidates:
+            break
+        position += len(candidates)
+        still_overdue = {
+            appeal_id for appeal_id, in db.query(Appeal.id).filter(
+                Appeal.id.in_(candidates),
+                Appeal.deadline < today,
+                Appeal.status != "closed"
+            )
+        }
+        valid.extend(appeal_id for appeal_id in candidates if appeal_id in still_overdue)
+    return valid[skip:wanted]
+
+
+def overdue_appeals_query(db: Session, skip: int = 0, limit: int = 100):
     today = date.today()
-    return db.query(Appeal).filter(
+    query = db.query(Appeal).filter(
         Appeal.deadline < today,
         Appeal.status != "closed"
-    ).order_by(Appeal.deadline).offset(skip).limit(limit).all()
+    )
+    if deadlines.ready():
+        # The page comes from the in-memory overdue set (primary key lookups)
+        page_ids = _overdue_page_ids(db, today, skip, limit)
+        return query.filter(Appeal.id.in_(page_ids)).order_by(Appeal.deadline, Appeal.id)
+    return query.order_by(Appeal.deadline).offset(skip).limit(limit)
+
+
+def get_overdue_appeals(db: Session, skip: int = 0, limit: int = 100) -> List[Appeal]:
+    """Get appeals with overdue deadlines"""
+    return overdue_appeals_query(db, skip=skip, limit=limit).all()
 
 
 def get_appeal_stats(db: Session) -> dict:
@@ -161,15 +289,20 @@ def get_appeal_stats(db: Session) -> dict:
         key = str(direction_id) if direction_id else "other"
         by_direction[key] = count
 
-    today = date.today()
+    # Range predicates instead of date(column) == today, so the
+    # created_at / closed_at indexes can be used
+    today_start = datetime.combine(date.today(), time.min)
+    tomorrow_start = today_start + timedelta(days=1)
     created_today = db.query(func.count(Appeal.id)).filter(
-        func.date(Appeal.created_at) == today
+        Appeal.created_at >= today_start,
+        Appeal.created_at < tomorrow_start
     ).scalar()
     
     closed_today = db.query(func.count(Appeal.id)).filter(
         and_(
             Appeal.status == "closed",
-            func.date(Appeal.closed_at) == today
+            Appeal.closed_at >= today_start,
+            Appeal.closed_at < tomorrow_start
         )
     ).scalar()
 
@@ -183,15 +316,109 @@ def get_appeal_stats(db: Session) -> dict:
 
 
 # Appeal Comment CRUD
-def get_appeal_comments(db: Session, appeal_id: UUID) -> List[AppealComment]:
-    return db.query(AppealComment).filter(AppealComment.appeal_id == appeal_id).order_by(AppealComment.created_at).all()
+def get_appeal_comments(
+    db: Session,
+    appeal_id: UUID,
+    limit: int = 50,
+    after: Optional[Tuple[datetime, UUID]] = None
+) -> Tuple[List[AppealComment], Optional[Tuple[datetime, UUID]]]:
+    """
+    One page of an appeal's comments in (created_at, id) order, starting after
+    the ``after`` position (keyset pagination, see pagination.py). Returns the
+    comments and the position to continue from, None on the last page.
+    """
+    query = db.query(AppealComment).filter(AppealComment.appeal_id == appeal_id)
+    if after is not None:
+        query = query.filter(tuple_(AppealComment.created_at, AppealComment.id) > tuple_(*after))
+    # One extra row tells whether there is a next page
+    comments = query.order_by(AppealComment.created_at, AppealComment.id).limit(limit + 1).all()
+    if len(comments) <= limit:
+        return comments, None
+    comments = comments[:limit]
+    last = comments[-1]
+    return comments, (last.created_at, last.id)
+
+
+def get_appeal_history(
+    db: Session,
+    appeal_id: UUID,
+    limit: int = 50,
+    before: Optional[Tuple[datetime, UUID]] = None
+) -> Tuple[List[AppealHistory], Optional[Tuple[datetime, UUID]]]:
+    """
+    One page of an appeal's history, newest first, starting before the
+    ``before`` position (keyset pagination, see pagination.py). Returns the
+    entries and the position to continue from, None on the last page.
+    """
+    query = db.query(AppealHistory).filter(AppealHistory.appeal_id == appeal_id)
+    if before is not None:
+        query = query.filter(tuple_(AppealHistory.created_at, AppealHistory.id) < tuple_(*before))
+    entries = query.order_by(AppealHistory.created_at.desc(), AppealHistory.id.desc()).limit(limit + 1).all()
+    if len(entries) <= limit:
+        return entries, None
+    entries = entries[:limit]
+    last = entries[-1]
+    return entries, (last.created_at, last.id)
+
+
+def get_appeal_counters(db: Session, appeal_ids: List[UUID]) -> List[dict]:
+    """
+    Comment count, attachment count and last activity (latest of appeal
+    creation / first response / closing, comments and attachments) for many
+    appeals in one grouped query. Unknown IDs are left out.
+    """
+    ids = bindparam("appeal_ids", list(appeal_ids), expanding=True)
+    activity = union_all(
+        select(
+            Appeal.id.label("appeal_id"),
+            literal_column("0").label("comments"),
+            literal_column("0").label("attachments"),
+            func.greatest(Appeal.created_at, Appeal.first_response_at, Appeal.closed_at).label("last_at"),
+        ).where(Appeal.id.in_(ids)),
+        select(
+            AppealComment.appeal_id,
+            func.count(),
+            literal_column("0"),
+            func.max(AppealComment.created_at),
+        ).where(AppealComment.appeal_id.in_(ids)).group_by(AppealComment.appeal_id),
+        select(
+            AppealAttachment.appeal_id,
+            literal_column("0"),
+            func.count(),
+            func.max(AppealAttachment.uploaded_at),
+        ).where(AppealAttachment.appeal_id.in_(ids)).group_by(AppealAttachment.appeal_id),
+    ).subquery()
+    # Comments and attachments reference existing appeals (foreign keys), so
+    # every group is an existing appeal
+    rows = db.execute(
+        select(
+            activity.c.appeal_id,
+            func.sum(activity.c.comments),
+            func.sum(activity.c.attachments),
+            func.max(activity.c.last_at),
+        ).group_by(activity.c.appeal_id)
+    ).all()
+    return [
+        {
+            "appeal_id": appeal_id,
+            "comments": int(comments),
+            "attachments": int(attachments),
+            "last_activity_at": last_at,
+        }
+        for appeal_id, comments, attachments, last_at in rows
+    ]
 
 
 def create_appeal_comment(db: Session, comment: AppealCommentCreate, author_id: Optional[UUID] = None) -> AppealComment:
-    db_comment = AppealComment(**comment.dict(), author_id=author_id)
+    # The id is set here so the history row can reference the comment without a flush
+    db_comment = AppealComment(id=uuid4(), **comment.dict(), author_id=author_id)
     db.add(db_comment)
+    audit.record(db, audit.comment_added(db_comment))
     db.commit()
     db.refresh(db_comment)
+    appeal_events.publish(appeal_events.AppealEvent(
+        appeal_events.APPEAL_COMMENT, db_comment.appeal_id, actor_id=author_id
+    ))
     return db_comment
 
 
@@ -200,18 +427,23 @@ def get_content(db: Session, content_id: UUID) -> Optional[Content]:
     return db.query(Content).filter(Content.id == content_id).first()
 
 
+def get_contents_by_ids(db: Session, ids: List[UUID]) -> Tuple[List[Content], List[UUID]]:
+    return _by_ids(db, _CONTENTS_BY_IDS, ids)
+
+
 def get_content_by_slug(db: Session, slug: str) -> Optional[Content]:
-    return db.query(Content).filter(Content.slug == slug).first()
+    return db.execute(_CONTENT_BY_SLUG, {"slug": slug}).scalars().first()
 
 
-def get_contents(
+def contents_query(
     db: Session,
     skip: int = 0,
     limit: int = 100,
     content_type: Optional[str] = None,
     direction_id: Optional[UUID] = None,
     published_only: bool = False
-) -> List[Content]:
+):
+    """Query behind get_contents (filters, sorting and paging applied)"""
     query = db.query(Content)
     if content_type:
         query = query.filter(Content.type == content_type)
@@ -219,7 +451,12 @@ def get_contents(
         query = query.filter(Content.direction_id == direction_id)
     if published_only:
         query = query.filter(Content.status == "published")
-    return query.order_by(Content.published_at.desc()).offset(skip).limit(limit).all()
+    return query.order_by(Content.published_at.desc()).offset(skip).limit(limit)
+
+
+def get_contents(db: Session, **filters) -> List[Content]:
+    """Content items matching the filters of contents_query"""
+    return contents_query(db, **filters).all()
 
 
 def create_content(db: Session, content: ContentCreate) -> Content:
@@ -229,6 +466,9 @@ def create_content(db: Session, content: ContentCreate) -> Content:
     db.add(db_content)
     db.commit()
     db.refresh(db_content)
+    # Drops a cached "not found" for the new slug
+    content_cache.invalidate(db_content.slug)
+    _public_lists_changed()
     return db_content
 
 
@@ -241,25 +481,42 @@ def update_content(db: Session, content_id: UUID, content_update: ContentUpdate)
     if update_data.get("status") == "published" and not db_content.published_at:
         update_data["published_at"] = datetime.now()
 
+    old_slug = db_content.slug
     for key, value in update_data.items():
         setattr(db_content, key, value)
 
     db.commit()
     db.refresh(db_content)
+    # A renamed entry must stop being served under its old slug; the new slug
+    # may hold a cached "not found"
+    content_cache.invalidate(old_slug)
+    if db_content.slug != old_slug:
+        content_cache.invalidate(db_content.slug)
+    _public_lists_changed()
     return db_content
 
 
 # Document CRUD
-def get_documents(
+def documents_query(
     db: Session,
     skip: int = 0,
     limit: int = 100,
     direction_id: Optional[UUID] = None
-) -> List[Document]:
+):
+    """Query behind get_documents"""
     query = db.query(Document)
     if direction_id:
         query = query.filter(Document.direction_id == direction_id)
-    return query.order_by(Document.created_at.desc()).offset(skip).limit(limit).all()
+    return query.order_by(Document.created_at.desc()).offset(skip).limit(limit)
+
+
+def get_documents(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    direction_id: Optional[UUID] = None
+) -> List[Document]:
+    return documents_query(db, skip=skip, limit=limit, direction_id=direction_id).all()
 
 
 def create_document(db: Session, document: DocumentCreate) -> Document:
@@ -267,12 +524,13 @@ def create_document(db: Session, document: DocumentCreate) -> Document:
     db.add(db_document)
     db.commit()
     db.refresh(db_document)
+    _public_lists_changed()
     return db_document
 
 
 # User Role CRUD
 def get_user_roles(db: Session, user_id: UUID) -> List[UserRole]:
-    return db.query(UserRole).filter(UserRole.user_id == user_id).all()
+    return db.execute(_USER_ROLES, {"user_id": user_id}).scalars().all()
 
 
 def create_user_role(db: Session, user_role: UserRoleCreate) -> UserRole:
@@ -0,0 +1,303 @@
+"""
+Deadline scheduler for open appeals
+
+``GET /api/appeals?overdue_only=true`` used to scan the appeals table on
+every request, and nothing happened at the moment a deadline passed. The
+scheduler keeps the deadlines of all open appeals in memory instead:
+
+- a min-heap of (deadline, appeal) with lazy deletion: a changed or removed
+  deadline only updates the ``_deadlines`` dict, the stale heap entry is
+  skipped when it surfaces (the heap is compacted once stale entries make up
+  half of it);
+- the overdue set, ready to serve in (deadline, id) order;
+- a daemon thread that every DEADLINE_TICK_SECONDS moves the appeals whose
+  deadline has passed from the heap into the overdue set and hands them to
+  the subscribers in batches of at most DEADLINE_EVENT_BATCH ids.
+
+Deadlines are dates: an appeal is overdue from the day after its deadline
+(``deadline < today``, not closed), as before.
+
+The state is loaded once in the background at startup (one query over the
+open appeals with a deadline) and updated by crud.create_appeal /
+update_appeal. Changes made by other worker processes or around the API
+are picked up by a full reload every DEADLINE_RESYNC_SECONDS; until then the
+overdue page query re-checks the candidates in SQL before applying the page
+window, so it never returns an appeal that is no longer overdue and pages
+stay full and contiguous. Tracks made while a reload reads the
+database are replayed over its result, so the reload cannot undo them.
+
+Appeal ids are kept as 128-bit ints and dates as ordinals to keep the
+footprint small: see benchmarks/bench_deadlines.py for the memory use at
+100k open appeals.
+
+Every worker process runs its own scheduler and emits its own events;
+subscribers with side effects must tolerate duplicates.
+
+Environment:
+    DEADLINES_ENABLED           0 falls back to querying the database
+    DEADLINE_TICK_SECONDS       how often passed deadlines are collected (30)
+    DEADLINE_RESYNC_SECONDS     full reload from the database (600; 0 never)
+    DEADLINE_EVENT_BATCH        max appeal ids per event batch (500)
+"""
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEADLINES_ENABLED = os.getenv("DEADLINES_ENABLED", "1") != "0"
+DEADLINE_TICK_SECONDS = float(os.getenv("DEADLINE_TICK_SECONDS", "30"))
+DEADLINE_RESYNC_SECONDS = float(os.getenv("DEADLINE_RESYNC_SECONDS", "600"))
+DEADLINE_EVENT_BATCH = int(os.getenv("DEADLINE_EVENT_BATCH", "500"))
+
+CLOSED = "closed"
+
+# Subscriber: called from the scheduler thread with the ids that just became overdue
+Subscriber = Callable[[List[UUID]], None]
+
+
+class DeadlineScheduler:
+    """Deadlines of open appeals; all methods are thread-safe"""
+
+    def __init__(self, event_batch: int = DEADLINE_EVENT_BATCH):
+        self.event_batch = event_batch
+        self._lock = threading.Lock()
+        # appeal id (int) -> deadline ordinal, for every open appeal with a deadline
+        self._deadlines: Dict[int, int] = {}
+        # (deadline ordinal, appeal id) of appeals not overdue yet; may hold stale entries
+        self._heap: List[Tuple[int, int]] = []
+        # appeal id -> deadline ordinal of overdue appeals
+        self._overdue: Dict[int, int] = {}
+        self._overdue_sorted: Optional[List[Tuple[int, int]]] = None
+        self._today = date.today().toordinal()
+        self._subscribers: List[Subscriber] = []
+        # Tracks made while a reload reads the database (None: no reload in flight);
+        # replayed over the loaded state, which may predate them
+        self._tracked_during_load: Optional[Dict[int, Tuple[Optional[date], Optional[str]]]] = None
+        self.loaded = False
+        self.loaded_at: Optional[float] = None
+        self.events_emitted = 0
+        self.batches_emitted = 0
+        self.stale_skipped = 0
+        self.compactions = 0
+
+    # ---- state changes ----
+
+    def begin_load(self) -> None:
+        """Call before reading the rows for load(): tracks from then on are replayed after it"""
+        with self._lock:
+            self._tracked_during_load = {}
+
+    def load(self, rows: Iterable[Tuple[UUID, date]], today: Optional[date] = None) -> List[UUID]:
+        """
+        Replace the state with ``rows`` (id, deadline) of all open appeals
+        that have a deadline, then replay the tracks made since begin_load().
+        Appeals already overdue go straight to the overdue set; events are
+        emitted (and the ids returned) only for those that were tracked as
+        not yet overdue before, so the first load emits nothing.
+        """
+        today_ordinal = (today or date.today()).toordinal()
+        deadlines = {appeal_id.int: deadline.toordinal() for appeal_id, deadline in rows}
+        overdue = {k: v for k, v in deadlines.items() if v < today_ordinal}
+        heap = [(v, k) for k, v in deadlines.items() if v >= today_ordinal]
+        heapq.heapify(heap)
+        with self._lock:
+            previously_pending = {k for k in self._deadlines if k not in self._overdue}
+            self._deadlines = deadlines
+            self._overdue = overdue
+            self._heap = heap
+            self._overdue_sorted = None
+            self._today = today_ordinal
+            self.loaded = True
+            self.loaded_at = time.time()
+            tracked, self._tracked_during_load = self._tracked_during_load, None
+            for key, (deadline, status) in (tracked or {}).items():
+                self._apply(key, deadline, status)
+            passed = [k for k in previously_pending if k in self._overdue]
+        self._emit(passed)
+        return [UUID(int=key) for key in passed]
+
+    def track(self, appeal_id: UUID, deadline: Optional[date], status: Optional[str]) -> None:
+        """Record an appeal's current deadline and status after a write"""
+        key = appeal_id.int
+        with self._lock:
+            if self._tracked_during_load is not None:
+                self._tracked_during_load[key] = (deadline, status)
+            if not self.loaded:
+                return
+            became_overdue = self._apply(key, deadline, status)
+        if became_overdue:
+            self._emit([key])
+
+    def _apply(self, key: int, deadline: Optional[date], status: Optional[str]) -> bool:
+        """Caller holds the lock; True if the appeal just became overdue"""
+        if deadline is None or status == CLOSED:
+            self._deadlines.pop(key, None)
+            if self._overdue.pop(key, None) is not None:
+                self._overdue_sorted = None
+            return False
+        ordinal = deadline.toordinal()
+        if self._deadlines.get(key) == ordinal:
+            return False
+        self._deadlines[key] = ordinal
+        was_overdue = self._overdue.pop(key, None) is not None
+        self._overdue_sorted = None
+        if ordinal < self._today:
+            self._overdue[key] = ordinal
+            return not was_overdue
+        heapq.heappush(self._heap, (ordinal, key))
+        self._maybe_compact()
+        return False
+
+    def _maybe_compact(self) -> None:
+        # Caller holds the lock
+        live = len(self._deadlines) - len(self._overdue)
+        if len(self._heap) > 2 * live + 1024:
+            self._heap = [(v, k) for k, v in self._deadlines.items() if k not in self._overdue]
+            heapq.heapify(self._heap)
+            self.compactions += 1
+
+    def tick(self, today: Optional[date] = None) -> List[UUID]:
+        """Move appeals whose deadline has passed to the overdue set; returns them"""
+        today_ordinal = (today or date.today()).toordinal()
+        passed: List[int] = []
+        with self._lock:
+            self._today = today_ordinal
+            heap = self._heap
+            while heap and heap[0][0] < today_ordinal:
+                ordinal, key = heapq.heappop(heap)
+                if self._deadlines.get(key) != ordinal or key in self._overdue:
+                    self.stale_skipped += 1
+                    continue
+                self._overdue[key] = ordinal
+                passed.append(key)
+            if passed:
+                self._overdue_sorted = None
+        self._emit(passed)
+        return [UUID(int=key) for key in passed]
+
+    # ---- events ----
+
+    def subscribe(self, callback: Subscriber) -> None:
+        self._subscribers.append(callback)
+
+    def _emit(self, keys: List[int]) -> None:
+        if not keys:
+            return
+        for start in range(0, len(keys), self.event_batch):
+            batch = [UUID(int=key) for key in keys[start:start + self.event_batch]]
+            self.batches_emitted += 1
+            self.events_emitted += len(batch)
+            for callback in self._subscribers:
+                try:
+                    callback(batch)
+                except Exception:
+                    logger.exception("Overdue subscriber failed")
+
+    # ---- reads ----
+
+    def overdue_page(self, skip: int = 0, limit: int = 100) -> List[UUID]:
+        """Ids of overdue appeals in (deadline, id) order"""
+        with self._lock:
+            if self._overdue_sorted is None:
+                self._overdue_sorted = sorted((v, k) for k, v in self._overdue.items())
+            page = self._overdue_sorted[skip:skip + limit]
+        return [UUID(int=key) for _, key in page]
+
+    def overdue_count(self) -> int:
+        return len(self._overdue)
+
+    def tracked_count(self) -> int:
+        return len(self._deadlines)
+
+    def metric_values(self) -> Dict[str, float]:
+        with self._lock:
+            tracked, overdue, heap = len(self._deadlines), len(self._overdue), len(self._heap)
+        return {
+            "loaded": int(self.loaded),
+            "tracked": tracked,
+            "overdue": overdue,
+            "heap_entries": heap,
+            "events_emitted": self.events_emitted,
+            "batches_emitted": self.batches_emitted,
+            "stale_skipped": self.stale_skipped,
+            "compactions": self.compactions,
+        }
+
+
+scheduler = DeadlineScheduler()
+metrics.register("deadlines", scheduler.metric_values)
+
+
+def _log_overdue(appeal_ids: List[UUID]) -> None:
+    logger.info(f"{len(appeal_ids)} appeals became overdue")
+
+
+scheduler.subscribe(_log_overdue)
+
+
+def ready() -> bool:
+    """Whether overdue queries can be answered from the scheduler"""
+    return DEADLINES_ENABLED and scheduler.loaded
+
+
+def track(appeal_id: UUID, deadline: Optional[date], status: Optional[str]) -> None:
+    if DEADLINES_ENABLED:
+        scheduler.track(appeal_id, deadline, status)
+
+
+def load_from_database() -> int:
+    """(Re)load the open appeals with a deadline from the primary; returns their number"""
+    from database import SessionLocal
+    from models import Appeal
+
+    started = time.perf_counter()
+    scheduler.begin_load()
+    db = SessionLocal()
+    try:
+        rows = db.query(Appeal.id, Appeal.deadline).filter(
+            Appeal.deadline.isnot(None),
+            Appeal.status != CLOSED
+        ).yield_per(10000)
+        scheduler.load(rows)
+    finally:
+        db.close()
+    logger.info(
+        f"Deadlines loaded: {scheduler.tracked_count()} open appeals, {scheduler.overdue_count()} overdue "
+        f"({(time.perf_counter() - started) * 1000:.0f} ms)"
+    )
+    return scheduler.tracked_count()
+
+
+_thread: Optional[threading.Thread] = None
+
+
+def _loop() -> None:
+    next_load = 0.0
+    while True:
+        try:
+            # Tick first: deadlines that passed since the last tick get their
+            # events before a reload would file them as overdue
+            scheduler.tick()
+            if not scheduler.loaded or (next_load and time.monotonic() >= next_load):
+                load_from_database()
+                next_load = time.monotonic() + DEADLINE_RESYNC_SECONDS if DEADLINE_RESYNC_SECONDS > 0 else 0.0
+        except Exception:
+            logger.exception("Deadline scheduler tick failed")
+        time.sleep(DEADLINE_TICK_SECONDS)
+
+
+def start() -> None:
+    """Load the deadlines and start ticking in this (worker) process"""
+    global _thread
+    if not DEADLINES_ENABLED or _thread is not None:
+        return
+    _thread = threading.Thread(target=_loop, name="deadlines", daemon=True)
+    _thread.start()
@@ -0,0 +1,219 @@
+"""
+In-memory registry of directions
+
+``directions`` holds a dozen rows that change a few times a year, yet every
+direction lookup, list request and export row went to the database for them.
+The registry keeps the whole table in each worker process as an immutable
+snapshot indexed by id and slug; readers take the current snapshot without
+locking and a reload builds a new one and swaps the module reference.
+
+The snapshot is replaced:
+
+- right after crud.create_direction commits (in the process that wrote);
+- when a version check finds the table changed: at most every
+  DIRECTIONS_CHECK_SECONDS the first caller compares ``md5`` of the table
+  contents with the snapshot's version (one tiny query), so changes made by
+  other workers, manage.py or SQL show up within that interval.
+
+Loads and checks always read the primary: a lagging replica would otherwise
+swap in an older snapshot right after a write.
+
+Entries are plain named tuples, not ORM objects: they are shared between
+threads and never lazy-load or expire. The API schemas read them like rows
+(from_attributes).
+
+Environment:
+    DIRECTIONS_CHECK_SECONDS    interval of the version check (30; 0 checks on every access)
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS_CHECK_SECONDS = float(os.getenv("DIRECTIONS_CHECK_SECONDS", "30"))
+
+# Hash of every column the API exposes; the table is tiny, so this is a single cheap scan
+_VERSION_SQL = text("""
+    SELECT md5(coalesce(string_agg(
+        concat_ws(chr(31), id, slug, title, coalesce(description, ''), color_key, is_active, created_at),
+        chr(30) ORDER BY id
+    ), ''))
+    FROM directions
+""")
+
+_ROWS_SQL = text("""
+    SELECT id, slug, title, description, color_key, is_active, created_at
+    FROM directions
+    ORDER BY created_at, id
+""")
+
+
+class DirectionEntry(NamedTuple):
+    id: UUID
+    slug: str
+    title: str
+    description: Optional[str]
+    color_key: str
+    is_active: bool
+    created_at: Optional[datetime]
+
+
+class Registry:
+    """One immutable snapshot of the directions table"""
+
+    __slots__ = ("version", "loaded_at", "entries", "by_id", "by_slug", "titles")
+
+    def __init__(self, version: str, entries: Tuple[DirectionEntry, ...]):
+        self.version = version
+        self.loaded_at = time.time()
+        self.entries = entries
+        self.by_id: Mapping[UUID, DirectionEntry] = MappingProxyType({e.id: e for e in entries})
+        self.by_slug: Mapping[str, DirectionEntry] = MappingProxyType({e.slug: e for e in entries})
+        # {direction_id: title} for exports and analytics
+        self.titles: Mapping[UUID, str] = MappingProxyType({e.id: e.title for e in entries})
+
+    def get(self, direction_id: UUID) -> Optional[DirectionEntry]:
+        return self.by_id.get(direction_id)
+
+    def get_by_slug(self, slug: str) -> Optional[DirectionEntry]:
+        return self.by_slug.get(slug)
+
+    def list(self, skip: int = 0, limit: int = 100, active_only: bool = True) -> List[DirectionEntry]:
+        entries = [e for e in self.entries if e.is_active] if active_only else self.entries
+        return list(entries[skip:skip + limit])
+
+
+_current: Optional[Registry] = None
+_checked_at = 0.0
+# Serializes loads and checks; readers never take it
+_reload_lock = threading.Lock()
+
+_stats = {"loads": 0, "checks": 0, "changes_detected": 0, "check_errors": 0}
+
+
+def _as_uuid(value) -> UUID:
+    return value if isinstance(value, UUID) else UUID(str(value))
+
+
+def _fetch_version(db) -> str:
+    return db.execute(_VERSION_SQL).scalar()
+
+
+def _load(db) -> Registry:
+    global _current, _checked_at
+    version = _fetch_version(db)
+    entries = tuple(
+        DirectionEntry(_as_uuid(row.id), row.slug, row.title, row.description,
+                       row.color_key, row.is_active, row.created_at)
+        for row in db.execute(_ROWS_SQL)
+    )
+    registry = Registry(version, entries)
+    _current = registry
+    _checked_at = time.monotonic()
+    _stats["loads"] += 1
+    logger.info(f"Directions registry loaded: {len(entries)} directions, version {version[:8]}")
+    return registry
+
+
+def _primary_session():
+    from database import SessionLocal
+    return SessionLocal()
+
+
+def reload() -> Registry:
+    """Load a new snapshot from the primary and swap it in"""
+    with _reload_lock:
+        db = _primary_session()
+        try:
+            return _load(db)
+        finally:
+            db.close()
+
+
+def reload_after_write() -> None:
+    """
+    Called after a committed change to directions. If the reload fails the
+    write still stands: the next access runs a version check instead.
+    """
+    global _checked_at
+    try:
+        reload()
+    except Exception:
+        _checked_at = float("-inf")
+        logger.exception("Directions registry reload failed; will retry on next access")
+
+
+def _check() -> None:
+    global _checked_at
+    db = _primary_session()
+    try:
+        _stats["checks"] += 1
+        if _fetch_version(db) != _current.version:
+            _stats["changes_detected"] += 1
+            _load(db)
+        else:
+            _checked_at = time.monotonic()
+    finally:
+        db.close()
+
+
+def current() -> Registry:
+    """
+    The current snapshot, loading it on first use. When the last version
+    check is older than DIRECTIONS_CHECK_SECONDS one caller runs a check;
+    concurrent callers keep using the snapshot they have.
+    """
+    global _checked_at
+    registry = _current
+    if registry is None:
+        with _reload_lock:
+            if _current is None:
+                db = _primary_session()
+                try:
+                    _load(db)
+                finally:
+                    db.close()
+            return _current
+    if time.monotonic() - _checked_at >= DIRECTIONS_CHECK_SECONDS and _reload_lock.acquire(blocking=False):
+        try:
+            if time.monotonic() - _checked_at >= DIRECTIONS_CHECK_SECONDS:
+                _check()
+        except Exception:
+            # Serve the snapshot we have and try again after the interval
+            _stats["check_errors"] += 1
+            _checked_at = time.monotonic()
+            logger.exception("Directions registry version check failed")
+        finally:
+            _reload_lock.release()
+        return _current
+    return registry
+
+
+def load_at_startup() -> None:
+    """Warm the registry in this worker; a database that is not up yet only delays it to first use"""
+    try:
+        reload()
+    except Exception as e:
+        logger.warning(f"Directions registry not loaded at startup: {e}")
+
+
+def metric_values() -> Dict[str, float]:
+    registry = _current
+    return {
+        **_stats,
+        "directions": len(registry.entries) if registry else 0,
+        "age_seconds": round(time.time() - registry.loaded_at, 1) if registry else 0,
+    }
+
+
+metrics.register("directions_registry", metric_values)
@@ -4,7 +4,10 @@ Custom error handlers and exceptions
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
 
 
 class AppealNotFoundError(Exception):
@@ -17,6 +20,14 @@ class AttachmentNotFoundError(Exception):
     pass
 
 
+class AttachmentTooLargeError(Exception):
+    """Uploaded attachment exceeds ATTACHMENT_MAX_BYTES (see attachment_store.py)"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Attachment exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
 class UnauthorizedError(Exception):
     """Unauthorized access"""
     pass
@@ -27,6 +38,15 @@ class ForbiddenError(Exception):
     pass
 
 
+class QueryTooExpensiveError(Exception):
+    """Planner cost estimate of a query exceeds the route's limit (see query_budget.py)"""
+
+    def __init__(self, cost: float, max_cost: float):
+        super().__init__(f"Estimated query cost {cost:.0f} exceeds limit {max_cost:.0f}")
+        self.cost = cost
+        self.max_cost = max_cost
+
+
 async def appeal_not_found_handler(request: Request, exc: AppealNotFoundError):
     return JSONResponse(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -41,6 +61,13 @@ async def attachment_not_found_handler(request: Request, exc: AttachmentNotFound
     )
 
 
+async def attachment_too_large_handler(request: Request, exc: AttachmentTooLargeError):
+    return JSONResponse(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content={"detail": "Attachment too large", "max_bytes": exc.max_bytes}
+    )
+
+
 async def unauthorized_handler(request: Request, exc: UnauthorizedError):
     return JSONResponse(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,3 +100,26 @@ async def integrity_error_handler(request: Request, exc: IntegrityError):
         content={"detail": "Database integrity error", "message": str(exc.orig)}
     )
 
+
+
+async def query_too_expensive_handler(request: Request, exc: QueryTooExpensiveError):
+    """Query rejected before execution: the client has to narrow it down"""
+    return JSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        content={
+            "detail": "Query too expensive, narrow the date range or filters",
+            "estimated_cost": round(exc.cost),
+            "max_cost": round(exc.max_cost)
+        }
+    )
+
+
+async def statement_timeout_handler(request: Request, exc: OperationalError):
+    """Statement cancelled by its route's statement_timeout"""
+    if getattr(exc.orig, "pgcode", None) != QUERY_CANCELED:
+        raise exc
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Query timed out, try again later or narrow the request"},
+        headers={"Retry-After": "30"}
+    )
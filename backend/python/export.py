@@ -3,10 +3,60 @@ Data export functionality (CSV, Excel)
 """
 import csv
 import io
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, List, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
 from models import Appeal, Content, Direction
+import directions_registry
+
+
+def appeal_headers(include_internal: bool = False) -> List[str]:
+    headers = [
+        "ID", "Заголовок", "Описание", "Статус", "Приоритет",
+        "Направление", "Дата создания", "Дата закрытия",
+        "Тип контакта", "Институт", "Категория"
+    ]
+    if include_internal:
+        headers.extend(["Назначено", "Дедлайн", "Теги"])
+    return headers
+
+
+def appeal_row(
+    appeal: Appeal,
+    include_internal: bool = False,
+    direction_titles: Optional[Dict] = None
+) -> List:
+    """
+    One export row. ``direction_titles`` ({direction_id: title}, usually
+    directions_registry.current().titles) avoids loading appeal.direction
+    for every row.
+    """
+    if direction_titles is not None:
+        direction_name = direction_titles.get(appeal.direction_id, "")
+    else:
+        direction_name = appeal.direction.title if appeal.direction else ""
+
+    row = [
+        str(appeal.id),
+        appeal.title,
+        appeal.description[:200] + "..." if len(appeal.description) > 200 else appeal.description,
+        appeal.status,
+        appeal.priority or "normal",
+        direction_name,
+        appeal.created_at.strftime("%Y-%m-%d %H:%M:%S") if appeal.created_at else "",
+        appeal.closed_at.strftime("%Y-%m-%d %H:%M:%S") if appeal.closed_at else "",
+        appeal.contact_type or "",
+        appeal.institute or "",
+        appeal.category or "",
+    ]
+
+    if include_internal:
+        row.extend([
+            str(appeal.assigned_to) if appeal.assigned_to else "",
+            appeal.deadline.strftime("%Y-%m-%d") if appeal.deadline else "",
+            ", ".join(appeal.tags) if appeal.tags else "",
+        ])
+    return row
 
 
 def export_appeals_to_csv(
@@ -21,43 +71,14 @@ def export_appeals_to_csv(
     writer = csv.writer(output)
     
     # Headers
-    headers = [
-        "ID", "Заголовок", "Описание", "Статус", "Приоритет",
-        "Направление", "Дата создания", "Дата закрытия",
-        "Тип контакта", "Институт", "Категория"
-    ]
-    
-    if include_internal:
-        headers.extend(["Назначено", "Дедлайн", "Теги"])
+    headers = appeal_headers(include_internal)
     
     writer.writerow(headers)
     
     # Data rows
+    direction_titles = directions_registry.current().titles
     for appeal in appeals:
-        direction_name = ""
-        if appeal.direction:
-            direction_name = appeal.direction.title
-        
-        row = [
-            str(appeal.id),
-            appeal.title,
-            appeal.description[:200] + "..." if len(appeal.description) > 200 else appeal.description,
-            appeal.status,
-            appeal.priority or "normal",
-            direction_name,
-            appeal.created_at.strftime("%Y-%m-%d %H:%M:%S") if appeal.created_at else "",
-            appeal.closed_at.strftime("%Y-%m-%d %H:%M:%S") if appeal.closed_at else "",
-            appeal.contact_type or "",
-            appeal.institute or "",
-            appeal.category or "",
-        ]
-        
-        if include_internal:
-            row.extend([
-                str(appeal.assigned_to) if appeal.assigned_to else "",
-                appeal.deadline.strftime("%Y-%m-%d") if appeal.deadline else "",
-                ", ".join(appeal.tags) if appeal.tags else "",
-            ])
+        row = appeal_row(appeal, include_internal, direction_titles)
         
         writer.writerow(row)
     
@@ -83,14 +104,7 @@ def export_appeals_to_excel(
     ws.title = "Обращения"
     
     # Headers
-    headers = [
-        "ID", "Заголовок", "Описание", "Статус", "Приоритет",
-        "Направление", "Дата создания", "Дата закрытия",
-        "Тип контакта", "Институт", "Категория"
-    ]
-    
-    if include_internal:
-        headers.extend(["Назначено", "Дедлайн", "Теги"])
+    headers = appeal_headers(include_internal)
     
     # Style headers
     header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
@@ -103,31 +117,9 @@ def export_appeals_to_excel(
         cell.alignment = Alignment(horizontal="center", vertical="center")
     
     # Data rows
+    direction_titles = directions_registry.current().titles
     for row_num, appeal in enumerate(appeals, 2):
-        direction_name = ""
-        if appeal.direction:
-            direction_name = appeal.direction.title
-        
-        row = [
-            str(appeal.id),
-            appeal.title,
-            appeal.description[:200] + "..." if len(appeal.description) > 200 else appeal.description,
-            appeal.status,
-            appeal.priority or "normal",
-            direction_name,
-            appeal.created_at.strftime("%Y-%m-%d %H:%M:%S") if appeal.created_at else "",
-            appeal.closed_at.strftime("%Y-%m-%d %H:%M:%S") if appeal.closed_at else "",
-            appeal.contact_type or "",
-            appeal.institute or "",
-            appeal.category or "",
-        ]
-        
-        if include_internal:
-            row.extend([
-                str(appeal.assigned_to) if appeal.assigned_to else "",
-                appeal.deadline.strftime("%Y-%m-%d") if appeal.deadline else "",
-                ", ".join(appeal.tags) if appeal.tags else "",
-            ])
+        row = appeal_row(appeal, include_internal, direction_titles)
         
         for col_num, value in enumerate(row, 1):
             ws.cell(row=row_num, column=col_num, value=value)
@@ -152,6 +144,74 @@ def export_appeals_to_excel(
     return output.getvalue()
 
 
+def write_appeals_csv(
+    path: str,
+    appeals: Iterable[Appeal],
+    include_internal: bool = False,
+    direction_titles: Optional[Dict] = None,
+    progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Stream appeals into a CSV file (same format as export_appeals_to_csv)
+    without holding the rows in memory. ``progress`` is called with the
+    number of rows written so far. Returns the row count.
+    """
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(appeal_headers(include_internal))
+        for count, appeal in enumerate(appeals, 1):
+            writer.writerow(appeal_row(appeal, include_internal, direction_titles))
+            if progress and count % 1000 == 0:
+                progress(count)
+    return count
+
+
+def write_appeals_excel(
+    path: str,
+    appeals: Iterable[Appeal],
+    include_internal: bool = False,
+    direction_titles: Optional[Dict] = None,
+    progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Stream appeals into an Excel file. Uses openpyxl's write-only mode
+    (constant memory), so column widths are fixed instead of fitted.
+    """
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill, Alignment
+        from openpyxl.utils import get_column_letter
+    except ImportError:
+        raise ImportError("openpyxl is required for Excel export. Install with: pip install openpyxl")
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Обращения")
+    headers = appeal_headers(include_internal)
+    for col_num, header in enumerate(headers, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = 50 if header == "Описание" else 20
+
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    count = 0
+    for count, appeal in enumerate(appeals, 1):
+        ws.append(appeal_row(appeal, include_internal, direction_titles))
+        if progress and count % 1000 == 0:
+            progress(count)
+    wb.save(path)
+    return count
+
+
 def export_statistics_to_csv(stats: dict) -> str:
     """
     Export statistics to CSV
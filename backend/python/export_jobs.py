@@ -0,0 +1,389 @@
+"""
+Background export jobs
+
+/api/export/appeals/{csv,excel} build the file inside the request and are
+capped at 10 000 rows; large exports time out on the client, get retried and
+multiply the load. An export job instead:
+
+1. is submitted (POST /api/export/jobs) and answered at once with a job id;
+2. runs on a small thread pool, streaming rows from the database (yield_per)
+   straight into the CSV / XLSX file on disk, with progress in its status;
+3. is downloaded with Range support (resumable, see file_responses.py).
+
+Identical requests (same format and filters) share one job while it is queued
+or running, and reuse the finished file for EXPORT_JOB_REUSE_SECONDS.
+Finished and failed jobs are removed after EXPORT_JOB_TTL_SECONDS by a sweeper
+thread. A queued or running job whose process died or stalled is marked failed
+(by the sweeper or when its status is read) and expires the same way.
+
+Job state lives next to the files in EXPORT_DIR (``<id>.json``), so every
+worker process can answer status and download requests and deduplication
+works across processes (``key-<hash>`` files created atomically). A job whose
+process died is detected by its owner pid / stale heartbeat, marked failed and
+replaced on the next identical submit.
+
+Environment:
+    EXPORT_DIR                  directory of job files (default: <tmp>/oss_dvfu_exports)
+    EXPORT_WORKERS              export threads per worker process (1)
+    EXPORT_JOB_MAX_ROWS         row cap of one job (200000)
+    EXPORT_JOB_TTL_SECONDS      lifetime of finished files (3600)
+    EXPORT_JOB_REUSE_SECONDS    identical requests get the finished file (300)
+    EXPORT_JOB_STALL_SECONDS    running job without progress counts as dead (600)
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.getenv("EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "oss_dvfu_exports")
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "1"))
+EXPORT_JOB_MAX_ROWS = int(os.getenv("EXPORT_JOB_MAX_ROWS", "200000"))
+EXPORT_JOB_TTL_SECONDS = float(os.getenv("EXPORT_JOB_TTL_SECONDS", "3600"))
+EXPORT_JOB_REUSE_SECONDS = float(os.getenv("EXPORT_JOB_REUSE_SECONDS", "300"))
+EXPORT_JOB_STALL_SECONDS = float(os.getenv("EXPORT_JOB_STALL_SECONDS", "600"))
+SWEEP_INTERVAL_SECONDS = 60
+
+FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Rows fetched per round trip while streaming
+FETCH_SIZE = 1000
+
+_HOST = socket.gethostname()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_sweeper: Optional[threading.Thread] = None
+
+
+def job_key(params: Dict) -> str:
+    """Identity of an export request for deduplication"""
+    canonical = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _meta_path(job_id: str) -> str:
+    return os.path.join(EXPORT_DIR, f"{job_id}.json")
+
+
+def _key_path(key: str) -> str:
+    return os.path.join(EXPORT_DIR, f"key-{key}")
+
+
+def artifact_path(job: Dict) -> str:
+    return os.path.join(EXPORT_DIR, f"{job['id']}.{FORMATS[job['format']][0]}")
+
+
+def media_type(job: Dict) -> str:
+    return FORMATS[job["format"]][1]
+
+
+def _valid_job_id(job_id: str) -> bool:
+    return len(job_id) == 32 and all(c in "0123456789abcdef" for c in job_id)
+
+
+def load_job(job_id: str) -> Optional[Dict]:
+    if not _valid_job_id(job_id):
+        return None
+    try:
+        with open(_meta_path(job_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_job(job: Dict) -> None:
+    job["updated_at"] = time.time()
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(job, f)
+    os.replace(tmp_path, _meta_path(job["id"]))
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _owner_alive(job: Dict) -> bool:
+    host, _, pid = job.get("owner", "").rpartition(":")
+    if host != _HOST:
+        return True  # another machine: only the heartbeat tells
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass
+    return True
+
+
+def _abandoned(job: Dict, now: float) -> bool:
+    """
+    Queued or running job whose process died (recycled, killed) or that has
+    made no progress for EXPORT_JOB_STALL_SECONDS. A queued job waits without
+    a heartbeat behind other jobs of its process, so its age only counts when
+    the owner is on another machine and cannot be checked directly.
+    """
+    if job["status"] not in (QUEUED, RUNNING):
+        return False
+    if not _owner_alive(job):
+        return True
+    stalled = now - job["updated_at"] >= EXPORT_JOB_STALL_SECONDS
+    if job["status"] == RUNNING:
+        return stalled
+    return stalled and not job.get("owner", "").startswith(f"{_HOST}:")
+
+
+def _release_key(job: Dict) -> None:
+    """Remove the dedup key if it still points to ``job``"""
+    key_path = _key_path(job["key"])
+    try:
+        with open(key_path, "r") as f:
+            if f.read().strip() == job["id"]:
+                _unlink(key_path)
+    except FileNotFoundError:
+        pass
+
+
+def _fail_abandoned(job: Dict, now: float) -> None:
+    _unlink(artifact_path(job) + ".part")
+    _release_key(job)
+    job.update(status=FAILED, error="Export worker stopped before the job finished",
+               finished_at=now, expires_at=now + EXPORT_JOB_TTL_SECONDS)
+    _save_job(job)
+    logger.warning(f"Export job {job['id']} abandoned by {job.get('owner')}, marked failed")
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """load_job for the API: a job left behind by a dead or stalled worker is reported as failed"""
+    job = load_job(job_id)
+    if job is not None:
+        now = time.time()
+        if _abandoned(job, now):
+            _fail_abandoned(job, now)
+    return job
+
+
+def _reusable(job: Optional[Dict]) -> bool:
+    """Whether an identical new request should be answered with ``job``"""
+    if job is None:
+        return False
+    now = time.time()
+    if job["status"] in (QUEUED, RUNNING):
+        return not _abandoned(job, now)
+    if job["status"] == DONE:
+        return now - job["finished_at"] < EXPORT_JOB_REUSE_SECONDS and os.path.exists(artifact_path(job))
+    return False
+
+
+def _claim_key(key_path: str, job_id: str) -> bool:
+    """Point the dedup key at job_id unless it exists (link is atomic and never exposes a partial file)"""
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(job_id)
+        os.link(tmp_path, key_path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        _unlink(tmp_path)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+        return _executor
+
+
+def submit(format: str, params: Dict) -> Dict:
+    """
+    Queue an export of appeals (``params``: direction_id, status,
+    include_internal) or return the identical job already queued, running or
+    recently finished. The returned dict has ``deduplicated`` set accordingly.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    key = job_key({"format": format, **params})
+    key_path = _key_path(key)
+
+    for _ in range(3):
+        try:
+            with open(key_path, "r") as f:
+                existing = load_job(f.read().strip())
+        except FileNotFoundError:
+            existing = None
+        else:
+            if _reusable(existing):
+                return {**existing, "deduplicated": True}
+            # Finished long ago, failed or orphaned: a new job takes over the key
+            _unlink(key_path)
+
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "key": key,
+            "format": format,
+            "params": params,
+            "status": QUEUED,
+            "rows_done": 0,
+            "rows_total": None,
+            "size": None,
+            "error": None,
+            "owner": f"{_HOST}:{os.getpid()}",
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "expires_at": None,
+        }
+        _save_job(job)
+        if not _claim_key(key_path, job["id"]):
+            # Another process claimed the key first; look again
+            _unlink(_meta_path(job["id"]))
+            continue
+        _get_executor().submit(_run, job)
+        logger.info(f"Export job {job['id']} queued ({format}, {params})")
+        return {**job, "deduplicated": False}
+
+    raise RuntimeError("Could not claim export job key")
+
+
+def describe(job: Dict) -> Dict:
+    """Job as returned by the API (schemas.ExportJob)"""
+    total = job.get("rows_total")
+    if job["status"] == DONE:
+        progress = 1.0
+    elif total:
+        progress = round(min(job["rows_done"] / total, 1.0), 3)
+    else:
+        progress = 0.0 if job["status"] in (QUEUED, RUNNING) else None
+    return {
+        **job,
+        "progress": progress,
+        "status_url": f"/api/export/jobs/{job['id']}",
+        "download_url": f"/api/export/jobs/{job['id']}/download" if job["status"] == DONE else None,
+    }
+
+
+def _appeals_query(db, params: Dict):
+    import crud
+    return crud.appeals_query(
+        db,
+        direction_id=params.get("direction_id"),
+        status=params.get("status"),
+        skip=0,
+        limit=EXPORT_JOB_MAX_ROWS,
+    )
+
+
+def _run(job: Dict) -> None:
+    import directions_registry
+    import export
+    from database import background_session
+
+    job.update(status=RUNNING, started_at=time.time())
+    _save_job(job)
+    path = artifact_path(job)
+    tmp_path = path + ".part"
+    db = background_session("export", read=True)
+    try:
+        params = job["params"]
+        query = _appeals_query(db, params)
+        job["rows_total"] = min(query.limit(None).offset(None).order_by(None).count(), EXPORT_JOB_MAX_ROWS)
+        _save_job(job)
+
+        def progress(rows_done: int) -> None:
+            job["rows_done"] = rows_done
+            _save_job(job)
+
+        write = export.write_appeals_csv if job["format"] == "csv" else export.write_appeals_excel
+        rows = write(
+            tmp_path,
+            query.yield_per(FETCH_SIZE),
+            include_internal=params.get("include_internal", False),
+            direction_titles=directions_registry.current().titles,
+            progress=progress,
+        )
+        os.replace(tmp_path, path)
+        finished = time.time()
+        job.update(
+            status=DONE,
+            rows_done=rows,
+            size=os.path.getsize(path),
+            finished_at=finished,
+            expires_at=finished + EXPORT_JOB_TTL_SECONDS,
+        )
+        _save_job(job)
+        logger.info(f"Export job {job['id']} done: {rows} rows in {finished - job['started_at']:.1f}s")
+    except Exception as e:
+        logger.exception(f"Export job {job['id']} failed")
+        _unlink(tmp_path)
+        finished = time.time()
+        job.update(status=FAILED, error=str(e)[:500], finished_at=finished,
+                   expires_at=finished + EXPORT_JOB_TTL_SECONDS)
+        _save_job(job)
+    finally:
+        db.close()
+
+
+def sweep() -> int:
+    """Delete expired jobs and their files; returns the number removed"""
+    removed = 0
+    now = time.time()
+    try:
+        names = os.listdir(EXPORT_DIR)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if not name.endswith(".json") or name.startswith("."):
+            continue
+        job = load_job(name[:-len(".json")])
+        if job is None:
+            continue
+        if _abandoned(job, now):
+            # Never gets expires_at from its worker; expires from now on
+            _fail_abandoned(job, now)
+            continue
+        if not job.get("expires_at") or job["expires_at"] > now:
+            continue
+        _unlink(artifact_path(job))
+        _release_key(job)
+        _unlink(_meta_path(job["id"]))
+        removed += 1
+    if removed:
+        logger.info(f"Removed {removed} expired export jobs")
+    return removed
+
+
+def _sweep_loop() -> None:
+    while True:
+        time.sleep(SWEEP_INTERVAL_SECONDS)
+        try:
+            sweep()
+        except Exception:
+            logger.exception("Export job sweep failed")
+
+
+def start_sweeper() -> None:
+    """Start the expiry sweeper in this (worker) process"""
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = threading.Thread(target=_sweep_loop, name="export-sweeper", daemon=True)
+        _sweeper.start()
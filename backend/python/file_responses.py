@@ -0,0 +1,149 @@
+"""
+File responses with HTTP Range support
+
+Starlette's FileResponse (0.35) always sends the whole file. Downloads of
+large artifacts (exports, attachments) need resumption, so ranged_file_response()
+answers ``Range: bytes=...`` with 206 Partial Content, honours ``If-Range``
+(a changed file is sent in full again) and rejects unsatisfiable ranges with
+416. Only single ranges are served; a multi-range request gets the full file,
+which RFC 9110 allows.
+"""
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import Request, Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    ``Range`` header -> (start, end) inclusive, or None to send the full file
+    (other units, multiple ranges, malformed headers are ignored).
+    Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    first, last = first.strip(), last.strip()
+    if not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _if_range_matches(if_range: str, etag: str, stat_result: os.stat_result) -> bool:
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    try:
+        return parsedate_to_datetime(if_range).timestamp() >= int(stat_result.st_mtime)
+    except (TypeError, ValueError):
+        return False
+
+
+class RangeFileResponse(Response):
+    """Sends ``length`` bytes of a file starting at ``offset``"""
+
+    def __init__(self, path: str, offset: int, length: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.length
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.offset)
+            while remaining:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining:
+            # File shrank underneath us; end the body so the client sees a short read
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def ranged_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    filename: Optional[str] = None,
+    headers: Optional[dict] = None,
+    etag: Optional[str] = None
+) -> Response:
+    """
+    Serve ``path`` honouring Range / If-Range / If-None-Match. The caller
+    makes sure the file exists. ``etag`` replaces the one derived from
+    mtime and size (e.g. a content hash).
+    """
+    stat_result = os.stat(path)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(path)
+    size = stat_result.st_size
+    etag = etag or file_etag(stat_result)
+    response_headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        **(headers or {}),
+    }
+    if filename:
+        response_headers["content-disposition"] = content_disposition(filename)
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=response_headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header:
+        if_range = request.headers.get("if-range")
+        if if_range is None or _if_range_matches(if_range, etag, stat_result):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={**response_headers, "content-range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return RangeFileResponse(path, 0, size, 200, response_headers, media_type)
+    start, end = byte_range
+    response_headers["content-range"] = f"bytes {start}-{end}/{size}"
+    return RangeFileResponse(path, start, end - start + 1, 206, response_headers, media_type)
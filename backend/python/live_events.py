@@ -0,0 +1,315 @@
+"""
+Live feed of appeal changes (Server-Sent Events)
+
+The admin pages used to poll /api/appeals and /api/appeals/stats/summary
+every few seconds from every open tab. GET /api/appeals/events keeps one
+response open per tab instead and pushes appeal_created, appeal_updated and
+appeal_comment events as they are committed.
+
+Source: triggers from migration appeal_events_notify.sql send a small JSON
+payload (ids, status, priority, direction, assignee - never text) with
+``pg_notify('appeal_events', ...)`` on every insert / update of appeals and
+every new comment, including changes made directly through Supabase. The
+payload carries a value of the appeal_event_seq sequence, used as the SSE
+event id.
+
+Fan-out: every worker process holds one LISTEN connection (a daemon thread,
+started when the first client subscribes) and one Broadcaster on its event
+loop. Each event is encoded once; subscribers get the same bytes through a
+bounded queue. Postgres delivers notifications to every listener in commit
+order, so all workers see the same sequence of events.
+
+Backpressure: a client whose queue is full (LIVE_QUEUE_SIZE events) is
+disconnected rather than slowing down the others or buffering without
+bound. EventSource reconnects by itself and sends Last-Event-ID; events
+still in the worker's ring buffer (LIVE_BUFFER_SIZE) after that id are
+replayed, otherwise the client gets a ``reset`` event and reloads its data.
+``reset`` is also sent when the LISTEN connection had to be re-established
+(notifications in between are lost).
+
+Environment:
+    LIVE_EVENTS_ENABLED       0 answers the endpoint with 503
+    LIVE_BUFFER_SIZE          recent events kept for resuming (2048)
+    LIVE_QUEUE_SIZE           undelivered events per client before it is dropped (256)
+    LIVE_MAX_CLIENTS          open streams per worker (500)
+    LIVE_HEARTBEAT_SECONDS    comment line sent to idle streams (15)
+"""
+import asyncio
+import logging
+import os
+import select
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, NamedTuple, Optional, Set
+
+import orjson
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+LIVE_EVENTS_ENABLED = os.getenv("LIVE_EVENTS_ENABLED", "1") != "0"
+LIVE_BUFFER_SIZE = int(os.getenv("LIVE_BUFFER_SIZE", "2048"))
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+LIVE_MAX_CLIENTS = int(os.getenv("LIVE_MAX_CLIENTS", "500"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+
+CHANNEL = "appeal_events"
+
+# Reconnect delay suggested to EventSource, milliseconds
+RETRY_MS = 3000
+
+HEARTBEAT = b": ping\n\n"
+RESET = b"event: reset\ndata: {}\n\n"
+
+
+class Event(NamedTuple):
+    id: int
+    direction_id: Optional[str]
+    assigned_to: Optional[str]
+    # Complete SSE frame, shared by all subscribers
+    frame: bytes
+
+
+class TooManyClients(Exception):
+    pass
+
+
+def encode(payload: str) -> Event:
+    """Event from a NOTIFY payload of the appeal_events triggers"""
+    data = orjson.loads(payload)
+    seq = data.pop("seq")
+    event_type = data.pop("type")
+    frame = b"id: %d\nevent: %s\ndata: %s\n\n" % (seq, event_type.encode(), orjson.dumps(data))
+    return Event(seq, data.get("direction_id"), data.get("assigned_to"), frame)
+
+
+class Subscriber:
+    __slots__ = ("queue", "direction_id", "assigned_to", "dropped")
+
+    def __init__(self, direction_id: Optional[str], assigned_to: Optional[str], queue_size: int):
+        # Frames to send; None closes the stream
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(queue_size)
+        self.direction_id = direction_id
+        self.assigned_to = assigned_to
+        self.dropped = False
+
+    def wants(self, event: Event) -> bool:
+        return (
+            (self.direction_id is None or self.direction_id == event.direction_id)
+            and (self.assigned_to is None or self.assigned_to == event.assigned_to)
+        )
+
+    def offer(self, frame: bytes) -> bool:
+        """Queue a frame; False (and the stream is closed) if the client is too far behind"""
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+
+class Broadcaster:
+    """Fans events out to the subscribers of this worker; event loop thread only"""
+
+    def __init__(self, buffer_size: int = LIVE_BUFFER_SIZE, queue_size: int = LIVE_QUEUE_SIZE,
+                 max_clients: int = LIVE_MAX_CLIENTS):
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._recent: Deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscriber] = set()
+        self.events = 0
+        self.deliveries = 0
+        self.dropped_clients = 0
+        self.resumed = 0
+        self.resets = 0
+        self.bad_payloads = 0
+
+    def subscribe(self, direction_id: Optional[str] = None, assigned_to: Optional[str] = None,
+                  last_event_id: Optional[int] = None) -> Subscriber:
+        """
+        New subscriber; with ``last_event_id`` the buffered events after it
+        are queued first (or ``reset`` if that event is no longer buffered or
+        too much was missed)
+        """
+        if len(self._subscribers) >= self.max_clients:
+            raise TooManyClients()
+        subscriber = Subscriber(direction_id, assigned_to, self.queue_size)
+        if last_event_id is not None:
+            missed = self._since(last_event_id)
+            # More than the queue holds would only get the client dropped again
+            if missed is None or len(missed) >= self.queue_size:
+                self.resets += 1
+                subscriber.offer(RESET)
+            else:
+                self.resumed += 1
+                for event in missed:
+                    if subscriber.wants(event) and not subscriber.offer(event.frame):
+                        break
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def _since(self, last_event_id: int) -> Optional[List[Event]]:
+        # Newest first: a resuming client is usually only a few events behind
+        for index in range(len(self._recent) - 1, -1, -1):
+            if self._recent[index].id == last_event_id:
+                return [self._recent[i] for i in range(index + 1, len(self._recent))]
+        return None
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def publish(self, payloads: List[str]) -> None:
+        for payload in payloads:
+            try:
+                event = encode(payload)
+            except (ValueError, KeyError, TypeError):
+                self.bad_payloads += 1
+                logger.warning(f"Ignoring malformed {CHANNEL} payload: {payload[:200]}")
+                continue
+            self._recent.append(event)
+            self.events += 1
+            for subscriber in list(self._subscribers):
+                if not subscriber.wants(event):
+                    continue
+                if subscriber.offer(event.frame):
+                    self.deliveries += 1
+                elif subscriber.dropped:
+                    self.dropped_clients += 1
+                    self._subscribers.discard(subscriber)
+
+    def reset(self) -> None:
+        """Events may have been missed: nothing buffered can be resumed from"""
+        self._recent.clear()
+        for subscriber in list(self._subscribers):
+            subscriber.offer(RESET)
+
+    def metric_values(self) -> Dict[str, float]:
+        return {
+            "clients": len(self._subscribers),
+            "buffered": len(self._recent),
+            "events": self.events,
+            "deliveries": self.deliveries,
+            "dropped_clients": self.dropped_clients,
+            "resumed": self.resumed,
+            "resets": self.resets,
+            "bad_payloads": self.bad_payloads,
+        }
+
+
+class Listener:
+    """LISTEN connection of this worker, handing notifications to the broadcaster's loop"""
+
+    def __init__(self, broadcaster: Broadcaster, loop: asyncio.AbstractEventLoop):
+        self.broadcaster = broadcaster
+        self.loop = loop
+        self.connects = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="live-events", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _connect(self):
+        import psycopg2
+
+        from database import engine
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn, connect_timeout=10)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return conn
+
+    def _run(self) -> None:
+        delay = 1.0
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                if self.connects:
+                    # Whatever was notified while disconnected is lost
+                    self.loop.call_soon_threadsafe(self.broadcaster.reset)
+                self.connects += 1
+                delay = 1.0
+                self._listen(conn)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"{CHANNEL} listener failed, reconnecting in {delay:.0f}s: {e}")
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    def _listen(self, conn) -> None:
+        while True:
+            if select.select([conn], [], [], LIVE_HEARTBEAT_SECONDS) == ([], [], []):
+                # Idle: make sure the connection is still there
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            conn.poll()
+            if conn.notifies:
+                payloads = [notify.payload for notify in conn.notifies]
+                conn.notifies.clear()
+                self.loop.call_soon_threadsafe(self.broadcaster.publish, payloads)
+
+
+broadcaster = Broadcaster()
+metrics.register("live_events", broadcaster.metric_values)
+
+_listener: Optional[Listener] = None
+
+
+def ensure_listening() -> None:
+    """Start this worker's LISTEN thread (from the event loop, on the first subscriber)"""
+    global _listener
+    if _listener is None:
+        _listener = Listener(broadcaster, asyncio.get_running_loop())
+        _listener.start()
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def stream(subscriber: Subscriber, is_disconnected) -> AsyncIterator[bytes]:
+    """SSE body for ``subscriber``; ``is_disconnected`` is Request.is_disconnected"""
+    try:
+        yield b"retry: %d\n\n" % RETRY_MS
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscriber.queue.get(), LIVE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield HEARTBEAT
+                continue
+            if frame is None:
+                return
+            # Send whatever else is already queued in the same write
+            frames = [frame]
+            while not subscriber.queue.empty():
+                frame = subscriber.queue.get_nowait()
+                if frame is None:
+                    break
+                frames.append(frame)
+            yield b"".join(frames)
+            if frame is None:
+                return
+    finally:
+        broadcaster.unsubscribe(subscriber)
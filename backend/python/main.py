@@ -1,38 +1,50 @@
 """
 FastAPI application for OSS DVFU backend
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, Response
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, Response, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from uuid import UUID
 from datetime import date
+import attachment_store
+import content_cache
 import crud
-import search
-import export
-import analytics
-from middleware import setup_rate_limiting, logging_middleware, limiter
+import models
+import pagination
+import serialization
+import snapshots
+from middleware import (
+    setup_rate_limiting, logging_middleware, read_your_writes_middleware, pool_leak_middleware, limiter
+)
+import metrics
+import pool_metrics
 
-from database import get_db, engine, Base
+from database import (
+    get_db, get_read_db, get_search_db, get_analytics_db, get_export_db, start_liveness_checks,
+    recently_wrote
+)
 from models import Appeal, Direction, Content, Document, AppealAttachment
+from sqlalchemy.exc import OperationalError
 from errors import (
-    AppealNotFoundError, AttachmentNotFoundError,
-    appeal_not_found_handler, attachment_not_found_handler
+    AppealNotFoundError, AttachmentNotFoundError, AttachmentTooLargeError, QueryTooExpensiveError,
+    appeal_not_found_handler, attachment_not_found_handler, attachment_too_large_handler,
+    query_too_expensive_handler, statement_timeout_handler
 )
 from schemas import (
-    AppealCreate, Appeal, AppealUpdate, AppealPublic, TokenResponse,
-    AppealCommentCreate, AppealComment,
-    ContentCreate, Content, ContentUpdate,
+    AppealCreate, Appeal, AppealUpdate, AppealPublic, AppealSummary, AppealFull, AppealBatch, TokenResponse,
+    AppealCommentCreate, AppealComment, AppealCounters, AppealHistory,
+    ContentCreate, Content, ContentUpdate, ContentSummary, ContentBatch,
     DocumentCreate, Document,
-    Direction, DirectionCreate,
+    Direction, DirectionCreate, DirectionBatch,
     UserRoleCreate, UserRole,
     AppealStats, MessageResponse,
-    AppealAttachmentCreate, AppealAttachment
+    AppealAttachmentCreate, AppealAttachment,
+    ExportJobCreate, ExportJob
 )
 
-# Create tables (in production, use migrations)
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="OSS DVFU API",
     description="Backend API for OSS DVFU website",
@@ -44,12 +56,44 @@ app = FastAPI(
 # Setup rate limiting
 app = setup_rate_limiting(app)
 
+
+@app.on_event("startup")
+def start_background_checks():
+    # Started per worker process, after fork
+    start_liveness_checks()
+    import export_jobs
+    export_jobs.start_sweeper()
+    import directions_registry
+    directions_registry.load_at_startup()
+    import deadlines
+    deadlines.start()
+    import notifications
+    notifications.start()
+    import audit
+    audit.start()
+
+
+@app.on_event("shutdown")
+def flush_background_writes():
+    import audit
+    audit.stop()
+
+
 # Add logging middleware
 app.middleware("http")(logging_middleware)
 
+# Keep a client's reads on the primary right after it writes
+app.middleware("http")(read_your_writes_middleware)
+
+# Attribute pool connections to requests and report leaked ones
+app.middleware("http")(pool_leak_middleware)
+
 # Register error handlers
 app.add_exception_handler(AppealNotFoundError, appeal_not_found_handler)
 app.add_exception_handler(AttachmentNotFoundError, attachment_not_found_handler)
+app.add_exception_handler(AttachmentTooLargeError, attachment_too_large_handler)
+app.add_exception_handler(QueryTooExpensiveError, query_too_expensive_handler)
+app.add_exception_handler(OperationalError, statement_timeout_handler)
 
 # CORS middleware
 import os
@@ -60,28 +104,82 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursors of keyset-paginated lists (see pagination.py)
+    expose_headers=[pagination.NEXT_CURSOR_HEADER, "Link"],
 )
 
 
+# Upper bound of ids per batch request (/batch, /api/appeals/counters): one page of a list UI
+MAX_BATCH_IDS = 200
+IDS_DESCRIPTION = f"Comma-separated IDs, at most {MAX_BATCH_IDS}"
+
+
+def parse_ids(ids: str) -> List[UUID]:
+    """``ids`` query parameter -> unique UUIDs in request order (422 if invalid or too many)"""
+    try:
+        parsed = list(dict.fromkeys(UUID(value.strip()) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated UUIDs")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    return parsed
+
+
+# Sparse fieldsets of list endpoints (see serialization.resolve_fields)
+FIELDS_DESCRIPTION = "full (default), summary (no large text columns) or a comma-separated list of fields"
+
+
 # Health check
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Metrics of this worker process in the Prometheus text format"""
+    return metrics.render_prometheus()
+
+
+# ==================== Admin ====================
+
+@app.get("/api/admin/pool")
+def get_pool_stats():
+    """Connection pool usage of this worker: waits, hold times per route, overflow, leaks (admin endpoint)"""
+    return {
+        "pid": os.getpid(),
+        "engines": {name: stats.summary() for name, stats in pool_metrics.all_stats().items()},
+    }
+
+
 # ==================== Directions ====================
 
 @app.get("/api/directions", response_model=List[Direction])
 def get_directions(
+    request: Request,
     active_only: bool = Query(True),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all directions"""
+    if active_only and skip == 0 and limit == snapshots.SNAPSHOT_LIMIT and not recently_wrote(request):
+        snapshot = snapshots.response_for(request, "directions")
+        if snapshot is not None:
+            return snapshot
     return crud.get_directions(db, skip=skip, limit=limit, active_only=active_only)
 
 
+@app.get("/api/directions/batch", response_model=DirectionBatch)
+def get_directions_batch(
+    ids: str = Query(..., description=IDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
+):
+    """Several directions by ID in one query, in request order; unknown IDs are listed in missing"""
+    items, missing = crud.get_directions_by_ids(db, parse_ids(ids))
+    return {"items": items, "missing": missing}
+
+
 @app.get("/api/directions/{direction_id}", response_model=Direction)
 def get_direction(direction_id: UUID, db: Session = Depends(get_db)):
     """Get direction by ID"""
@@ -131,21 +229,87 @@ def get_appeals(
     sort_order: Optional[str] = Query("desc", pattern="^(asc|desc)$"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
     """Get appeals with improved sorting (admin endpoint - requires auth in production)"""
     if overdue_only:
-        return crud.get_overdue_appeals(db, skip=skip, limit=limit)
-    return crud.get_appeals(
-        db, 
-        skip=skip, 
-        limit=limit, 
-        direction_id=direction_id, 
-        status=status,
-        priority=priority,
-        assigned_to=assigned_to,
-        sort_by=sort_by,
-        sort_order=sort_order
+        query = crud.overdue_appeals_query(db, skip=skip, limit=limit)
+    else:
+        query = crud.appeals_query(
+            db, 
+            skip=skip, 
+            limit=limit, 
+            direction_id=direction_id, 
+            status=status,
+            priority=priority,
+            assigned_to=assigned_to,
+            sort_by=sort_by,
+            sort_order=sort_order
+        )
+    projection = serialization.resolve_fields(fields, Appeal, AppealSummary)
+    if projection is not None or serialization.FAST_JSON_RESPONSES:
+        return serialization.rows_response(query, Appeal, models.Appeal, fields=projection)
+    return query.all()
+
+
+@app.get("/api/appeals/batch", response_model=AppealBatch)
+def get_appeals_batch(
+    ids: str = Query(..., description=IDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
+):
+    """Several appeals by ID in one query, in request order; unknown IDs are listed in missing (admin endpoint)"""
+    items, missing = crud.get_appeals_by_ids(db, parse_ids(ids))
+    return {"items": items, "missing": missing}
+
+
+@app.get("/api/appeals/counters", response_model=List[AppealCounters])
+def get_appeal_counters(
+    ids: str = Query(..., description=IDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Comment count, attachment count and last activity for a list of appeals
+    in one query (badges of the appeal list). Results follow the order of
+    ``ids``; unknown IDs are left out.
+    """
+    appeal_ids = parse_ids(ids)
+    if not appeal_ids:
+        return []
+    counters = {row["appeal_id"]: row for row in crud.get_appeal_counters(db, appeal_ids)}
+    return [counters[appeal_id] for appeal_id in appeal_ids if appeal_id in counters]
+
+
+@app.get("/api/appeals/events", response_class=StreamingResponse)
+async def appeal_events_stream(
+    request: Request,
+    direction_id: Optional[UUID] = Query(None),
+    assigned_to: Optional[UUID] = Query(None),
+    last_event_id: Optional[str] = Query(None, description="Resume point when the Last-Event-ID header cannot be set"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-Sent Events feed of appeal changes: appeal_created, appeal_updated,
+    appeal_comment (and reset - reload your data). Optionally filtered by
+    direction and assignee (admin endpoint). See live_events.py.
+    """
+    import live_events
+    if not live_events.LIVE_EVENTS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Live events are disabled")
+    live_events.ensure_listening()
+    try:
+        subscriber = live_events.broadcaster.subscribe(
+            direction_id=str(direction_id) if direction_id else None,
+            assigned_to=str(assigned_to) if assigned_to else None,
+            last_event_id=live_events.parse_last_event_id(last_event_id_header or last_event_id),
+        )
+    except live_events.TooManyClients:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many live clients")
+    return StreamingResponse(
+        live_events.stream(subscriber, request.is_disconnected),
+        media_type="text/event-stream",
+        # No caching, no proxy buffering (nginx)
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -158,6 +322,23 @@ def get_appeal(appeal_id: UUID, db: Session = Depends(get_db)):
     return appeal
 
 
+@app.get("/api/appeals/{appeal_id}/full", response_model=AppealFull)
+def get_appeal_full(
+    appeal_id: UUID,
+    include_internal: bool = Query(True, description="false leaves out internal comments"),
+    db: Session = Depends(get_db)
+):
+    """
+    Appeal with its direction, comments and attachments in one response
+    (admin detail page; replaces separate /comments, /attachments and
+    direction requests)
+    """
+    appeal = crud.get_appeal_full(db, appeal_id, include_internal=include_internal)
+    if not appeal:
+        raise HTTPException(status_code=404, detail="Appeal not found")
+    return appeal
+
+
 @app.patch("/api/appeals/{appeal_id}", response_model=Appeal)
 def update_appeal(
     appeal_id: UUID,
@@ -175,7 +356,7 @@ def update_appeal(
 @limiter.limit("30/minute")
 def get_appeal_stats(
     request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     """Get appeal statistics (admin endpoint)"""
     stats = crud.get_appeal_stats(db)
@@ -189,9 +370,10 @@ def get_detailed_stats(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     direction_id: Optional[UUID] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     """Get detailed appeal statistics with analytics"""
+    import analytics
     stats = analytics.get_detailed_appeal_stats(
         db,
         start_date=start_date,
@@ -208,9 +390,10 @@ def get_user_performance(
     user_id: UUID,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     """Get performance statistics for a user"""
+    import analytics
     stats = analytics.get_user_performance_stats(
         db,
         str(user_id),
@@ -223,9 +406,24 @@ def get_user_performance(
 # ==================== Appeal Comments ====================
 
 @app.get("/api/appeals/{appeal_id}/comments", response_model=List[AppealComment])
-def get_appeal_comments(appeal_id: UUID, db: Session = Depends(get_db)):
-    """Get comments for an appeal (admin endpoint)"""
-    return crud.get_appeal_comments(db, appeal_id)
+def get_appeal_comments(
+    appeal_id: UUID,
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get comments for an appeal, oldest first (admin endpoint). Paginated: the
+    next page's cursor is in the X-Next-Cursor / Link headers.
+    """
+    comments, next_position = crud.get_appeal_comments(
+        db, appeal_id, limit=limit, after=pagination.decode_cursor(cursor)
+    )
+    if next_position is not None:
+        pagination.set_next_cursor(request, response, pagination.encode_cursor(*next_position))
+    return comments
 
 
 @app.post("/api/appeals/{appeal_id}/comments", response_model=AppealComment, status_code=status.HTTP_201_CREATED)
@@ -241,19 +439,49 @@ def create_appeal_comment(
     return crud.create_appeal_comment(db, comment)
 
 
+@app.get("/api/appeals/{appeal_id}/history", response_model=List[AppealHistory])
+def get_appeal_history(
+    appeal_id: UUID,
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the change history of an appeal, newest first (admin endpoint).
+    Paginated: the next page's cursor is in the X-Next-Cursor / Link headers.
+    Changes made through the API appear once the audit buffer is written
+    (AUDIT_FLUSH_SECONDS, see audit.py).
+    """
+    entries, next_position = crud.get_appeal_history(
+        db, appeal_id, limit=limit, before=pagination.decode_cursor(cursor)
+    )
+    if next_position is not None:
+        pagination.set_next_cursor(request, response, pagination.encode_cursor(*next_position))
+    return entries
+
+
 # ==================== Content ====================
 
 @app.get("/api/content", response_model=List[Content])
 def get_contents(
+    request: Request,
     type: Optional[str] = Query(None, pattern="^(news|guide|faq)$"),
     direction_id: Optional[UUID] = Query(None),
     published_only: bool = Query(True),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
     """Get content items"""
-    return crud.get_contents(
+    if (published_only and direction_id is None and skip == 0 and limit == snapshots.SNAPSHOT_LIMIT
+            and fields in (None, "", "full") and not recently_wrote(request)):
+        snapshot = snapshots.response_for(request, snapshots.content_snapshot_name(type))
+        if snapshot is not None:
+            return snapshot
+    query = crud.contents_query(
         db,
         skip=skip,
         limit=limit,
@@ -261,6 +489,20 @@ def get_contents(
         direction_id=direction_id,
         published_only=published_only
     )
+    projection = serialization.resolve_fields(fields, Content, ContentSummary)
+    if projection is not None or serialization.FAST_JSON_RESPONSES:
+        return serialization.rows_response(query, Content, models.Content, fields=projection)
+    return query.all()
+
+
+@app.get("/api/content/batch", response_model=ContentBatch)
+def get_contents_batch(
+    ids: str = Query(..., description=IDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
+):
+    """Several content items by ID in one query, in request order; unknown IDs are listed in missing"""
+    items, missing = crud.get_contents_by_ids(db, parse_ids(ids))
+    return {"items": items, "missing": missing}
 
 
 @app.get("/api/content/{content_id}", response_model=Content)
@@ -273,12 +515,26 @@ def get_content(content_id: UUID, db: Session = Depends(get_db)):
 
 
 @app.get("/api/content/slug/{slug}", response_model=Content)
-def get_content_by_slug(slug: str, db: Session = Depends(get_db)):
-    """Get content by slug"""
+def get_content_by_slug(slug: str, request: Request, db: Session = Depends(get_db)):
+    """Get content by slug (published content is served from content_cache)"""
+    use_cache = not recently_wrote(request)
+    if use_cache:
+        body = content_cache.get(slug)
+        if body is not None:
+            if not body:
+                raise HTTPException(status_code=404, detail="Content not found")
+            return Response(content=body, media_type="application/json")
+    generation = content_cache.generation()
     content = crud.get_content_by_slug(db, slug)
     if not content:
+        if use_cache:
+            content_cache.put_missing(slug, generation)
         raise HTTPException(status_code=404, detail="Content not found")
-    return content
+    if content.status != "published":
+        return content
+    body = serialization.object_json(content, Content)
+    content_cache.put(slug, body, generation)
+    return Response(content=body, media_type="application/json")
 
 
 @app.post("/api/content", response_model=Content, status_code=status.HTTP_201_CREATED)
@@ -304,12 +560,17 @@ def update_content(
 
 @app.get("/api/documents", response_model=List[Document])
 def get_documents(
+    request: Request,
     direction_id: Optional[UUID] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get documents"""
+    if direction_id is None and skip == 0 and limit == snapshots.SNAPSHOT_LIMIT and not recently_wrote(request):
+        snapshot = snapshots.response_for(request, "documents")
+        if snapshot is not None:
+            return snapshot
     return crud.get_documents(db, skip=skip, limit=limit, direction_id=direction_id)
 
 
@@ -319,6 +580,25 @@ def create_document(document: DocumentCreate, db: Session = Depends(get_db)):
     return crud.create_document(db, document)
 
 
+# ==================== Snapshots ====================
+
+@app.get("/api/snapshots/{name}")
+def get_snapshot(name: str, request: Request):
+    """
+    Precompressed snapshot of a public list (directions, documents, content,
+    content-news, content-guide, content-faq). Built on first use if missing.
+    """
+    if name not in snapshots.SNAPSHOTS:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    response = snapshots.response_for(request, name)
+    if response is None:
+        if not snapshots.SNAPSHOTS_ENABLED:
+            raise HTTPException(status_code=404, detail="Snapshots are disabled")
+        snapshots.build_all()
+        response = snapshots.response_for(request, name)
+    return response
+
+
 # ==================== User Roles ====================
 
 @app.get("/api/users/{user_id}/roles", response_model=List[UserRole])
@@ -360,9 +640,86 @@ def create_appeal_attachment(
     appeal = crud.get_appeal(db, attachment.appeal_id)
     if not appeal:
         raise HTTPException(status_code=404, detail="Appeal not found")
+    sha256 = attachment_store.sha256_from_url(attachment.file_url)
+    if sha256 and (attachment.file_size is None or attachment.mime_type is None):
+        # Stored blob: fill in what the client left out
+        blob = attachment_store.blob_info(sha256, attachment.file_name)
+        if blob is None:
+            raise HTTPException(status_code=422, detail="Attachment content not found in the store")
+        attachment.file_size = attachment.file_size if attachment.file_size is not None else blob.size
+        attachment.mime_type = attachment.mime_type or blob.mime_type
     return crud.create_appeal_attachment(db, attachment)
 
 
+@app.post(
+    "/api/appeals/{appeal_id}/attachments",
+    response_model=AppealAttachment,
+    status_code=status.HTTP_201_CREATED
+)
+@limiter.limit("20/minute")
+async def upload_appeal_attachment(
+    appeal_id: UUID,
+    request: Request,
+    file_name: str = Query(..., min_length=1, max_length=255),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload an attachment as the raw request body (Content-Type: the file's
+    type). The body is streamed to disk while it is hashed; identical files
+    are stored once. file_size and mime_type are filled in by the server.
+    """
+    declared_size = request.headers.get("content-length")
+    if declared_size and declared_size.isdigit() and int(declared_size) > attachment_store.ATTACHMENT_MAX_BYTES:
+        raise AttachmentTooLargeError(attachment_store.ATTACHMENT_MAX_BYTES)
+    # Check before reading the body, not after storing it
+    appeal = await run_in_threadpool(crud.get_appeal, db, appeal_id)
+    if not appeal:
+        raise HTTPException(status_code=404, detail="Appeal not found")
+    # Give the pooled connection back while the (possibly slow) body arrives
+    await run_in_threadpool(db.rollback)
+
+    stored = await attachment_store.store_stream(
+        request.stream(), file_name, request.headers.get("content-type")
+    )
+    attachment = AppealAttachmentCreate(
+        appeal_id=appeal_id,
+        file_name=file_name,
+        file_url=stored.url,
+        file_size=stored.size,
+        mime_type=stored.mime_type,
+    )
+    return await run_in_threadpool(crud.create_appeal_attachment, db, attachment)
+
+
+@app.get("/api/attachments/{attachment_id}/download")
+def download_appeal_attachment(attachment_id: UUID, request: Request, db: Session = Depends(get_db)):
+    """Attachment content; supports Range / If-Range for resumed downloads"""
+    from file_responses import content_disposition, ranged_file_response
+    attachment = crud.get_appeal_attachment(db, attachment_id)
+    if not attachment:
+        raise AttachmentNotFoundError()
+    sha256 = attachment_store.sha256_from_url(attachment.file_url)
+    if sha256 is None:
+        if attachment.file_url.startswith(("http://", "https://")):
+            return RedirectResponse(attachment.file_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+        raise AttachmentNotFoundError()
+    path = attachment_store.blob_path(sha256)
+    if not os.path.exists(path):
+        raise AttachmentNotFoundError()
+    media_type = attachment.mime_type or "application/octet-stream"
+    # Content never changes for a given attachment
+    headers = {"cache-control": "private, max-age=86400"}
+    if attachment_store.ATTACHMENT_ACCEL_REDIRECT:
+        prefix = attachment_store.ATTACHMENT_ACCEL_REDIRECT.rstrip("/")
+        relative = os.path.relpath(path, attachment_store.ATTACHMENT_DIR).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = f"{prefix}/{relative}"
+        headers["content-disposition"] = content_disposition(attachment.file_name)
+        return Response(media_type=media_type, headers=headers)
+    return ranged_file_response(
+        request, path, media_type, filename=attachment.file_name, headers=headers, etag=f'"{sha256}"'
+    )
+
+
 @app.delete("/api/attachments/{attachment_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_appeal_attachment(attachment_id: UUID, db: Session = Depends(get_db)):
     """Delete an attachment (admin endpoint)"""
@@ -383,10 +740,12 @@ def search_appeals_endpoint(
     status: Optional[str] = Query(None, pattern="^(new|in_progress|waiting|closed)$"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_search_db)
 ):
     """Full-text search in appeals"""
-    results = search.search_appeals(
+    import search
+    query = search.search_appeals_query(
         db,
         query=q,
         direction_id=direction_id,
@@ -394,7 +753,10 @@ def search_appeals_endpoint(
         skip=skip,
         limit=limit
     )
-    return results
+    projection = serialization.resolve_fields(fields, Appeal, AppealSummary)
+    if projection is not None or serialization.FAST_JSON_RESPONSES:
+        return serialization.rows_response(query, Appeal, models.Appeal, fields=projection)
+    return query.all()
 
 
 @app.get("/api/search/content", response_model=List[Content])
@@ -407,10 +769,12 @@ def search_content_endpoint(
     published_only: bool = Query(True),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_search_db)
 ):
     """Full-text search in content"""
-    results = search.search_content(
+    import search
+    query = search.search_content_query(
         db,
         query=q,
         content_type=type,
@@ -419,7 +783,10 @@ def search_content_endpoint(
         skip=skip,
         limit=limit
     )
-    return results
+    projection = serialization.resolve_fields(fields, Content, ContentSummary)
+    if projection is not None or serialization.FAST_JSON_RESPONSES:
+        return serialization.rows_response(query, Content, models.Content, fields=projection)
+    return query.all()
 
 
 @app.get("/api/search/appeals/tags", response_model=List[Appeal])
@@ -429,16 +796,21 @@ def search_appeals_by_tags_endpoint(
     tags: List[str] = Query(..., description="List of tags to search"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_search_db)
 ):
     """Search appeals by tags"""
-    results = search.search_appeals_by_tags(
+    import search
+    query = search.search_appeals_by_tags_query(
         db,
         tags=tags,
         skip=skip,
         limit=limit
     )
-    return results
+    projection = serialization.resolve_fields(fields, Appeal, AppealSummary)
+    if projection is not None or serialization.FAST_JSON_RESPONSES:
+        return serialization.rows_response(query, Appeal, models.Appeal, fields=projection)
+    return query.all()
 
 
 # ==================== Export ====================
@@ -450,9 +822,10 @@ def export_appeals_csv(
     direction_id: Optional[UUID] = Query(None),
     status: Optional[str] = Query(None),
     include_internal: bool = Query(False),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_export_db)
 ):
     """Export appeals to CSV"""
+    import export
     appeals = crud.get_appeals(
         db,
         direction_id=direction_id,
@@ -479,9 +852,10 @@ def export_appeals_excel(
     direction_id: Optional[UUID] = Query(None),
     status: Optional[str] = Query(None),
     include_internal: bool = Query(False),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_export_db)
 ):
     """Export appeals to Excel"""
+    import export
     appeals = crud.get_appeals(
         db,
         direction_id=direction_id,
@@ -505,9 +879,10 @@ def export_appeals_excel(
 @limiter.limit("10/minute")
 def export_stats_csv(
     request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_export_db)
 ):
     """Export statistics to CSV"""
+    import export
     stats = crud.get_appeal_stats(db)
     csv_data = export.export_statistics_to_csv(stats)
     
@@ -520,6 +895,55 @@ def export_stats_csv(
     )
 
 
+@app.post("/api/export/jobs", response_model=ExportJob, status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit("10/minute")
+def submit_export_job(request: Request, job: ExportJobCreate, response: Response):
+    """
+    Queue an appeals export (CSV or Excel) built in the background. Identical
+    requests share one job; poll status_url and fetch download_url when done.
+    """
+    import export_jobs
+    params = {
+        "direction_id": str(job.direction_id) if job.direction_id else None,
+        "status": job.status,
+        "include_internal": job.include_internal,
+    }
+    submitted = export_jobs.submit(job.format, params)
+    if submitted["deduplicated"] and submitted["status"] == export_jobs.DONE:
+        response.status_code = status.HTTP_200_OK
+    return export_jobs.describe(submitted)
+
+
+@app.get("/api/export/jobs/{job_id}", response_model=ExportJob)
+def get_export_job(job_id: str):
+    """Status and progress of an export job"""
+    import export_jobs
+    job = export_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return export_jobs.describe(job)
+
+
+@app.get("/api/export/jobs/{job_id}/download")
+def download_export_job(job_id: str, request: Request):
+    """Finished export file; supports Range requests for resumed downloads"""
+    import export_jobs
+    from file_responses import ranged_file_response
+    job = export_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job["status"] != export_jobs.DONE:
+        raise HTTPException(status_code=409, detail=f"Export job is {job['status']}")
+    path = export_jobs.artifact_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Export file has expired")
+    created = date.fromtimestamp(job["created_at"]).isoformat()
+    extension = export_jobs.FORMATS[job["format"]][0]
+    return ranged_file_response(
+        request, path, export_jobs.media_type(job), filename=f"appeals_{created}.{extension}"
+    )
+
+
 # ==================== Content Analytics ====================
 
 @app.get("/api/analytics/content")
@@ -528,9 +952,10 @@ def get_content_analytics(
     request: Request,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     """Get content analytics"""
+    import analytics
     analytics_data = analytics.get_content_analytics(
         db,
         start_date=start_date,
@@ -546,9 +971,10 @@ def get_schools_analytics(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     school_code: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_analytics_db)
 ):
     """Get appeals statistics grouped by schools/institutes"""
+    import analytics
     stats = analytics.get_appeals_by_school(
         db,
         start_date=start_date,
@@ -0,0 +1,73 @@
+"""
+Management commands for the backend
+
+Usage:
+    python manage.py create-tables   # create missing tables from models.py
+    python manage.py check-db        # verify the database is reachable
+    python manage.py gc-attachments  # delete stored attachment files no row references
+"""
+import argparse
+import os
+import sys
+
+# Maintenance commands may legitimately run longer than a request; the
+# connection-level default timeout (query_budget.py) only applies if set explicitly
+os.environ.setdefault("DB_STATEMENT_TIMEOUT_MS", "0")
+
+
+def create_tables(args) -> int:
+    from database import init_db
+
+    init_db()
+    print("Tables created")
+    return 0
+
+
+def check_db(args) -> int:
+    from sqlalchemy import text
+    from database import engine
+
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"Database is not reachable: {e}")
+        return 1
+    print("Database is reachable")
+    return 0
+
+
+def gc_attachments(args) -> int:
+    import attachment_store
+    from database import SessionLocal
+    from models import AppealAttachment
+
+    db = SessionLocal()
+    try:
+        urls = db.query(AppealAttachment.file_url).filter(
+            AppealAttachment.file_url.like(attachment_store.URL_PREFIX + "%")
+        ).yield_per(1000)
+        referenced = {attachment_store.sha256_from_url(url) for (url,) in urls}
+    finally:
+        db.close()
+    removed = attachment_store.remove_unreferenced(referenced, min_age_seconds=args.min_age)
+    print(f"Removed {removed} unreferenced attachment files")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backend management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("create-tables", help="create missing tables from the SQLAlchemy models").set_defaults(
+        func=create_tables
+    )
+    subparsers.add_parser("check-db", help="check the database connection").set_defaults(func=check_db)
+    gc = subparsers.add_parser("gc-attachments", help="delete attachment files no attachment references")
+    gc.add_argument("--min-age", type=float, default=3600, help="keep files touched within this many seconds")
+    gc.set_defaults(func=gc_attachments)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Process-local metrics registry
+
+Subsystems (connection pool, caches, background workers) register a collector:
+a callable returning a flat ``{name: number}`` dict. The values are read on
+demand, so registering costs nothing on the request path. ``GET /metrics``
+renders all collectors in the Prometheus text format.
+
+Every worker process has its own registry; scrape each worker (the ``pid``
+label tells them apart) or aggregate in the monitoring system.
+"""
+import os
+import re
+import threading
+from typing import Callable, Dict, Union
+
+Number = Union[int, float]
+
+_collectors: Dict[str, Callable[[], Dict[str, Number]]] = {}
+_lock = threading.Lock()
+
+_INVALID_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def register(name: str, collect: Callable[[], Dict[str, Number]]) -> None:
+    """Register (or replace) the collector for a subsystem"""
+    with _lock:
+        _collectors[name] = collect
+
+
+def unregister(name: str) -> None:
+    with _lock:
+        _collectors.pop(name, None)
+
+
+def snapshot() -> Dict[str, Dict[str, Number]]:
+    """Current values of all collectors, keyed by subsystem name"""
+    with _lock:
+        collectors = dict(_collectors)
+    return {name: collect() for name, collect in sorted(collectors.items())}
+
+
+def render_prometheus(prefix: str = "oss") -> str:
+    """All metrics in the Prometheus text exposition format"""
+    pid = os.getpid()
+    lines = []
+    for subsystem, values in snapshot().items():
+        for key, value in values.items():
+            if value is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            metric = _INVALID_CHARS.sub("_", f"{prefix}_{subsystem}_{key}")
+            lines.append(f'{metric}{{pid="{pid}"}} {value}')
+    return "\n".join(lines) + "\n"
@@ -7,8 +7,12 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from typing import Callable
+import os
 import time
 import logging
+import ratelimit_storage  # noqa: F401  (registers the sqlite:// storage scheme)
+import pool_metrics
+from database import READ_YOUR_WRITES_COOKIE, READ_YOUR_WRITES_SECONDS
 
 # Setup logging
 logging.basicConfig(
@@ -18,7 +22,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Rate limiter
-limiter = Limiter(key_func=get_remote_address)
+# Counters must be shared between uvicorn workers, otherwise every limit is
+# multiplied by the number of workers. See ratelimit_storage.py for the options.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "sqlite://")
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    # Fall back to per-process counters if the shared storage is unavailable
+    in_memory_fallback_enabled=True,
+)
 
 
 def setup_rate_limiting(app):
@@ -66,6 +79,44 @@ async def logging_middleware(request: Request, call_next: Callable):
         raise
 
 
+async def pool_leak_middleware(request: Request, call_next: Callable):
+    """
+    Attribute pool checkouts to the current request and report connections
+    that are still checked out once the request has finished (session not
+    closed, connection kept in a global, ...). See pool_metrics.py.
+    """
+    token = pool_metrics.current_request.set(request.scope)
+    try:
+        return await call_next(request)
+    finally:
+        pool_metrics.current_request.reset(token)
+        pool_metrics.check_request_leaks(request.scope)
+
+
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+async def read_your_writes_middleware(request: Request, call_next: Callable):
+    """
+    After a successful write, open the client's read-your-writes window for
+    READ_YOUR_WRITES_SECONDS (database.recently_wrote): its reads skip the
+    replica (see database.get_read_db), the precompressed snapshots and the
+    content cache, so e.g. the list reloaded right after an update is not
+    served from a lagging replica or a pre-write copy. Set with or without
+    a replica, since the snapshots and caches exist either way.
+    """
+    response = await call_next(request)
+    if request.method in _WRITE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            str(int(time.time()) + READ_YOUR_WRITES_SECONDS),
+            max_age=READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
 # Simple in-memory cache (for development)
 # In production, use Redis
 _cache = {}
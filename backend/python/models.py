@@ -77,6 +77,20 @@ class AppealComment(Base):
     appeal = relationship("Appeal", back_populates="comments")
 
 
+class AppealHistory(Base):
+    """Appeal change history (database/schema_audit.sql); written by audit.py and the trigger"""
+    __tablename__ = "appeal_history"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    appeal_id = Column(UUID(as_uuid=True), ForeignKey("appeals.id", ondelete="CASCADE"))
+    changed_by = Column(UUID(as_uuid=True))  # Supabase auth user ID
+    action = Column(String, nullable=False)
+    old_value = Column(Text)
+    new_value = Column(Text)
+    description = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class Content(Base):
     """Content model (news, guides, FAQ)"""
     __tablename__ = "content"
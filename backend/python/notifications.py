@@ -0,0 +1,562 @@
+"""
+Notification delivery for appeal events
+
+appeal_events hands every event to dispatcher.submit(), which only schedules
+it onto the dispatcher's own asyncio loop (running in a daemon thread) and
+returns: crud never waits for the database lookups or the network.
+
+On the loop:
+
+1. Events are collected for NOTIFY_WINDOW_SECONDS after the first one
+   arrives (at most NOTIFY_MAX_PENDING are held; more are dropped and
+   counted).
+2. The window is resolved in one pass: recipients (assignees when the event
+   did not name one; for a new appeal, the members and leads of its
+   direction from user_roles, or the board when it has no direction), their
+   notification_settings and e-mail addresses.
+   Events are coalesced per recipient - several changes of one appeal
+   become one line with the latest state - into one digest per recipient and
+   channel, filtered by the recipient's per-type preferences.
+3. Every digest is claimed in notification_log (one row per event, success
+   still NULL) before sending. Overdue events come from every worker's
+   deadline scheduler; the claim runs under an advisory lock and skips
+   appeals already notified since their deadline, so each is sent once.
+4. Digests go to the channel's sender in batches of NOTIFY_BATCH_SIZE (one
+   SMTP connection per e-mail batch), at most NOTIFY_CONCURRENCY batches at
+   a time. Failed messages are retried with exponential backoff and jitter
+   up to NOTIFY_MAX_ATTEMPTS; permanent errors (unknown chat, refused
+   address) are not retried. The outcome is written back to the log rows.
+
+Senders are pluggable (set_sender): tests and development use LogSender or
+their own stand-in. Push notifications are not delivered yet.
+
+Environment:
+    NOTIFICATIONS_ENABLED       0 drops all events
+    NOTIFY_WINDOW_SECONDS       coalescing window (5)
+    NOTIFY_MAX_PENDING          events held per window (10000)
+    NOTIFY_BATCH_SIZE           messages per sender call (50)
+    NOTIFY_CONCURRENCY          sender calls in flight (4)
+    NOTIFY_MAX_ATTEMPTS         attempts per message (5)
+    NOTIFY_RETRY_BASE_SECONDS   first retry delay, doubled per attempt (2)
+    NOTIFY_SENDERS              "log" logs instead of sending (development)
+    NOTIFY_APPEAL_URL           link template, e.g. https://oss.example/admin/appeals/{id}
+    SMTP_HOST, SMTP_PORT (587), SMTP_USER, SMTP_PASSWORD, SMTP_FROM, SMTP_STARTTLS (1)
+    TELEGRAM_BOT_TOKEN
+"""
+import asyncio
+import logging
+import os
+import random
+import smtplib
+import threading
+from collections import OrderedDict
+from datetime import date
+from email.message import EmailMessage
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, text
+
+import appeal_events
+import metrics
+from appeal_events import AppealEvent
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS_ENABLED = os.getenv("NOTIFICATIONS_ENABLED", "1") != "0"
+NOTIFY_WINDOW_SECONDS = float(os.getenv("NOTIFY_WINDOW_SECONDS", "5"))
+NOTIFY_MAX_PENDING = int(os.getenv("NOTIFY_MAX_PENDING", "10000"))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", "4"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+NOTIFY_RETRY_BASE_SECONDS = float(os.getenv("NOTIFY_RETRY_BASE_SECONDS", "2"))
+NOTIFY_SENDERS = os.getenv("NOTIFY_SENDERS", "")
+NOTIFY_APPEAL_URL = os.getenv("NOTIFY_APPEAL_URL", "")
+
+SMTP_HOST = os.getenv("SMTP_HOST", "")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
+
+EMAIL, TELEGRAM = "email", "telegram"
+CHANNELS = (EMAIL, TELEGRAM)
+
+STATUS_TITLES = {"new": "новое", "in_progress": "в работе", "waiting": "ожидает ответа", "closed": "закрыто"}
+
+
+class Message(NamedTuple):
+    channel: str
+    recipient_id: UUID
+    address: str
+    subject: str
+    text: str
+    # notification_log rows claimed for this message
+    log_ids: Tuple[UUID, ...] = ()
+
+
+class PermanentDeliveryError(Exception):
+    """The message can never be delivered (bad address, bot blocked); not retried"""
+
+
+# ==================== Senders ====================
+
+class Sender:
+    """Delivers a batch of messages of one channel; returns one error (or None) per message"""
+
+    async def send_batch(self, messages: List[Message]) -> List[Optional[Exception]]:
+        raise NotImplementedError
+
+
+class LogSender(Sender):
+    """Logs messages instead of sending them (development)"""
+
+    async def send_batch(self, messages: List[Message]) -> List[Optional[Exception]]:
+        for message in messages:
+            logger.info(f"[{message.channel} -> {message.address}] {message.subject}\n{message.text}")
+        return [None] * len(messages)
+
+
+class SmtpSender(Sender):
+    """One SMTP session per batch, run in a worker thread (smtplib blocks)"""
+
+    def __init__(self, host: str, port: int, user: str, password: str, sender: str, starttls: bool = True):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.sender = sender
+        self.starttls = starttls
+
+    async def send_batch(self, messages: List[Message]) -> List[Optional[Exception]]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._send_sync, messages)
+
+    def _send_sync(self, messages: List[Message]) -> List[Optional[Exception]]:
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        except OSError as e:
+            return [e] * len(messages)
+        results: List[Optional[Exception]] = []
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            for message in messages:
+                email = EmailMessage()
+                email["From"] = self.sender
+                email["To"] = message.address
+                email["Subject"] = message.subject
+                email.set_content(message.text)
+                try:
+                    smtp.send_message(email)
+                    results.append(None)
+                except smtplib.SMTPRecipientsRefused as e:
+                    results.append(PermanentDeliveryError(str(e)))
+                except smtplib.SMTPException as e:
+                    results.append(e)
+        except (smtplib.SMTPException, OSError) as e:
+            # Session broke: the rest of the batch is retried
+            results.extend([e] * (len(messages) - len(results)))
+        finally:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        return results
+
+
+class TelegramSender(Sender):
+    """Bot API sendMessage, one request per message over a shared connection"""
+
+    def __init__(self, token: str):
+        self.url = f"https://api.telegram.org/bot{token}/sendMessage"
+        self._client = None
+
+    async def send_batch(self, messages: List[Message]) -> List[Optional[Exception]]:
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=15)
+        results: List[Optional[Exception]] = []
+        for message in messages:
+            try:
+                response = await self._client.post(self.url, json={
+                    "chat_id": message.address,
+                    "text": f"{message.subject}\n\n{message.text}",
+                    "disable_web_page_preview": True,
+                })
+            except httpx.HTTPError as e:
+                results.append(e)
+                continue
+            if response.status_code == 200:
+                results.append(None)
+            elif response.status_code in (400, 403):
+                results.append(PermanentDeliveryError(response.text[:200]))
+            else:
+                results.append(RuntimeError(f"Telegram API {response.status_code}: {response.text[:200]}"))
+        return results
+
+
+def _default_senders() -> Dict[str, Sender]:
+    if NOTIFY_SENDERS == "log":
+        return {EMAIL: LogSender(), TELEGRAM: LogSender()}
+    senders: Dict[str, Sender] = {}
+    if SMTP_HOST:
+        senders[EMAIL] = SmtpSender(SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM, SMTP_STARTTLS)
+    if TELEGRAM_BOT_TOKEN:
+        senders[TELEGRAM] = TelegramSender(TELEGRAM_BOT_TOKEN)
+    return senders
+
+
+# ==================== Resolving recipients ====================
+
+_APPEALS_SQL = text(
+    "SELECT id, title, status, assigned_to, deadline, direction_id FROM appeals WHERE id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+# New appeals have no assignee yet: they go to the members and leads of their
+# direction, or to the board when no direction was chosen
+_NEW_APPEAL_STAFF_SQL = text("""
+    SELECT DISTINCT user_id, direction_id FROM user_roles
+    WHERE (role IN ('member', 'lead') AND direction_id IN :directions)
+       OR (:with_board AND role = 'board' AND direction_id IS NULL)
+""").bindparams(bindparam("directions", expanding=True))
+
+# Users without a settings row get the column defaults of notification_settings
+_RECIPIENTS_SQL = text("""
+    SELECT u.id, u.email,
+           coalesce(s.email_enabled, true) AS email_enabled,
+           coalesce(s.telegram_enabled, false) AS telegram_enabled,
+           s.telegram_chat_id,
+           coalesce(s.email_appeal_status, true) AS email_appeal_status,
+           coalesce(s.email_appeal_assigned, true) AS email_appeal_assigned,
+           coalesce(s.email_appeal_comment, true) AS email_appeal_comment,
+           coalesce(s.email_appeal_new, true) AS email_appeal_new,
+           coalesce(s.email_appeal_overdue, true) AS email_appeal_overdue,
+           coalesce(s.telegram_appeal_status, true) AS telegram_appeal_status,
+           coalesce(s.telegram_appeal_assigned, true) AS telegram_appeal_assigned,
+           coalesce(s.telegram_appeal_comment, true) AS telegram_appeal_comment,
+           coalesce(s.telegram_appeal_new, true) AS telegram_appeal_new,
+           coalesce(s.telegram_appeal_overdue, true) AS telegram_appeal_overdue
+    FROM auth.users u
+    LEFT JOIN notification_settings s ON s.user_id = u.id
+    WHERE u.id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+# Serializes overdue claims of all worker processes
+_OVERDUE_LOCK_SQL = text("SELECT pg_advisory_xact_lock(hashtext('notifications:appeal_overdue'))")
+
+# Sent (or being sent) since the appeal's current deadline passed
+_ALREADY_NOTIFIED_SQL = text("""
+    SELECT DISTINCT l.user_id, l.appeal_id, l.type
+    FROM notification_log l
+    JOIN appeals a ON a.id = l.appeal_id
+    WHERE l.event_type = 'appeal_overdue' AND l.appeal_id IN :ids
+      AND coalesce(l.success, true) AND l.sent_at >= a.deadline + 1
+""").bindparams(bindparam("ids", expanding=True))
+
+_CLAIM_SQL = text("""
+    INSERT INTO notification_log (user_id, appeal_id, type, event_type, title, message, success)
+    VALUES (:user_id, :appeal_id, :type, :event_type, :title, :message, NULL)
+    RETURNING id
+""")
+
+_RESULT_SQL = text("""
+    UPDATE notification_log SET success = :success, error_message = :error, sent_at = now()
+    WHERE id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def _event_line(event: AppealEvent, title: str, count: int) -> str:
+    if event.type == appeal_events.APPEAL_STATUS:
+        line = f"«{title}»: статус — {STATUS_TITLES.get(event.detail, event.detail)}"
+    elif event.type == appeal_events.APPEAL_ASSIGNED:
+        line = f"«{title}»: назначено вам"
+    elif event.type == appeal_events.APPEAL_COMMENT:
+        line = f"«{title}»: новых комментариев — {count}" if count > 1 else f"«{title}»: новый комментарий"
+    elif event.type == appeal_events.APPEAL_OVERDUE:
+        line = f"«{title}»: срок ответа истёк"
+    else:
+        line = f"«{title}»: новое обращение"
+    if NOTIFY_APPEAL_URL:
+        line += f"\n{NOTIFY_APPEAL_URL.format(id=event.appeal_id)}"
+    return line
+
+
+def _new_appeal_staff(db, events: List[AppealEvent], appeals) -> Dict[Optional[UUID], List[UUID]]:
+    """direction id (None: no direction) -> staff to notify of new unassigned appeals there"""
+    directions = {
+        appeals[e.appeal_id].direction_id
+        for e in events
+        if e.type == appeal_events.APPEAL_NEW and e.recipient_id is None
+        and e.appeal_id in appeals and appeals[e.appeal_id].assigned_to is None
+    }
+    if not directions:
+        return {}
+    staff: Dict[Optional[UUID], List[UUID]] = {}
+    rows = db.execute(_NEW_APPEAL_STAFF_SQL, {
+        "directions": [d for d in directions if d is not None],
+        "with_board": None in directions,
+    })
+    for row in rows:
+        staff.setdefault(row.direction_id, []).append(row.user_id)
+    return staff
+
+
+def _subject(lines: int) -> str:
+    return "Обращения: 1 обновление" if lines == 1 else f"Обращения: обновлений — {lines}"
+
+
+def build_messages(events: List[AppealEvent], channels: List[str]) -> List[Message]:
+    """
+    Resolve, coalesce and claim one window of events (blocking, runs in a
+    worker thread). Returns the digests to send.
+    """
+    from database import background_session
+
+    db = background_session("default")
+    try:
+        appeals = {
+            row.id: row
+            for row in db.execute(_APPEALS_SQL, {"ids": list({e.appeal_id for e in events})})
+        }
+
+        direction_staff = _new_appeal_staff(db, events, appeals)
+
+        # recipient -> (appeal_id, type) -> (latest event, count); insertion keeps event order
+        per_recipient: Dict[UUID, "OrderedDict[Tuple[UUID, str], Tuple[AppealEvent, int]]"] = {}
+        for event in events:
+            appeal = appeals.get(event.appeal_id)
+            if appeal is None:
+                continue  # deleted meanwhile
+            if event.type == appeal_events.APPEAL_OVERDUE and (
+                    appeal.status == "closed" or appeal.deadline is None or appeal.deadline >= date.today()):
+                continue  # closed or rescheduled since the deadline passed
+            recipient = event.recipient_id or appeal.assigned_to
+            if recipient is not None:
+                event_recipients = [recipient]
+            elif event.type == appeal_events.APPEAL_NEW:
+                event_recipients = direction_staff.get(appeal.direction_id, [])
+            else:
+                continue
+            for recipient in event_recipients:
+                if recipient == event.actor_id:
+                    continue
+                grouped = per_recipient.setdefault(recipient, OrderedDict())
+                key = (event.appeal_id, event.type)
+                _, count = grouped.pop(key, (None, 0))
+                grouped[key] = (event, count + 1)
+        if not per_recipient:
+            return []
+
+        recipients = {row.id: row for row in db.execute(_RECIPIENTS_SQL, {"ids": list(per_recipient)})}
+
+        overdue_ids = list({
+            event.appeal_id
+            for grouped in per_recipient.values()
+            for event, _ in grouped.values()
+            if event.type == appeal_events.APPEAL_OVERDUE
+        })
+        notified = set()
+        if overdue_ids:
+            db.execute(_OVERDUE_LOCK_SQL)
+            notified = {
+                (row.user_id, row.appeal_id, row.type)
+                for row in db.execute(_ALREADY_NOTIFIED_SQL, {"ids": overdue_ids})
+            }
+
+        messages = []
+        for recipient_id, grouped in per_recipient.items():
+            settings = recipients.get(recipient_id)
+            if settings is None:
+                continue
+            for channel in channels:
+                address = settings.email if channel == EMAIL else settings.telegram_chat_id
+                if not address or not getattr(settings, f"{channel}_enabled"):
+                    continue
+                selected = [
+                    (event, count) for event, count in grouped.values()
+                    if getattr(settings, f"{channel}_{event.type}", False)
+                    and not (event.type == appeal_events.APPEAL_OVERDUE
+                             and (recipient_id, event.appeal_id, channel) in notified)
+                ]
+                if not selected:
+                    continue
+                lines = [_event_line(e, appeals[e.appeal_id].title, count) for e, count in selected]
+                subject = _subject(len(lines))
+                log_ids = tuple(
+                    db.execute(_CLAIM_SQL, {
+                        "user_id": recipient_id, "appeal_id": event.appeal_id, "type": channel,
+                        "event_type": event.type, "title": subject, "message": line,
+                    }).scalar()
+                    for (event, _), line in zip(selected, lines)
+                )
+                messages.append(Message(channel, recipient_id, address, subject, "\n\n".join(lines), log_ids))
+        # Commit releases the advisory lock with the claims visible to the next worker
+        db.commit()
+        return messages
+    finally:
+        db.close()
+
+
+def record_results(results: List[Tuple[Message, Optional[Exception]]]) -> None:
+    from database import background_session
+
+    db = background_session("default")
+    try:
+        for message, error in results:
+            if message.log_ids:
+                db.execute(_RESULT_SQL, {
+                    "ids": list(message.log_ids),
+                    "success": error is None,
+                    "error": str(error)[:500] if error else None,
+                })
+        db.commit()
+    finally:
+        db.close()
+
+
+# ==================== Dispatcher ====================
+
+class Dispatcher:
+    """Owns the delivery loop; submit() is safe to call from any thread"""
+
+    def __init__(self, senders: Optional[Dict[str, Sender]] = None):
+        self.senders: Dict[str, Sender] = senders if senders is not None else _default_senders()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pending: List[AppealEvent] = []
+        self._window_open = False
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {
+            "events_received": 0, "events_dropped": 0, "windows": 0, "window_errors": 0,
+            "messages_sent": 0, "messages_failed": 0, "retries": 0, "batches_in_flight": 0,
+        }
+
+    # ---- any thread ----
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), name="notifications", daemon=True)
+        self._thread.start()
+        ready.wait(5)
+
+    def submit(self, event: AppealEvent) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self.stats["events_dropped"] += 1
+            return
+        loop.call_soon_threadsafe(self._add, event)
+
+    # ---- loop thread ----
+
+    def _run_loop(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._semaphore = asyncio.Semaphore(NOTIFY_CONCURRENCY)
+        self._loop = loop
+        ready.set()
+        loop.run_forever()
+
+    def _add(self, event: AppealEvent) -> None:
+        self.stats["events_received"] += 1
+        if len(self._pending) >= NOTIFY_MAX_PENDING:
+            self.stats["events_dropped"] += 1
+            return
+        self._pending.append(event)
+        if not self._window_open:
+            self._window_open = True
+            self._loop.call_later(NOTIFY_WINDOW_SECONDS, self._close_window)
+
+    def _close_window(self) -> None:
+        events, self._pending = self._pending, []
+        self._window_open = False
+        self.stats["windows"] += 1
+        self._loop.create_task(self._dispatch(events))
+
+    async def _dispatch(self, events: List[AppealEvent]) -> None:
+        channels = [channel for channel in CHANNELS if channel in self.senders]
+        if not channels:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            messages = await loop.run_in_executor(None, build_messages, events, channels)
+        except Exception:
+            self.stats["window_errors"] += 1
+            logger.exception(f"Could not resolve {len(events)} appeal events for notification")
+            return
+        batches = []
+        for channel in channels:
+            of_channel = [m for m in messages if m.channel == channel]
+            for start in range(0, len(of_channel), NOTIFY_BATCH_SIZE):
+                batches.append(self._deliver(channel, of_channel[start:start + NOTIFY_BATCH_SIZE]))
+        outcomes = await asyncio.gather(*batches)
+        results = [result for batch in outcomes for result in batch]
+        if results:
+            try:
+                await loop.run_in_executor(None, record_results, results)
+            except Exception:
+                logger.exception("Could not record notification results")
+
+    async def _deliver(self, channel: str, messages: List[Message]) -> List[Tuple[Message, Optional[Exception]]]:
+        """Send with retries; returns the final outcome of every message"""
+        sender = self.senders[channel]
+        done: List[Tuple[Message, Optional[Exception]]] = []
+        for attempt in range(1, NOTIFY_MAX_ATTEMPTS + 1):
+            async with self._semaphore:
+                self.stats["batches_in_flight"] += 1
+                try:
+                    errors = await sender.send_batch(messages)
+                except Exception as e:
+                    errors = [e] * len(messages)
+                finally:
+                    self.stats["batches_in_flight"] -= 1
+            retry = []
+            for message, error in zip(messages, errors):
+                if error is None:
+                    self.stats["messages_sent"] += 1
+                    done.append((message, None))
+                elif isinstance(error, PermanentDeliveryError) or attempt == NOTIFY_MAX_ATTEMPTS:
+                    self.stats["messages_failed"] += 1
+                    logger.warning(f"{channel} notification to {message.recipient_id} failed: {error}")
+                    done.append((message, error))
+                else:
+                    retry.append(message)
+            if not retry:
+                break
+            messages = retry
+            self.stats["retries"] += len(retry)
+            delay = NOTIFY_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+        return done
+
+    def metric_values(self) -> Dict[str, float]:
+        return {**self.stats, "pending": len(self._pending)}
+
+
+dispatcher = Dispatcher()
+metrics.register("notifications", dispatcher.metric_values)
+
+
+def set_sender(channel: str, sender: Optional[Sender]) -> None:
+    """Replace (or with None remove) the sender of a channel, e.g. with a stand-in in tests"""
+    if sender is None:
+        dispatcher.senders.pop(channel, None)
+    else:
+        dispatcher.senders[channel] = sender
+
+
+def start() -> None:
+    """Start delivering in this (worker) process"""
+    if not NOTIFICATIONS_ENABLED:
+        return
+    dispatcher.start()
+    if not dispatcher.senders:
+        logger.info("Notifications: no sender configured (SMTP_HOST, TELEGRAM_BOT_TOKEN), events are dropped")
+
+
+if NOTIFICATIONS_ENABLED:
+    appeal_events.subscribe(dispatcher.submit)
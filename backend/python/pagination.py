@@ -0,0 +1,48 @@
+"""
+Keyset (cursor) pagination helpers
+
+OFFSET pagination reads and throws away every skipped row, and pages shift
+when rows are inserted in between. Keyset pagination continues after the last
+row seen instead: ``WHERE (created_at, id) > (:created_at, :id)`` on an index
+ending in (created_at, id) reads only the rows of the page.
+
+The position is handed to the client as an opaque cursor (URL-safe base64 of
+``<created_at ISO>|<id>``) in the ``X-Next-Cursor`` header and a ``Link:
+rel="next"`` header; the response body stays a plain list.
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, Request, Response, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Position = Tuple[datetime, UUID]
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Position]:
+    """Position of a cursor from encode_cursor; 400 for a malformed one"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, _, row_id = raw.partition("|")
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def set_next_cursor(request: Request, response: Response, cursor: Optional[str]) -> None:
+    """Expose the next page's cursor (nothing on the last page)"""
+    if cursor is None:
+        return
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    next_url = request.url.include_query_params(cursor=cursor)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
@@ -0,0 +1,119 @@
+"""
+Background liveness checks for pooled connections
+
+``pool_pre_ping`` validates a connection with an extra ``SELECT 1`` round
+trip on every checkout, i.e. on every request. With DB_LIVENESS=background
+(the default) the pool is not pinged on checkout; instead a daemon thread
+pings idle connections every DB_LIVENESS_INTERVAL seconds and invalidates
+dead ones, so a connection dropped by the server, a proxy or a failover is
+usually replaced before a request picks it up.
+
+A connection can still die between two checks. For that case
+database.RetryingSession re-runs the first statement of a transaction once
+when it fails with a disconnect error (no work can be lost at that point).
+
+DB_LIVENESS=pre_ping restores the per-checkout ping.
+"""
+import logging
+import threading
+from typing import Dict, Optional
+
+import metrics
+import pool_metrics
+
+logger = logging.getLogger(__name__)
+
+# Checkouts made by the checker are reported under this pseudo-route
+_SCOPE = {"type": "liveness", "path": "<liveness check>", "method": ""}
+
+
+class LivenessChecker:
+    """Daemon thread pinging the idle connections of one engine"""
+
+    def __init__(self, engine, name: str, interval: float):
+        self.engine = engine
+        self.name = name
+        self.interval = interval
+        self.pings = 0
+        self.invalidated = 0
+        self.runs = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"db-liveness-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_idle()
+            except Exception:
+                logger.exception(f"[{self.name}] liveness check failed")
+
+    def check_idle(self) -> int:
+        """
+        Ping each connection that is idle in the pool right now. Returns the
+        number of connections invalidated.
+        """
+        pool = self.engine.pool
+        dialect = self.engine.dialect
+        token = pool_metrics.current_request.set(_SCOPE)
+        invalidated = 0
+        try:
+            # QueuePool hands out idle connections in FIFO order and puts them
+            # back at the end, so checkedin() checkouts visit each one once.
+            # Stop as soon as requests are using the pool: never make a
+            # request wait for a connection being pinged.
+            for _ in range(pool.checkedin()):
+                if self._stop.is_set() or pool.checkedin() == 0:
+                    break
+                conn = pool.connect()
+                try:
+                    self.pings += 1
+                    alive = dialect.do_ping(conn.dbapi_connection)
+                except dialect.dbapi.Error as e:
+                    alive = False
+                    logger.info(f"[{self.name}] dropping dead pooled connection: {e}")
+                if not alive:
+                    conn.invalidate()
+                    invalidated += 1
+                conn.close()
+        finally:
+            pool_metrics.current_request.reset(token)
+        self.runs += 1
+        self.invalidated += invalidated
+        return invalidated
+
+    def metric_values(self) -> Dict:
+        return {
+            "interval_seconds": self.interval,
+            "runs_total": self.runs,
+            "pings_total": self.pings,
+            "invalidated_total": self.invalidated,
+        }
+
+
+_checkers: Dict[str, LivenessChecker] = {}
+
+
+def start(engine, name: str, interval: float) -> LivenessChecker:
+    """Start (once per process) background checks for an engine"""
+    checker = _checkers.get(name)
+    if checker is None:
+        checker = LivenessChecker(engine, name, interval)
+        _checkers[name] = checker
+        metrics.register(f"db_liveness_{name}", checker.metric_values)
+    checker.start()
+    return checker
+
+
+def stop_all() -> None:
+    for checker in _checkers.values():
+        checker.stop()
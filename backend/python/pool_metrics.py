@@ -0,0 +1,254 @@
+"""
+Connection pool instrumentation
+
+Pool events on an engine (connect, checkout, checkin, invalidate) feed a
+PoolStats object per engine:
+
+- checkout wait: time spent waiting for a free connection (TimedQueuePool);
+  non-zero waits mean the pool is too small for the request concurrency
+- hold time: how long a connection stays checked out, aggregated per route so
+  slow handlers that keep a connection busy stand out
+- overflow: how many checkouts needed an overflow connection
+- leaks: connections still checked out after the request that took them has
+  finished (see middleware.pool_leak_middleware)
+
+Exposed through GET /api/admin/pool and the metrics registry (GET /metrics).
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Checkouts held longer than this are logged with the route that holds them
+POOL_SLOW_HOLD_MS = float(os.getenv("POOL_SLOW_HOLD_MS", "1000"))
+
+# Recent samples kept for percentiles
+_SAMPLES = 2000
+
+# ASGI scope of the request being handled in the current context (set by
+# middleware; copied into the threadpool that runs sync handlers)
+current_request: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "pool_current_request", default=None
+)
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+def _route_of(scope: Optional[dict]) -> str:
+    if scope is None:
+        return "<no request>"
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "?")
+
+
+class PoolStats:
+    """Counters and recent samples for one engine's pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.overflow_checkouts = 0
+        self.max_overflow_seen = 0
+        self.waits = 0
+        self.leaks = 0
+        self.wait_ms: Deque[float] = deque(maxlen=_SAMPLES)
+        self.hold_ms: Deque[float] = deque(maxlen=_SAMPLES)
+        # route -> [checkouts, total hold ms, max hold ms]
+        self.by_route: Dict[str, List[float]] = {}
+        # id(connection record) -> (request scope, checkout time)
+        self.active: Dict[int, tuple] = {}
+
+    # ------------------------------------------------------------ recording
+
+    def record_wait(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.wait_ms.append(elapsed_ms)
+            if elapsed_ms >= 1.0:
+                self.waits += 1
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        overflow = self.pool.overflow() if self.pool is not None else 0
+        with self._lock:
+            self.checkouts += 1
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.max_overflow_seen = max(self.max_overflow_seen, overflow)
+            self.active[id(connection_record)] = (current_request.get(), time.perf_counter())
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            entry = self.active.pop(id(connection_record), None)
+            self.checkins += 1
+        if entry is None:
+            return
+        scope, checked_out_at = entry
+        held_ms = (time.perf_counter() - checked_out_at) * 1000
+        route = _route_of(scope)
+        with self._lock:
+            self.hold_ms.append(held_ms)
+            agg = self.by_route.setdefault(route, [0, 0.0, 0.0])
+            agg[0] += 1
+            agg[1] += held_ms
+            agg[2] = max(agg[2], held_ms)
+        if held_ms > POOL_SLOW_HOLD_MS:
+            logger.warning(f"[{self.name}] connection held {held_ms:.0f} ms by {route}")
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def check_leaks(self, scope: dict) -> int:
+        """Count (and log) connections still checked out by a finished request"""
+        with self._lock:
+            leaked = [key for key, (owner, _) in self.active.items() if owner is scope]
+            # Reported once; the hold time is still recorded at checkin
+            for key in leaked:
+                self.active[key] = (None, self.active[key][1])
+            self.leaks += len(leaked)
+        if leaked:
+            logger.warning(
+                f"[{self.name}] {len(leaked)} connection(s) still checked out after "
+                f"{scope.get('method', '')} {_route_of(scope)} finished"
+            )
+        return len(leaked)
+
+    # ------------------------------------------------------------ reporting
+
+    def pool_state(self) -> Dict:
+        pool = self.pool
+        if pool is None or not isinstance(pool, QueuePool):
+            return {}
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        }
+
+    def summary(self) -> Dict:
+        state = self.pool_state()
+        with self._lock:
+            wait_ms = list(self.wait_ms)
+            hold_ms = list(self.hold_ms)
+            data = {
+                "pool": state,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "overflow_checkouts": self.overflow_checkouts,
+                "max_overflow_seen": self.max_overflow_seen,
+                "checkouts_waited": self.waits,
+                "leaked": self.leaks,
+            }
+            routes = {
+                route: {
+                    "checkouts": int(count),
+                    "mean_hold_ms": round(total / count, 3) if count else 0,
+                    "max_hold_ms": round(longest, 3),
+                }
+                for route, (count, total, longest) in self.by_route.items()
+            }
+        data["wait_ms"] = {p: _percentile(wait_ms, v) for p, v in (("p50", 50), ("p95", 95), ("p99", 99))}
+        data["hold_ms"] = {p: _percentile(hold_ms, v) for p, v in (("p50", 50), ("p95", 95), ("p99", 99))}
+        data["wait_ms"]["max"] = round(max(wait_ms), 3) if wait_ms else None
+        data["hold_ms"]["max"] = round(max(hold_ms), 3) if hold_ms else None
+        # Routes holding connections the longest in total first
+        data["routes"] = dict(sorted(
+            routes.items(), key=lambda item: item[1]["checkouts"] * item[1]["mean_hold_ms"], reverse=True
+        ))
+        return data
+
+    def metric_values(self) -> Dict:
+        state = self.pool_state()
+        with self._lock:
+            wait_ms = list(self.wait_ms)
+            hold_ms = list(self.hold_ms)
+            values = {
+                "connects_total": self.connects,
+                "checkouts_total": self.checkouts,
+                "invalidations_total": self.invalidations,
+                "overflow_checkouts_total": self.overflow_checkouts,
+                "checkouts_waited_total": self.waits,
+                "leaked_total": self.leaks,
+            }
+        values.update({key: value for key, value in state.items()})
+        values["wait_ms_p95"] = _percentile(wait_ms, 95)
+        values["hold_ms_p95"] = _percentile(hold_ms, 95)
+        return values
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection"""
+
+    stats: Optional[PoolStats] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.stats is not None:
+                self.stats.record_wait((time.perf_counter() - started) * 1000)
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; keep reporting into the same stats
+        new_pool = super().recreate()
+        new_pool.stats = self.stats
+        if self.stats is not None:
+            self.stats.pool = new_pool
+        return new_pool
+
+
+_stats: Dict[str, PoolStats] = {}
+
+
+def instrument(engine, name: str) -> PoolStats:
+    """Attach pool event listeners to an engine and register its metrics"""
+    stats = PoolStats(name)
+    stats.pool = engine.pool
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.stats = stats
+
+    event.listen(engine, "connect", stats.on_connect)
+    event.listen(engine, "checkout", stats.on_checkout)
+    event.listen(engine, "checkin", stats.on_checkin)
+    event.listen(engine, "invalidate", stats.on_invalidate)
+
+    _stats[name] = stats
+    metrics.register(f"db_pool_{name}", stats.metric_values)
+    return stats
+
+
+def all_stats() -> Dict[str, PoolStats]:
+    return dict(_stats)
+
+
+def check_request_leaks(scope: dict) -> int:
+    return sum(stats.check_leaks(scope) for stats in _stats.values())
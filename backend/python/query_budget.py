@@ -0,0 +1,147 @@
+"""
+Per-route-class database budgets: statement timeout and query cost limit
+
+Every route gets its session from a dependency bound to a route class
+(database.db_session). The class decides:
+
+- statement_timeout: applied with ``SET LOCAL`` at the start of each
+  transaction (so it never leaks into the pooled connection). The default
+  class uses the connection-level timeout set at connect time
+  (DB_STATEMENT_TIMEOUT_MS) and costs no extra round trip.
+- max_cost: before a SELECT of a guarded session that can actually be
+  unbounded the planner estimate is read with ``EXPLAIN (FORMAT JSON)``;
+  statements above the limit are rejected with QueryTooExpensiveError
+  (HTTP 422) without running them. Statements with a LIMIT (pages, point
+  lookups) are not explained - the estimate of a Limit node is prorated, so
+  it could not exceed the limit anyway, and the EXPLAIN would double their
+  round trips. ``execution_options(cost_guard=True / False)`` on a statement
+  forces the check on or off.
+
+A statement that runs into its timeout is cancelled by Postgres and answered
+with HTTP 503 (errors.statement_timeout_handler).
+
+DB_STATEMENT_TIMEOUT_MS is set in the startup options of every connection of
+the engines, so it also applies outside requests: background sessions
+(export jobs use their own class, audit flushes the default one) and
+scripts importing database.py. manage.py turns it off unless
+DB_STATEMENT_TIMEOUT_MS is set explicitly; migrations applied with psql are
+not affected.
+
+Environment (milliseconds / planner cost units, 0 disables):
+    DB_STATEMENT_TIMEOUT_MS       default for all routes (5000)
+    DB_TIMEOUT_PUBLIC_MS          public list/detail reads (default: DB_STATEMENT_TIMEOUT_MS)
+    DB_TIMEOUT_SEARCH_MS          search routes (10000)
+    DB_TIMEOUT_ANALYTICS_MS       statistics and analytics (30000)
+    DB_TIMEOUT_EXPORT_MS          exports (120000)
+    QUERY_COST_LIMIT_SEARCH       (500000)
+    QUERY_COST_LIMIT_ANALYTICS    (2000000)
+    QUERY_COST_LIMIT_EXPORT       (2000000)
+"""
+import json
+import logging
+import os
+from typing import Dict, NamedTuple
+
+from sqlalchemy import event
+
+from errors import QueryTooExpensiveError
+
+logger = logging.getLogger(__name__)
+
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+
+
+class RouteBudget(NamedTuple):
+    statement_timeout_ms: int
+    max_cost: float  # 0 = no cost guard
+
+
+BUDGETS: Dict[str, RouteBudget] = {
+    "default": RouteBudget(DB_STATEMENT_TIMEOUT_MS, 0),
+    "public": RouteBudget(int(os.getenv("DB_TIMEOUT_PUBLIC_MS", str(DB_STATEMENT_TIMEOUT_MS))), 0),
+    "search": RouteBudget(
+        int(os.getenv("DB_TIMEOUT_SEARCH_MS", "10000")),
+        float(os.getenv("QUERY_COST_LIMIT_SEARCH", "500000")),
+    ),
+    "analytics": RouteBudget(
+        int(os.getenv("DB_TIMEOUT_ANALYTICS_MS", "30000")),
+        float(os.getenv("QUERY_COST_LIMIT_ANALYTICS", "2000000")),
+    ),
+    "export": RouteBudget(
+        int(os.getenv("DB_TIMEOUT_EXPORT_MS", "120000")),
+        float(os.getenv("QUERY_COST_LIMIT_EXPORT", "2000000")),
+    ),
+}
+
+
+def connect_args() -> Dict:
+    """connect_args setting the default statement timeout for every new connection"""
+    if not DB_STATEMENT_TIMEOUT_MS:
+        return {}
+    return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+
+def apply(session, route_class: str) -> None:
+    """Bind a session to a route class (see database.db_session)"""
+    session.info["route_class"] = route_class
+    session.info["budget"] = BUDGETS[route_class]
+
+
+def _after_begin(session, transaction, connection) -> None:
+    budget = session.info.get("budget")
+    if budget is None or connection.dialect.name != "postgresql":
+        return
+    if budget.statement_timeout_ms != DB_STATEMENT_TIMEOUT_MS:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(budget.statement_timeout_ms)}")
+    if budget.max_cost:
+        # Read by _check_cost for every statement of this transaction; the
+        # Connection object is discarded when the transaction ends
+        connection.execution_options(
+            max_query_cost=budget.max_cost,
+            route_class=session.info.get("route_class"),
+        )
+
+
+def _is_select(statement: str) -> bool:
+    head = statement.lstrip()[:6].upper()
+    return head.startswith("SELECT") or head.startswith("WITH")
+
+
+def _has_limit(context) -> bool:
+    compiled_statement = getattr(context.compiled, "statement", None)
+    return (
+        getattr(compiled_statement, "_limit_clause", None) is not None
+        or getattr(compiled_statement, "_fetch_clause", None) is not None
+    )
+
+
+def _check_cost(conn, cursor, statement, parameters, context, executemany) -> None:
+    if executemany or context is None:
+        return
+    max_cost = context.execution_options.get("max_query_cost")
+    if not max_cost or not _is_select(statement):
+        return
+    guard = context.execution_options.get("cost_guard")
+    if guard is False or (guard is None and _has_limit(context)):
+        return
+    # Separate cursor: the statement's own cursor may be a server-side one
+    explain = conn.connection.dbapi_connection.cursor()
+    try:
+        explain.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = explain.fetchone()[0]
+    finally:
+        explain.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    cost = float(plan[0]["Plan"]["Total Cost"])
+    if cost > max_cost:
+        route_class = context.execution_options.get("route_class")
+        logger.warning(f"Rejected {route_class} query with estimated cost {cost:.0f} > {max_cost:.0f}")
+        raise QueryTooExpensiveError(cost, max_cost)
+
+
+def install(session_class, *engines) -> None:
+    """Register the timeout hook on a Session class and the cost guard on engines"""
+    event.listen(session_class, "after_begin", _after_begin)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _check_cost)
@@ -0,0 +1,149 @@
+"""
+Shared rate limit storage for slowapi
+
+slowapi keeps counters in process memory by default, so with N uvicorn workers
+every "100/minute" limit is effectively N times higher and counters reset on
+restart. This module registers a ``sqlite://`` storage scheme with the
+``limits`` library: one SQLite database in WAL mode shared by all worker
+processes on the host. Each check is a single UPSERT ... RETURNING statement,
+atomic across processes, typically tens of microseconds.
+
+Configured in middleware.py through RATE_LIMIT_STORAGE_URI:
+    sqlite:///var/run/oss/ratelimit.db   shared between workers on one host (default: temp dir)
+    redis://localhost:6379/0             shared between hosts (limits' built-in Redis storage)
+    memory://                            per-process, e.g. as a local stand-in in tests
+
+Only the fixed-window strategy (slowapi's default) is supported by the SQLite
+storage.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from limits.storage import Storage
+
+# UPSERT ... RETURNING is available since SQLite 3.35
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expiry REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+_UPSERT = """
+INSERT INTO rate_limits (key, value, expiry) VALUES (:key, :amount, :expiry)
+ON CONFLICT (key) DO UPDATE SET
+    value = CASE WHEN rate_limits.expiry <= :now THEN excluded.value
+                 ELSE rate_limits.value + excluded.value END,
+    expiry = CASE WHEN rate_limits.expiry <= :now OR :elastic THEN excluded.expiry
+                  ELSE rate_limits.expiry END
+"""
+
+
+class SQLiteStorage(Storage):
+    """
+    Fixed-window counters in a SQLite database shared between processes
+
+    URI: ``sqlite:///absolute/path/to/file.db`` (``sqlite://`` alone uses a
+    file in the system temp directory).
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    # Expired rows are purged once per this many increments
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, **options):
+        path = uri.split("://", 1)[1] if uri and "://" in uri else ""
+        if path.startswith("/") and len(path) > 1 and path[1] == "/":
+            path = path[1:]  # sqlite:////abs/path -> /abs/path
+        if not path or path == "/":
+            import tempfile
+            path = os.path.join(tempfile.gettempdir(), "oss_dvfu_ratelimit.db")
+        self.path = path
+        self.timeout = float(options.get("timeout", 5.0))
+        self._local = threading.local()
+        self._increments = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        with self._connection() as conn:
+            conn.execute(_CREATE_TABLE)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        One connection per thread and per process: sqlite3 connections must
+        not be shared between threads or inherited across fork().
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Counters are cheap to lose on power failure, not on process crash
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def incr(self, key: str, expiry: float, elastic_expiry: bool = False, amount: int = 1) -> int:
+        now = time.time()
+        params = {
+            "key": key,
+            "amount": amount,
+            "expiry": now + expiry,
+            "now": now,
+            "elastic": 1 if elastic_expiry else 0,
+        }
+        conn = self._connection()
+        if _HAS_RETURNING:
+            value = conn.execute(_UPSERT + " RETURNING value", params).fetchone()[0]
+        else:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(_UPSERT, params)
+                value = conn.execute("SELECT value FROM rate_limits WHERE key = ?", (key,)).fetchone()[0]
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        self._increments += 1
+        if self._increments % self.CLEANUP_EVERY == 0:
+            conn.execute("DELETE FROM rate_limits WHERE expiry <= ?", (now,))
+        return value
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT value FROM rate_limits WHERE key = ? AND expiry > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expiry FROM rate_limits WHERE key = ? AND expiry > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        return self._connection().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
@@ -72,6 +72,25 @@ class Appeal(AppealBase):
         from_attributes = True
 
 
+class AppealSummary(BaseModel):
+    """Appeal list item without the large text and contact columns (fields=summary)"""
+    id: UUID
+    title: str
+    category: Optional[str] = None
+    institute: Optional[str] = None
+    direction_id: Optional[UUID] = None
+    status: str
+    priority: Optional[str] = "normal"
+    tags: Optional[List[str]] = None
+    deadline: Optional[date] = None
+    assigned_to: Optional[UUID] = None
+    created_at: datetime
+    closed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class AppealPublic(BaseModel):
     """Public appeal info (only by token)"""
     id: UUID
@@ -104,6 +123,29 @@ class AppealComment(AppealCommentBase):
         from_attributes = True
 
 
+# Appeal History schemas
+class AppealHistory(BaseModel):
+    id: UUID
+    appeal_id: UUID
+    changed_by: Optional[UUID] = None
+    action: str
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+    description: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AppealCounters(BaseModel):
+    """List badges of an appeal"""
+    appeal_id: UUID
+    comments: int
+    attachments: int
+    last_activity_at: Optional[datetime] = None
+
+
 # Content schemas
 class ContentBase(BaseModel):
     type: str = Field(..., pattern="^(news|guide|faq)$")
@@ -134,6 +176,21 @@ class Content(ContentBase):
         from_attributes = True
 
 
+class ContentSummary(BaseModel):
+    """Content list item without the body (fields=summary)"""
+    id: UUID
+    type: str
+    title: str
+    slug: str
+    direction_id: Optional[UUID] = None
+    status: str
+    published_at: Optional[datetime] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # Document schemas
 class DocumentBase(BaseModel):
     title: str
@@ -211,3 +268,52 @@ class AppealAttachment(AppealAttachmentBase):
     class Config:
         from_attributes = True
 
+
+
+# Export job schemas
+class ExportJobCreate(BaseModel):
+    format: str = Field(default="csv", pattern="^(csv|excel)$")
+    direction_id: Optional[UUID] = None
+    status: Optional[str] = Field(None, pattern="^(new|in_progress|waiting|closed)$")
+    include_internal: bool = False
+
+
+class ExportJob(BaseModel):
+    id: str
+    format: str
+    status: str
+    rows_done: int
+    rows_total: Optional[int] = None
+    progress: Optional[float] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    deduplicated: bool = False
+    status_url: str
+    download_url: Optional[str] = None
+
+
+class AppealFull(Appeal):
+    """Appeal detail page: the appeal with everything shown next to it"""
+    direction: Optional[Direction] = None
+    comments: List[AppealComment] = []
+    attachments: List[AppealAttachment] = []
+
+
+# Batch lookup schemas: items in request order, unknown IDs in missing
+class DirectionBatch(BaseModel):
+    items: List[Direction]
+    missing: List[UUID]
+
+
+class AppealBatch(BaseModel):
+    items: List[Appeal]
+    missing: List[UUID]
+
+
+class ContentBatch(BaseModel):
+    items: List[Content]
+    missing: List[UUID]
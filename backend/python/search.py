@@ -8,16 +8,16 @@ from uuid import UUID
 from models import Appeal, Content
 
 
-def search_appeals(
+def search_appeals_query(
     db: Session,
     query: str,
     direction_id: Optional[UUID] = None,
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100
-) -> List[Appeal]:
+):
     """
-    Full-text search in appeals by title, description, and tags
+    Query behind search_appeals (filters, sorting and paging applied)
     """
     # Защита от SQL injection: ограничение длины и экранирование
     # SQLAlchemy автоматически экранирует, но на всякий случай
@@ -45,10 +45,17 @@ def search_appeals(
     if status:
         db_query = db_query.filter(Appeal.status == status)
     
-    return db_query.order_by(Appeal.created_at.desc()).offset(skip).limit(limit).all()
+    return db_query.order_by(Appeal.created_at.desc()).offset(skip).limit(limit)
+
 
+def search_appeals(db: Session, query: str, **filters) -> List[Appeal]:
+    """
+    Full-text search in appeals by title, description, and tags
+    """
+    return search_appeals_query(db, query, **filters).all()
 
-def search_content(
+
+def search_content_query(
     db: Session,
     query: str,
     content_type: Optional[str] = None,
@@ -56,9 +63,9 @@ def search_content(
     published_only: bool = True,
     skip: int = 0,
     limit: int = 100
-) -> List[Content]:
+):
     """
-    Full-text search in content by title and body
+    Query behind search_content (filters, sorting and paging applied)
     """
     search_filter = or_(
         Content.title.ilike(f"%{query}%"),
@@ -74,17 +81,24 @@ def search_content(
     if published_only:
         db_query = db_query.filter(Content.status == "published")
     
-    return db_query.order_by(Content.published_at.desc()).offset(skip).limit(limit).all()
+    return db_query.order_by(Content.published_at.desc()).offset(skip).limit(limit)
+
+
+def search_content(db: Session, query: str, **filters) -> List[Content]:
+    """
+    Full-text search in content by title and body
+    """
+    return search_content_query(db, query, **filters).all()
 
 
-def search_appeals_by_tags(
+def search_appeals_by_tags_query(
     db: Session,
     tags: List[str],
     skip: int = 0,
     limit: int = 100
-) -> List[Appeal]:
+):
     """
-    Search appeals by tags (PostgreSQL array contains)
+    Query behind search_appeals_by_tags
     """
     # PostgreSQL array overlap operator
     from sqlalchemy.dialects.postgresql import array
@@ -92,5 +106,12 @@ def search_appeals_by_tags(
         Appeal.tags.overlap(tags)
     )
     
-    return db_query.order_by(Appeal.created_at.desc()).offset(skip).limit(limit).all()
+    return db_query.order_by(Appeal.created_at.desc()).offset(skip).limit(limit)
+
+
+def search_appeals_by_tags(db: Session, tags: List[str], skip: int = 0, limit: int = 100) -> List[Appeal]:
+    """
+    Search appeals by tags (PostgreSQL array contains)
+    """
+    return search_appeals_by_tags_query(db, tags, skip=skip, limit=limit).all()
 
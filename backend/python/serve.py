@@ -0,0 +1,315 @@
+"""
+Production launcher: pre-forked uvicorn workers with pool-aware sizing
+
+The master process binds the listening socket and forks WORKERS children, each
+running its own uvicorn server on the shared socket. The master never imports
+the application, so no engine, pool or connection exists before fork; every
+worker builds its own (database.py additionally drops any inherited pool).
+
+Per-worker pool size is derived from a global Postgres connection budget:
+    per_worker = (DB_CONNECTION_BUDGET - DB_RESERVED_CONNECTIONS) // (WORKERS + 1)
+one extra slot is kept for the worker that is started during a rolling reload
+or recycle before the old one exits. A third of the share is kept open
+(pool_size), the rest is overflow - the same 1:2 ratio as the old 10/20 default.
+
+Signals (sent to the master):
+    SIGHUP           rolling reload: start a new worker (with freshly imported
+                     code), wait until it is ready, gracefully stop an old one;
+                     if the new worker fails to start, it is killed and the
+                     reload stops, leaving the remaining old workers running
+    SIGTERM/SIGINT   graceful shutdown of all workers
+Workers exit after WORKER_MAX_REQUESTS requests (+ random jitter, so they do
+not all restart at once) and are replaced automatically.
+
+A worker that fails within WORKER_FAILURE_WINDOW seconds of its start (bad
+environment, import error) is respawned with exponential backoff per worker
+slot, from 0.5 s up to WORKER_RESPAWN_BACKOFF_MAX. After WORKER_MAX_FAILURES
+such failures in a row of one slot the master stops the others and exits
+with status 1 instead of fork-looping.
+
+Usage:
+    python serve.py
+    WORKERS=4 DB_CONNECTION_BUDGET=60 WORKER_MAX_REQUESTS=10000 python serve.py --port 8000
+"""
+import argparse
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional, Set, Tuple
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("serve")
+
+
+def pool_sizes(budget: int, reserved: int, workers: int) -> Dict[str, int]:
+    """Split a global connection budget into per-worker pool settings"""
+    per_worker = max(2, (budget - reserved) // (workers + 1))
+    pool_size = max(1, per_worker // 3)
+    return {"pool_size": pool_size, "max_overflow": per_worker - pool_size}
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Master:
+    def __init__(self, args):
+        self.args = args
+        self.sock: Optional[socket.socket] = None
+        self.workers: Dict[int, float] = {}  # pid -> start time
+        self.slots: Dict[int, int] = {}  # pid -> worker slot
+        self.retiring: Set[int] = set()  # stopped on purpose, not to be replaced
+        self.exited: Dict[int, float] = {}  # slot -> respawn time, for workers that exited unexpectedly or were recycled
+        self.failures: Dict[int, int] = {}  # slot -> failures in a row shortly after start
+        self.stopping = False
+        self.failed = False
+        self.reload_requested = False
+
+    # ---------------------------------------------------------------- worker
+
+    def spawn(self, slot: int) -> Tuple[int, bool]:
+        """
+        Fork a worker and wait until it has imported the app; returns its pid
+        and whether it reported ready (False if it crashed or timed out)
+        """
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            code = 0
+            try:
+                self._run_worker(ready_w)
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+
+        os.close(ready_w)
+        self.workers[pid] = time.time()
+        self.slots[pid] = slot
+        readable, _, _ = select.select([ready_r], [], [], self.args.ready_timeout)
+        # A worker that dies during startup closes the pipe: readable, but EOF
+        ready = bool(readable) and os.read(ready_r, 1) == b"1"
+        os.close(ready_r)
+        if ready:
+            logger.info(f"Started worker {pid}")
+        elif readable:
+            logger.warning(f"Worker {pid} exited during startup")
+        else:
+            logger.warning(f"Worker {pid} not ready after {self.args.ready_timeout}s")
+        return pid, ready
+
+    def _run_worker(self, ready_fd: int) -> None:
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+
+        import uvicorn
+
+        limit = None
+        if self.args.max_requests:
+            limit = self.args.max_requests + random.randint(0, self.args.max_requests_jitter)
+
+        config = uvicorn.Config(
+            self.args.app,
+            proxy_headers=True,
+            forwarded_allow_ips=self.args.forwarded_allow_ips,
+            limit_max_requests=limit,
+            timeout_graceful_shutdown=self.args.graceful_timeout,
+            log_level=self.args.log_level,
+        )
+        # Import the application (and build this worker's engine) before
+        # reporting readiness; connections queue on the shared socket meanwhile
+        config.load()
+        os.write(ready_fd, b"1")
+        os.close(ready_fd)
+
+        server = uvicorn.Server(config)
+        server.run(sockets=[self.sock])
+
+    def stop_worker(self, pid: int, sig=signal.SIGTERM) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            self.workers.pop(pid, None)
+
+    def wait_for(self, pid: int, timeout: float) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.reap()
+            if pid not in self.workers:
+                return True
+            time.sleep(0.1)
+        return False
+
+    def reap(self) -> None:
+        """Collect exited workers; those not retired on purpose are queued for replacement"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid in self.workers:
+                started = self.workers.pop(pid)
+                slot = self.slots.pop(pid)
+                code = os.waitstatus_to_exitcode(status)
+                logger.info(f"Worker {pid} exited with code {code}")
+                if pid in self.retiring:
+                    self.retiring.discard(pid)
+                else:
+                    self.schedule_respawn(slot, failed=code != 0 and time.time() - started < self.args.failure_window)
+
+    def schedule_respawn(self, slot: int, failed: bool) -> None:
+        if not failed:
+            self.failures.pop(slot, None)
+            self.exited[slot] = time.time()
+            return
+        failures = self.failures.get(slot, 0) + 1
+        self.failures[slot] = failures
+        if failures >= self.args.max_failures:
+            logger.error(f"Worker slot {slot} failed {failures} times in a row right after start, giving up")
+            self.failed = True
+            self.stopping = True
+            return
+        delay = min(0.5 * 2 ** (failures - 1), self.args.respawn_backoff_max)
+        logger.warning(f"Worker slot {slot} failed right after start ({failures} in a row), respawning in {delay:.1f}s")
+        self.exited[slot] = time.time() + delay
+
+    # ---------------------------------------------------------------- master
+
+    def rolling_reload(self) -> None:
+        logger.info("Rolling reload")
+        for old_pid in list(self.workers):
+            if self.stopping:
+                return
+            if old_pid not in self.workers:
+                continue  # already recycled meanwhile, its replacement runs new code
+            new_pid, ready = self.spawn(self.slots[old_pid])
+            if not ready:
+                # Keep serving with the old code rather than replacing healthy workers
+                logger.error(f"Rolling reload aborted: worker {new_pid} did not start, keeping worker {old_pid}")
+                self.retiring.add(new_pid)
+                self.stop_worker(new_pid, signal.SIGKILL)
+                self.wait_for(new_pid, 5)
+                return
+            self.retiring.add(old_pid)
+            self.stop_worker(old_pid)
+            if not self.wait_for(old_pid, self.args.graceful_timeout + 5):
+                logger.warning(f"Worker {old_pid} did not stop in time, killing")
+                self.stop_worker(old_pid, signal.SIGKILL)
+                self.wait_for(old_pid, 5)
+
+    def shutdown(self) -> None:
+        logger.info("Shutting down")
+        self.retiring.update(self.workers)
+        for pid in list(self.workers):
+            self.stop_worker(pid)
+        deadline = time.time() + self.args.graceful_timeout + 5
+        while self.workers and time.time() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            logger.warning(f"Killing worker {pid}")
+            self.stop_worker(pid, signal.SIGKILL)
+        self.reap()
+
+    def run(self) -> int:
+        sizes = pool_sizes(self.args.db_budget, self.args.db_reserved, self.args.workers)
+        # Inherited by every forked worker and read by database.py on import
+        os.environ["DB_POOL_SIZE"] = str(sizes["pool_size"])
+        os.environ["DB_MAX_OVERFLOW"] = str(sizes["max_overflow"])
+        logger.info(
+            f"{self.args.workers} workers, pool_size={sizes['pool_size']} "
+            f"max_overflow={sizes['max_overflow']} per worker "
+            f"(budget {self.args.db_budget}, reserved {self.args.db_reserved})"
+        )
+
+        self.sock = bind_socket(self.args.host, self.args.port, self.args.backlog)
+        logger.info(f"Listening on {self.args.host}:{self.args.port} (master pid {os.getpid()})")
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for slot in range(self.args.workers):
+            self.spawn(slot)
+
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_reload()
+            # Recycled (max requests) or crashed workers are replaced
+            self.reap()
+            now = time.time()
+            for slot, respawn_at in list(self.exited.items()):
+                if self.stopping:
+                    break
+                if respawn_at <= now:
+                    del self.exited[slot]
+                    self.spawn(slot)
+            time.sleep(0.5)
+
+        self.shutdown()
+        self.sock.close()
+        return 1 if self.failed else 0
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_reload(self, signum, frame):
+        self.reload_requested = True
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked uvicorn workers")
+    parser.add_argument("--app", default="main:app", help="ASGI application to serve")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "2")))
+    parser.add_argument("--db-budget", type=int, default=int(os.getenv("DB_CONNECTION_BUDGET", "60")),
+                        help="total Postgres connections all workers may open")
+    parser.add_argument("--db-reserved", type=int, default=int(os.getenv("DB_RESERVED_CONNECTIONS", "5")),
+                        help="connections of the budget kept free for migrations and admin tools")
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("WORKER_MAX_REQUESTS", "0")),
+                        help="recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--max-requests-jitter", type=int,
+                        default=int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "0")))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")))
+    parser.add_argument("--ready-timeout", type=float, default=float(os.getenv("WORKER_READY_TIMEOUT", "60")))
+    parser.add_argument("--failure-window", type=float, default=float(os.getenv("WORKER_FAILURE_WINDOW", "10")),
+                        help="a worker exiting with an error this soon after start counts as a failed start")
+    parser.add_argument("--max-failures", type=int, default=int(os.getenv("WORKER_MAX_FAILURES", "5")),
+                        help="failed starts in a row of one worker slot before the master exits")
+    parser.add_argument("--respawn-backoff-max", type=float,
+                        default=float(os.getenv("WORKER_RESPAWN_BACKOFF_MAX", "30")))
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if args.max_requests and not args.max_requests_jitter:
+        args.max_requests_jitter = args.max_requests // 10
+
+    return Master(args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
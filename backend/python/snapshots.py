@@ -0,0 +1,287 @@
+"""
+Precompressed snapshots of the public list endpoints
+
+Public pages request /api/directions, /api/content and /api/documents with a
+handful of fixed parameter combinations (first page of 100, default filters).
+Those responses are rendered to files once - plain JSON plus gzip and, when
+the brotli package is installed, brotli variants - and served from disk with
+the encoding picked from Accept-Encoding. A matching request touches neither
+the database nor the serializer.
+
+Snapshots are rebuilt (debounced) after writes through crud.create_content,
+update_content, create_document and create_direction. Changes made around
+the API (SQL, another service) are picked up once the snapshot set is older
+than SNAPSHOT_MAX_AGE_SECONDS: the stale files are still served while a
+rebuild runs in the background.
+
+The files are written atomically (temporary file + rename), so several worker
+processes can share SNAPSHOT_DIR. Unchanged snapshots are not rewritten,
+which keeps their ETag / Last-Modified stable for HTTP caches.
+
+Environment:
+    SNAPSHOTS_ENABLED           0 serves every request from the database
+    SNAPSHOT_DIR                directory of the files (default: <tmp>/oss_dvfu_snapshots)
+    SNAPSHOT_DEBOUNCE_SECONDS   delay that coalesces bursts of writes (1)
+    SNAPSHOT_MAX_AGE_SECONDS    rebuild in the background after this age (300)
+    SNAPSHOT_ACCEL_REDIRECT     nginx internal location mapped to SNAPSHOT_DIR,
+                                e.g. /_snapshots/ - the response then only
+                                carries X-Accel-Redirect and nginx sends the
+                                file itself (sendfile)
+"""
+import gzip
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+import models
+import schemas
+import serialization
+
+try:
+    import brotli
+except ImportError:  # optional: gzip and identity variants only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS_ENABLED = os.getenv("SNAPSHOTS_ENABLED", "1") != "0"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR") or os.path.join(tempfile.gettempdir(), "oss_dvfu_snapshots")
+SNAPSHOT_DEBOUNCE_SECONDS = float(os.getenv("SNAPSHOT_DEBOUNCE_SECONDS", "1"))
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "300"))
+SNAPSHOT_ACCEL_REDIRECT = os.getenv("SNAPSHOT_ACCEL_REDIRECT", "")
+
+# Page size of all snapshots; routes only use a snapshot for skip=0 and this limit
+SNAPSHOT_LIMIT = 100
+CONTENT_TYPES = ("news", "guide", "faq")
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+IDENTITY = "identity"
+
+_MARKER = ".built"
+
+
+def _directions(db) -> bytes:
+    import crud
+    query = crud.directions_query(db, limit=SNAPSHOT_LIMIT, active_only=True)
+    return serialization.rows_json(query, schemas.Direction, models.Direction)
+
+
+def _content(content_type: Optional[str]) -> Callable:
+    def build(db) -> bytes:
+        import crud
+        query = crud.contents_query(db, limit=SNAPSHOT_LIMIT, content_type=content_type, published_only=True)
+        return serialization.rows_json(query, schemas.Content, models.Content)
+    return build
+
+
+def _documents(db) -> bytes:
+    import crud
+    query = crud.documents_query(db, limit=SNAPSHOT_LIMIT)
+    return serialization.rows_json(query, schemas.Document, models.Document)
+
+
+# Snapshot name -> builder returning the JSON body
+SNAPSHOTS: Dict[str, Callable] = {
+    "directions": _directions,
+    "content": _content(None),
+    **{f"content-{content_type}": _content(content_type) for content_type in CONTENT_TYPES},
+    "documents": _documents,
+}
+
+
+def content_snapshot_name(content_type: Optional[str]) -> str:
+    return f"content-{content_type}" if content_type else "content"
+
+
+def _path(name: str, suffix: str = "") -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json{suffix}")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _unchanged(name: str, body: bytes) -> bool:
+    try:
+        with open(_path(name), "rb") as f:
+            return f.read() == body
+    except OSError:
+        return False
+
+
+def write_snapshot(name: str, body: bytes) -> bool:
+    """Write the variants of one snapshot; False if the files were already up to date"""
+    if _unchanged(name, body):
+        return False
+    # Compressed variants first: the plain file is what the up-to-date check reads
+    # mtime=0 keeps the gzip output identical for identical bodies
+    _write_atomic(_path(name, ENCODINGS["gzip"]), gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write_atomic(_path(name, ENCODINGS["br"]), brotli.compress(body, quality=11))
+    _write_atomic(_path(name), body)
+    return True
+
+
+_build_lock = threading.Lock()
+
+
+def build_all() -> List[str]:
+    """Render every snapshot from the primary database; returns the names that changed"""
+    from database import SessionLocal
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    changed = []
+    with _build_lock:
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            for name, build in SNAPSHOTS.items():
+                if write_snapshot(name, build(db)):
+                    changed.append(name)
+        finally:
+            db.close()
+        _write_atomic(os.path.join(SNAPSHOT_DIR, _MARKER), b"")
+    logger.info(f"Snapshots rebuilt in {(time.perf_counter() - started) * 1000:.0f} ms, changed: {changed or 'none'}")
+    return changed
+
+
+_timer_lock = threading.Lock()
+_timer: Optional[threading.Timer] = None
+
+
+def _run_scheduled() -> None:
+    global _timer
+    with _timer_lock:
+        _timer = None
+    try:
+        build_all()
+    except Exception:
+        logger.exception("Snapshot rebuild failed")
+
+
+def schedule_rebuild(delay: Optional[float] = None) -> None:
+    """
+    Rebuild all snapshots after ``delay`` seconds (default
+    SNAPSHOT_DEBOUNCE_SECONDS). Calls while a rebuild is pending are coalesced
+    into it; a write after the rebuild started schedules a new one.
+    """
+    global _timer
+    if not SNAPSHOTS_ENABLED:
+        return
+    with _timer_lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(SNAPSHOT_DEBOUNCE_SECONDS if delay is None else delay, _run_scheduled)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _built_at() -> Optional[float]:
+    try:
+        return os.stat(os.path.join(SNAPSHOT_DIR, _MARKER)).st_mtime
+    except OSError:
+        return None
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Parse Accept-Encoding (RFC 9110, 12.5.3) into {coding: q}"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = min(max(float(value.strip()), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """
+    Best of ``available`` encodings or IDENTITY for the client, None if it
+    accepts none of them. Codings not listed get the ``*`` weight; identity
+    not listed at all is still acceptable, as the last resort.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*")
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, wildcard or 0.0)
+        if q > best_q:
+            best, best_q = encoding, q
+    identity_q = accepted.get(IDENTITY, wildcard)
+    if identity_q is None:
+        return best or IDENTITY
+    # Compressed wins ties with identity
+    if identity_q > best_q:
+        return IDENTITY
+    return best
+
+
+def response_for(request: Request, name: str) -> Optional[Response]:
+    """
+    Snapshot ``name`` as a response, negotiated against the request's
+    Accept-Encoding. None when snapshots are disabled or the snapshot has not
+    been built yet (a build is then scheduled and the caller answers from the
+    database).
+    """
+    if not SNAPSHOTS_ENABLED or name not in SNAPSHOTS:
+        return None
+    built_at = _built_at()
+    if built_at is None or not os.path.exists(_path(name)):
+        schedule_rebuild(0)
+        return None
+    if time.time() - built_at > SNAPSHOT_MAX_AGE_SECONDS:
+        schedule_rebuild(0)
+
+    available = [enc for enc, suffix in ENCODINGS.items() if os.path.exists(_path(name, suffix))]
+    encoding = negotiate(request.headers.get("accept-encoding", ""), available)
+    if encoding is None:
+        return Response(status_code=406, headers={"Vary": "Accept-Encoding"})
+    if encoding == IDENTITY:
+        encoding = None
+    path = _path(name, ENCODINGS[encoding]) if encoding else _path(name)
+    headers = {
+        "Vary": "Accept-Encoding",
+        # Revalidated on every use: a 304 is cheap and edits show up at once
+        "Cache-Control": "public, no-cache",
+        "X-Snapshot": name,
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    if SNAPSHOT_ACCEL_REDIRECT:
+        headers["X-Accel-Redirect"] = SNAPSHOT_ACCEL_REDIRECT.rstrip("/") + "/" + os.path.basename(path)
+        return Response(media_type="application/json", headers=headers)
+
+    stat_result = os.stat(path)
+    # Per-variant validator: FileResponse's default ETag would be shared by
+    # variants written within the same second with the same size
+    etag = f'"{name}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}{"-" + encoding if encoding else ""}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+    headers["ETag"] = etag
+    return FileResponse(path, media_type="application/json", headers=headers, stat_result=stat_result)
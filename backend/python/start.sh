@@ -3,6 +3,12 @@
 # Railway автоматически устанавливает зависимости через Nixpacks,
 # этот скрипт нужен только если Railway не может определить команду запуска
 
+# Создание недостающих таблиц (раньше выполнялось при импорте main.py)
+if [ "${DB_AUTO_CREATE_TABLES:-0}" = "1" ]; then
+    python manage.py create-tables
+fi
+
 # Запуск приложения
-exec uvicorn main:app --host 0.0.0.0 --port ${PORT:-8000} --workers ${WORKERS:-2}
+# serve.py: pre-fork воркеры, размер пула БД из DB_CONNECTION_BUDGET, перезапуск воркеров
+exec python serve.py
 
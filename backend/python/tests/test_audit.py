@@ -0,0 +1,53 @@
+"""Appeal history written by the backend next to the log_appeal_change trigger"""
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+import audit
+
+
+class _Session:
+    def __init__(self):
+        self.info = {}
+        self.sql = []
+
+    def connection(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), exec_driver_sql=self.sql.append)
+
+
+@pytest.fixture
+def buffered(monkeypatch):
+    monkeypatch.setattr(audit, "AUDIT_MODE", audit.BUFFERED)
+
+
+def _status_change():
+    appeal = SimpleNamespace(id=uuid4(), status="new", priority="normal", assigned_to=None,
+                             deadline=None, direction_id=None, tags=[])
+    return audit.appeal_changes(appeal, {"status": "in_progress"})
+
+
+def test_appeal_change_sets_guc_per_transaction(buffered):
+    db = _Session()
+    audit.record(db, _status_change())
+
+    assert db.sql == ["SET LOCAL oss.app_audit = on"]
+    assert len(db.info["audit_rows"]) == 1
+
+
+def test_comment_needs_no_guc(buffered):
+    db = _Session()
+    comment = SimpleNamespace(id=uuid4(), appeal_id=uuid4(), author_id=None, is_internal=False)
+    audit.record(db, audit.comment_added(comment))
+
+    assert db.sql == []
+
+
+def test_falls_back_to_trigger_before_migration(buffered, monkeypatch):
+    monkeypatch.setattr(audit, "_trigger_migrated", lambda: False)
+    audit.start()
+
+    db = _Session()
+    audit.record(db, _status_change())
+    assert audit.AUDIT_MODE == audit.TRIGGER
+    assert db.sql == [] and db.info == {}
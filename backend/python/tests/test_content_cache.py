@@ -0,0 +1,71 @@
+"""Content cache invalidations seen by other worker processes"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+MODULE = Path(__file__).resolve().parent.parent / "content_cache.py"
+
+
+def _worker(name: str):
+    """A separate copy of the module: its own cache, like another worker process"""
+    spec = importlib.util.spec_from_file_location(f"content_cache_{name}", MODULE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    log = tmp_path / "invalidations.log"
+    log.touch()
+    monkeypatch.setenv("CONTENT_CACHE_SHARED_FILE", str(log))
+    return _worker("a"), _worker("b")
+
+
+def _cache(worker, slug: str, body: bytes) -> None:
+    worker.put(slug, body, worker.generation())
+    assert worker.get(slug) == body
+
+
+def test_rename_is_seen_by_other_worker(workers):
+    a, b = workers
+    _cache(b, "old-slug", b'{"title": "Old"}')
+    _cache(b, "other", b'{"title": "Other"}')
+
+    # Worker a renames old-slug -> new-slug (crud.update_content)
+    a.invalidate("old-slug")
+    a.invalidate("new-slug")
+
+    assert b.get("old-slug") is None
+    assert b.get("other") == b'{"title": "Other"}'
+
+
+def test_unpublish_drops_read_in_flight(workers):
+    a, b = workers
+    generation = b.generation()
+    # b read the published body, then a unpublished and invalidated before b stored it
+    a.invalidate("news-1")
+    b.put("news-1", b'{"title": "Published"}', generation)
+
+    assert b.get("news-1") is None
+
+
+def test_restarted_log_drops_everything(workers, monkeypatch):
+    a, b = workers
+    monkeypatch.setattr(a, "SHARED_LOG_MAX_BYTES", 1)
+    _cache(b, "guide", b'{"title": "Guide"}')
+
+    a.invalidate("something-else")
+
+    assert b.get("guide") is None
+
+
+def test_log_created_later_drops_everything(tmp_path, monkeypatch):
+    monkeypatch.setenv("CONTENT_CACHE_SHARED_FILE", str(tmp_path / "invalidations.log"))
+    a, b = _worker("a"), _worker("b")
+    _cache(b, "faq", b'{"title": "FAQ"}')
+
+    a.invalidate("faq")
+
+    assert b.get("faq") is None
@@ -0,0 +1,91 @@
+"""Deadline scheduler state across reloads"""
+from datetime import date, timedelta
+from uuid import uuid4
+
+from deadlines import DeadlineScheduler
+
+TODAY = date(2026, 3, 10)
+
+
+def test_track_during_reload_survives_stale_rows():
+    scheduler = DeadlineScheduler()
+    appeal_id = uuid4()
+    scheduler.load([], today=TODAY)
+
+    scheduler.begin_load()
+    stale_rows = [(appeal_id, TODAY + timedelta(days=5))]
+    # Written after the reload read its rows
+    scheduler.track(appeal_id, TODAY - timedelta(days=1), "new")
+    scheduler.load(stale_rows, today=TODAY)
+
+    assert scheduler.overdue_page() == [appeal_id]
+
+
+def test_closed_during_reload_stays_untracked():
+    scheduler = DeadlineScheduler()
+    appeal_id = uuid4()
+    scheduler.begin_load()
+    scheduler.track(appeal_id, None, "closed")
+    scheduler.load([(appeal_id, TODAY - timedelta(days=1))], today=TODAY)
+
+    assert scheduler.tracked_count() == 0
+
+
+def test_reload_emits_deadlines_passed_since_last_tick():
+    scheduler = DeadlineScheduler()
+    emitted = []
+    scheduler.subscribe(emitted.extend)
+    appeal_id = uuid4()
+    scheduler.load([(appeal_id, TODAY)], today=TODAY)
+    assert emitted == []
+
+    tomorrow = TODAY + timedelta(days=1)
+    assert scheduler.load([(appeal_id, TODAY)], today=tomorrow) == [appeal_id]
+    assert emitted == [appeal_id]
+    assert scheduler.tick(tomorrow) == []
+
+
+def test_first_load_emits_nothing():
+    scheduler = DeadlineScheduler()
+    emitted = []
+    scheduler.subscribe(emitted.extend)
+    scheduler.load([(uuid4(), TODAY - timedelta(days=3))], today=TODAY)
+
+    assert emitted == []
+    assert scheduler.overdue_count() == 1
+
+
+def test_overdue_pages_skip_entries_changed_elsewhere(monkeypatch):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    import crud
+    import deadlines
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE appeals (id CHAR(32) PRIMARY KEY, deadline DATE, status TEXT)"))
+    today = date.today()
+    ids = sorted(uuid4() for _ in range(6))
+    rows = [(appeal_id, today - timedelta(days=10 - i)) for i, appeal_id in enumerate(ids)]
+    with engine.begin() as conn:
+        for appeal_id, deadline in rows:
+            # ids[1] and ids[2] were closed by another worker, which this scheduler has not seen
+            status = "closed" if appeal_id in ids[1:3] else "new"
+            conn.execute(text("INSERT INTO appeals VALUES (:id, :deadline, :status)"),
+                         {"id": appeal_id.hex, "deadline": deadline, "status": status})
+
+    scheduler = DeadlineScheduler()
+    scheduler.load(rows)
+    monkeypatch.setattr(deadlines, "scheduler", scheduler)
+    monkeypatch.setattr(crud, "OVERDUE_CHECK_BATCH", 2)
+
+    with Session(engine) as db:
+        first = crud._overdue_page_ids(db, today, skip=0, limit=2)
+        second = crud._overdue_page_ids(db, today, skip=2, limit=2)
+        third = crud._overdue_page_ids(db, today, skip=4, limit=2)
+
+    assert first == [ids[0], ids[3]]
+    assert second == [ids[4], ids[5]]
+    assert third == []
@@ -0,0 +1,84 @@
+"""Export jobs left behind by a worker process that died"""
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import export_jobs
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_jobs, "EXPORT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _orphaned_job(export_dir, status=export_jobs.RUNNING) -> dict:
+    job = {
+        "id": "a" * 32,
+        "key": "k" * 64,
+        "format": "csv",
+        "params": {},
+        "status": status,
+        "rows_done": 10,
+        "rows_total": 100,
+        "size": None,
+        "error": None,
+        "owner": f"{export_jobs._HOST}:{_dead_pid()}",
+        "created_at": time.time(),
+        "started_at": time.time(),
+        "finished_at": None,
+        "expires_at": None,
+    }
+    export_jobs._save_job(job)
+    (export_dir / f"key-{job['key']}").write_text(job["id"])
+    (export_dir / f"{job['id']}.csv.part").write_text("id,title\n")
+    return job
+
+
+@pytest.mark.parametrize("status", [export_jobs.QUEUED, export_jobs.RUNNING])
+def test_sweep_fails_job_of_dead_owner(export_dir, status):
+    job = _orphaned_job(export_dir, status)
+
+    assert export_jobs.sweep() == 0
+
+    failed = export_jobs.load_job(job["id"])
+    assert failed["status"] == export_jobs.FAILED
+    assert failed["expires_at"] == pytest.approx(time.time() + export_jobs.EXPORT_JOB_TTL_SECONDS, abs=5)
+    assert not (export_dir / f"{job['id']}.csv.part").exists()
+    assert not (export_dir / f"key-{job['key']}").exists()
+
+
+def test_status_read_fails_job_of_dead_owner(export_dir):
+    job = _orphaned_job(export_dir)
+
+    assert export_jobs.get_job(job["id"])["status"] == export_jobs.FAILED
+    assert export_jobs.load_job(job["id"])["status"] == export_jobs.FAILED
+
+
+def test_failed_orphan_expires(export_dir, monkeypatch):
+    job = _orphaned_job(export_dir)
+    export_jobs.sweep()
+
+    monkeypatch.setattr(export_jobs.time, "time", lambda: job["created_at"] + export_jobs.EXPORT_JOB_TTL_SECONDS + 60)
+    assert export_jobs.sweep() == 1
+    assert not os.listdir(export_dir)
+
+
+def test_running_job_of_live_owner_is_kept(export_dir):
+    job = _orphaned_job(export_dir)
+    job["owner"] = f"{export_jobs._HOST}:{os.getpid()}"
+    export_jobs._save_job(job)
+
+    export_jobs.sweep()
+
+    assert export_jobs.load_job(job["id"])["status"] == export_jobs.RUNNING
+    assert (export_dir / f"key-{job['key']}").exists()
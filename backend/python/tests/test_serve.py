@@ -0,0 +1,85 @@
+"""Master behaviour when workers cannot start"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+SERVE = Path(__file__).resolve().parent.parent / "serve.py"
+
+
+def test_master_gives_up_on_workers_failing_at_start():
+    started = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, str(SERVE), "--app", "no_such_module:app", "--host", "127.0.0.1", "--port", "0",
+         "--workers", "1", "--max-failures", "3"],
+        capture_output=True, text=True, timeout=60,
+    )
+    elapsed = time.monotonic() - started
+
+    assert result.returncode == 1
+    assert "respawning in 0.5s" in result.stderr
+    assert "respawning in 1.0s" in result.stderr
+    assert "giving up" in result.stderr
+    # Two backoff delays, not a respawn every loop iteration
+    assert elapsed >= 1.5
+
+
+APP = '''
+import os
+
+if os.path.exists(os.environ["BROKEN_FLAG"]):
+    raise RuntimeError("broken release")
+
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": str(os.getpid()).encode()})
+'''
+
+
+def _get(port: int) -> str:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5) as response:
+        return response.read().decode()
+
+
+def _wait_for_server(port: int) -> str:
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            return _get(port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def test_reload_with_broken_code_keeps_old_workers(tmp_path):
+    (tmp_path / "reload_app.py").write_text(APP)
+    flag = tmp_path / "broken"
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = {**os.environ, "PYTHONPATH": str(tmp_path), "BROKEN_FLAG": str(flag)}
+    master = subprocess.Popen(
+        [sys.executable, str(SERVE), "--app", "reload_app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1"],
+        env=env, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        worker_pid = _wait_for_server(port)
+        flag.touch()
+        master.send_signal(signal.SIGHUP)
+        time.sleep(3)
+
+        assert master.poll() is None
+        assert _get(port) == worker_pid
+    finally:
+        master.terminate()
+        _, stderr = master.communicate(timeout=60)
+    assert "Rolling reload aborted" in stderr
@@ -0,0 +1,84 @@
+"""Accept-Encoding negotiation of the precompressed snapshots"""
+import gzip
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import snapshots
+from snapshots import IDENTITY, negotiate
+
+AVAILABLE = ["br", "gzip"]
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", IDENTITY),
+    ("gzip", "gzip"),
+    ("gzip; q=0.5, br ;q = 0.8", "br"),
+    ("GZIP;Q=1", "gzip"),
+    ("*", "br"),
+    ("br;q=0, *", "gzip"),
+    ("deflate", IDENTITY),
+    ("gzip;q=0", IDENTITY),
+    ("identity;q=1, gzip;q=0.5", IDENTITY),
+    ("identity;q=0, gzip", "gzip"),
+    ("*;q=0, gzip;q=0.3", "gzip"),
+    ("identity;q=0", None),
+    ("*;q=0", None),
+    ("identity;q=0, br;q=0, gzip;q=0", None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header, AVAILABLE) == expected
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "SNAPSHOTS_ENABLED", True)
+    monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", str(tmp_path))
+    body = b'[{"id": 1}]'
+    (tmp_path / "directions.json").write_bytes(body)
+    (tmp_path / "directions.json.gz").write_bytes(gzip.compress(body))
+    (tmp_path / snapshots._MARKER).touch()
+    monkeypatch.setattr(snapshots, "SNAPSHOT_MAX_AGE_SECONDS", time.time())
+
+    app = FastAPI()
+
+    @app.get("/directions")
+    def directions(request: Request):
+        return snapshots.response_for(request, "directions")
+
+    return TestClient(app)
+
+
+def test_refused_identity_gets_gzip(client):
+    response = client.get("/directions", headers={"Accept-Encoding": "gzip; q=0.5, identity;q=0"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_nothing_acceptable_is_406(client):
+    response = client.get("/directions", headers={"Accept-Encoding": "br, *;q=0"})
+    assert response.status_code == 406
+
+
+def test_writer_skips_snapshots_without_replica(monkeypatch):
+    import database
+    from middleware import read_your_writes_middleware
+
+    monkeypatch.setattr(database, "READ_REPLICA_URL", None)
+    app = FastAPI()
+    app.middleware("http")(read_your_writes_middleware)
+
+    @app.post("/content")
+    def write():
+        return {}
+
+    @app.get("/content")
+    def read(request: Request):
+        return {"snapshot": not database.recently_wrote(request)}
+
+    client = TestClient(app)
+    assert client.get("/content").json() == {"snapshot": True}
+    client.post("/content")
+    assert client.get("/content").json() == {"snapshot": False}
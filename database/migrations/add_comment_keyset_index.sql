@@ -0,0 +1,15 @@
+-- ===============================
+-- Миграция: индекс под постраничную выдачу комментариев
+-- ===============================
+-- GET /api/appeals/{id}/comments отдаёт комментарии страницами по курсору:
+--   WHERE appeal_id = ? AND (created_at, id) > (?, ?) ORDER BY created_at, id LIMIT ?
+-- С id в индексе и сравнение, и сортировка идут по индексу без Sort.
+-- Применять после add_query_indexes.sql.
+
+create index if not exists idx_appeal_comments_appeal_created_id
+    on appeal_comments(appeal_id, created_at, id);
+
+-- Покрыт новым индексом
+drop index if exists idx_appeal_comments_appeal_created;
+
+analyze appeal_comments;
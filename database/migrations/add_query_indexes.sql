@@ -0,0 +1,110 @@
+-- ===============================
+-- Миграция: составные и частичные индексы под реальные запросы backend
+-- ===============================
+-- schema.sql содержит только одноколоночные индексы по appeals. Запросы из
+-- backend/python (crud.py, search.py, analytics.py) фильтруют по нескольким
+-- колонкам сразу и сортируют по created_at, поэтому на больших таблицах
+-- планировщик уходил в Seq Scan + Sort.
+--
+-- Проверка планов: backend/python/benchmarks/check_query_plans.py
+-- (падает, если какой-либо запрос делает Seq Scan по большой таблице).
+--
+-- На большой живой базе индексы лучше строить по одному через
+-- CREATE INDEX CONCURRENTLY (вне транзакции), чтобы не блокировать запись.
+
+create extension if not exists pg_trgm;
+
+-- -------------------------------
+-- appeals: списки (crud.get_appeals, get_appeals_by_priority, get_appeals_by_assigned)
+-- WHERE <фильтр> ORDER BY created_at DESC LIMIT ...
+-- -------------------------------
+-- Уже есть в schema.sql; повторяем, чтобы миграция была самодостаточной
+create index if not exists idx_appeals_created_at
+    on appeals(created_at desc);
+create index if not exists idx_appeals_direction_status_created
+    on appeals(direction_id, status, created_at desc);
+create index if not exists idx_appeals_direction_created
+    on appeals(direction_id, created_at desc);
+create index if not exists idx_appeals_status_created
+    on appeals(status, created_at desc);
+create index if not exists idx_appeals_priority_created
+    on appeals(priority, created_at desc);
+create index if not exists idx_appeals_assigned_created
+    on appeals(assigned_to, created_at desc)
+    where assigned_to is not null;
+
+-- Одноколоночные индексы, полностью покрытые составными выше
+drop index if exists idx_appeals_status;
+drop index if exists idx_appeals_direction;
+drop index if exists idx_appeals_priority;
+drop index if exists idx_appeals_assigned_to;
+
+-- -------------------------------
+-- appeals: просроченные (crud.get_overdue_appeals)
+-- WHERE deadline < today AND status != 'closed' ORDER BY deadline
+-- -------------------------------
+create index if not exists idx_appeals_open_deadline
+    on appeals(deadline)
+    where status <> 'closed';
+
+-- -------------------------------
+-- appeals: статистика (crud.get_appeal_stats, analytics.get_detailed_appeal_stats)
+-- status = 'closed' AND closed_at в диапазоне дня/периода
+-- -------------------------------
+create index if not exists idx_appeals_closed_at
+    on appeals(closed_at)
+    where status = 'closed';
+
+-- -------------------------------
+-- appeals: поиск (search.search_appeals)
+-- ILIKE '%q%' по нескольким колонкам через OR -> BitmapOr по trigram-индексам
+-- -------------------------------
+create index if not exists idx_appeals_title_trgm
+    on appeals using gin (title gin_trgm_ops);
+create index if not exists idx_appeals_description_trgm
+    on appeals using gin (description gin_trgm_ops);
+create index if not exists idx_appeals_category_trgm
+    on appeals using gin (category gin_trgm_ops);
+create index if not exists idx_appeals_institute_trgm
+    on appeals using gin (institute gin_trgm_ops);
+create index if not exists idx_appeals_contact_value_trgm
+    on appeals using gin (contact_value gin_trgm_ops);
+
+-- analytics.get_appeals_by_school: lower(institute) LIKE '%код%'
+create index if not exists idx_appeals_institute_lower_trgm
+    on appeals using gin (lower(institute) gin_trgm_ops);
+
+-- search.search_appeals_by_tags: tags && array[...]
+create index if not exists idx_appeals_tags
+    on appeals using gin (tags);
+
+-- -------------------------------
+-- Комментарии и вложения: WHERE appeal_id = ? ORDER BY created_at / uploaded_at
+-- -------------------------------
+create index if not exists idx_appeal_comments_appeal_created
+    on appeal_comments(appeal_id, created_at);
+create index if not exists idx_appeal_attachments_appeal_uploaded
+    on appeal_attachments(appeal_id, uploaded_at);
+
+drop index if exists idx_appeal_comments_appeal;
+drop index if exists idx_appeal_attachments_appeal;
+
+-- -------------------------------
+-- Контент и документы (crud.get_contents, crud.get_documents, search.search_content)
+-- -------------------------------
+create index if not exists idx_content_status_published
+    on content(status, published_at desc);
+create index if not exists idx_content_type_status_published
+    on content(type, status, published_at desc);
+create index if not exists idx_content_title_trgm
+    on content using gin (title gin_trgm_ops);
+create index if not exists idx_content_body_trgm
+    on content using gin (body gin_trgm_ops);
+create index if not exists idx_documents_direction_created
+    on documents(direction_id, created_at desc);
+
+analyze appeals;
+analyze appeal_comments;
+analyze appeal_attachments;
+analyze content;
+analyze documents;
@@ -0,0 +1,109 @@
+-- ===============================
+-- Миграция: история изменений обращений пишет backend
+-- ===============================
+-- Изменения, сделанные через API (PATCH /api/appeals/{id}, комментарии),
+-- backend/python/audit.py записывает в appeal_history сам — пачками в фоне
+-- (AUDIT_MODE=buffered/spool) или в той же транзакции (AUDIT_MODE=sync).
+-- Соединения backend при подключении выставляют oss.app_audit = on; триггер
+-- такие изменения пропускает, чтобы не было дублей, и продолжает логировать
+-- изменения, сделанные напрямую через Supabase (админ-страницы frontend).
+-- При AUDIT_MODE=trigger backend настройку не выставляет и всё пишет триггер.
+-- Применять после schema_audit.sql.
+
+create or replace function log_appeal_change()
+returns trigger as $$
+begin
+    -- Изменение пришло из backend: историю записал audit.py
+    if current_setting('oss.app_audit', true) = 'on' then
+        return NEW;
+    end if;
+
+    -- Логируем изменение статуса
+    if TG_OP = 'UPDATE' and OLD.status is distinct from NEW.status then
+        insert into appeal_history (
+            appeal_id,
+            changed_by,
+            action,
+            old_value,
+            new_value,
+            description
+        ) values (
+            NEW.id,
+            auth.uid(),
+            'status_changed',
+            OLD.status,
+            NEW.status,
+            'Статус изменён с ' || OLD.status || ' на ' || NEW.status
+        );
+    end if;
+
+    -- Логируем изменение приоритета
+    if TG_OP = 'UPDATE' and OLD.priority is distinct from NEW.priority then
+        insert into appeal_history (
+            appeal_id,
+            changed_by,
+            action,
+            old_value,
+            new_value,
+            description
+        ) values (
+            NEW.id,
+            auth.uid(),
+            'priority_changed',
+            OLD.priority,
+            NEW.priority,
+            'Приоритет изменён с ' || COALESCE(OLD.priority, 'normal') || ' на ' || COALESCE(NEW.priority, 'normal')
+        );
+    end if;
+
+    -- Логируем назначение ответственного
+    if TG_OP = 'UPDATE' and OLD.assigned_to is distinct from NEW.assigned_to then
+        insert into appeal_history (
+            appeal_id,
+            changed_by,
+            action,
+            old_value,
+            new_value,
+            description
+        ) values (
+            NEW.id,
+            auth.uid(),
+            'assigned',
+            COALESCE(OLD.assigned_to::text, 'не назначен'),
+            COALESCE(NEW.assigned_to::text, 'не назначен'),
+            'Ответственный изменён'
+        );
+    end if;
+
+    -- Логируем установку дедлайна
+    if TG_OP = 'UPDATE' and OLD.deadline is distinct from NEW.deadline then
+        insert into appeal_history (
+            appeal_id,
+            changed_by,
+            action,
+            old_value,
+            new_value,
+            description
+        ) values (
+            NEW.id,
+            auth.uid(),
+            'deadline_set',
+            COALESCE(OLD.deadline::text, 'не установлен'),
+            COALESCE(NEW.deadline::text, 'не установлен'),
+            'Дедлайн изменён'
+        );
+    end if;
+
+    return NEW;
+end;
+$$ language plpgsql security definer;
+
+-- GET /api/appeals/{id}/history отдаёт историю страницами по курсору:
+--   WHERE appeal_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?
+create index if not exists idx_appeal_history_appeal_created_id
+    on appeal_history(appeal_id, created_at, id);
+
+-- Покрыт новым индексом
+drop index if exists idx_appeal_history_appeal;
+
+analyze appeal_history;
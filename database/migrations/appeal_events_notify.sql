@@ -0,0 +1,70 @@
+-- ===============================
+-- Миграция: уведомления об изменениях обращений для живой ленты (SSE)
+-- ===============================
+-- GET /api/appeals/events (backend/python/live_events.py) держит на каждом
+-- воркере одно соединение с LISTEN appeal_events и рассылает события открытым
+-- вкладкам админки вместо опроса списков каждые несколько секунд.
+--
+-- Триггеры отправляют pg_notify после вставки/изменения обращения и нового
+-- комментария, в том числе для изменений напрямую через Supabase. Уведомление
+-- доставляется только после коммита. В payload — только идентификаторы и
+-- поля для фильтров (без текста обращений и комментариев), номер из
+-- appeal_event_seq служит id события для Last-Event-ID.
+
+create sequence if not exists appeal_event_seq;
+
+create or replace function notify_appeal_event()
+returns trigger as $$
+begin
+    perform pg_notify('appeal_events', json_build_object(
+        'seq', nextval('appeal_event_seq'),
+        'type', case when TG_OP = 'INSERT' then 'appeal_created' else 'appeal_updated' end,
+        'appeal_id', NEW.id,
+        'status', NEW.status,
+        'priority', NEW.priority,
+        'direction_id', NEW.direction_id,
+        'assigned_to', NEW.assigned_to,
+        'deadline', NEW.deadline,
+        'changed', case when TG_OP = 'UPDATE' then array_remove(array[
+            case when OLD.status is distinct from NEW.status then 'status' end,
+            case when OLD.priority is distinct from NEW.priority then 'priority' end,
+            case when OLD.direction_id is distinct from NEW.direction_id then 'direction_id' end,
+            case when OLD.assigned_to is distinct from NEW.assigned_to then 'assigned_to' end,
+            case when OLD.deadline is distinct from NEW.deadline then 'deadline' end,
+            case when OLD.tags is distinct from NEW.tags then 'tags' end
+        ], null) end
+    )::text);
+    return NEW;
+end;
+$$ language plpgsql;
+
+drop trigger if exists appeal_event_notify on appeals;
+create trigger appeal_event_notify
+    after insert or update on appeals
+    for each row
+    execute function notify_appeal_event();
+
+create or replace function notify_appeal_comment_event()
+returns trigger as $$
+declare
+    appeal record;
+begin
+    select direction_id, assigned_to into appeal from appeals where id = NEW.appeal_id;
+    perform pg_notify('appeal_events', json_build_object(
+        'seq', nextval('appeal_event_seq'),
+        'type', 'appeal_comment',
+        'appeal_id', NEW.appeal_id,
+        'comment_id', NEW.id,
+        'is_internal', NEW.is_internal,
+        'direction_id', appeal.direction_id,
+        'assigned_to', appeal.assigned_to
+    )::text);
+    return NEW;
+end;
+$$ language plpgsql;
+
+drop trigger if exists appeal_comment_event_notify on appeal_comments;
+create trigger appeal_comment_event_notify
+    after insert on appeal_comments
+    for each row
+    execute function notify_appeal_comment_event();